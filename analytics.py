@@ -0,0 +1,147 @@
+"""
+Ticket statistics for the event reports.
+
+Tickets of one or several events are loaded once into a ``TicketTable`` with
+an extra ``event`` column, then every aggregate is computed per event and for
+all events together with numpy group-by counts over the columns.
+"""
+
+import pathlib
+
+import numpy as np
+import pydantic
+
+from columnar import SnapshotTable, is_snapshot, read_tickets
+from decoders import get_decoder
+from models import PythonLevel, SpeakerModel, TicketModel
+from ticket_table import TicketTable
+
+
+class EventReport(pydantic.BaseModel):
+    event: str
+    tickets: int
+    tshirt_sizes: dict[str, int]
+    levels: dict[str, int]
+    release_titles: dict[str, int]
+    registrations_per_day: dict[str, int]
+    speaker_tickets: int
+    speakers: int = 0
+    speakers_with_ticket: int = 0
+
+
+def event_name(ticket_file: pathlib.Path) -> str:
+    return ticket_file.stem.removesuffix("-tickets")
+
+
+def load_table(ticket_files: list[pathlib.Path]) -> TicketTable:
+    """Load every file into a single table, the file stem is the event.
+
+    When every file is a columnar snapshot, only the columns used by the
+    reports are read.
+    """
+    if all(is_snapshot(ticket_file) for ticket_file in ticket_files):
+        table = SnapshotTable(ticket_files)
+        events = np.repeat(
+            np.array([event_name(path) for path in ticket_files], dtype=str),
+            table.row_counts,
+        )
+    else:
+        decoder = get_decoder()
+        tickets: list[TicketModel] = []
+        names: list[str] = []
+        for ticket_file in ticket_files:
+            if is_snapshot(ticket_file):
+                loaded = read_tickets(ticket_file)
+            else:
+                loaded = decoder.tickets(ticket_file.read_bytes())
+            tickets.extend(loaded)
+            names.extend([event_name(ticket_file)] * len(loaded))
+        table = TicketTable(tickets)
+        events = np.array(names, dtype=str)
+    table.add_column("event", events)
+    return table
+
+
+def grouped_counts(
+    groups: np.ndarray,
+    group_count: int,
+    values: np.ndarray,
+) -> tuple[np.ndarray, np.ndarray]:
+    """Count ``values`` per group.
+
+    Returns:
+        The distinct values and a ``(group_count + 1, len(values))`` matrix,
+        whose last row holds the totals over all groups.
+    """
+    labels, inverse = np.unique(values, return_inverse=True)
+    matrix = np.bincount(
+        groups * len(labels) + inverse, minlength=group_count * len(labels)
+    ).reshape(group_count, len(labels))
+    return labels, np.vstack([matrix, matrix.sum(axis=0)])
+
+
+def as_dict(labels, row: np.ndarray, skip_empty: bool = True) -> dict[str, int]:
+    return {
+        str(label): int(count)
+        for label, count in zip(labels, row)
+        if count and (label != "" or not skip_empty)
+    }
+
+
+def event_reports(
+    table: TicketTable,
+    speakers: list[SpeakerModel],
+    tshirt_question: str = "t-shirt-size",
+) -> list[EventReport]:
+    """Compute the report of each event, followed by the report of all events.
+
+    Args:
+        table: Tickets, with an ``event`` column (see ``load_table``).
+        speakers: Speakers, to measure how many of them hold a ticket.
+        tshirt_question: Slug of the Tito question asking the t-shirt size.
+    """
+    event_names, groups = np.unique(table.column("event"), return_inverse=True)
+    group_count = len(event_names)
+
+    tickets_per_event = np.bincount(groups, minlength=group_count)
+    tickets_per_event = np.append(tickets_per_event, tickets_per_event.sum())
+
+    sizes, size_counts = grouped_counts(
+        groups, group_count, np.char.upper(table.column(f"responses.{tshirt_question}"))
+    )
+    levels, level_counts = grouped_counts(groups, group_count, table.column("level"))
+    level_names = [PythonLevel(level).name if level else "Unknown" for level in levels]
+    titles, title_counts = grouped_counts(
+        groups, group_count, table.labels("release_title")
+    )
+    days, day_counts = grouped_counts(
+        groups,
+        group_count,
+        table.column("created_at").astype("datetime64[us]").astype("datetime64[D]"),
+    )
+
+    speaker_emails = np.array(
+        [speaker.email.casefold() for speaker in speakers if speaker.email], dtype=str
+    )
+    emails = table.column("email")
+    is_speaker = np.isin(emails, speaker_emails)
+    speaker_tickets = np.bincount(groups[is_speaker], minlength=group_count)
+    speaker_tickets = np.append(speaker_tickets, speaker_tickets.sum())
+
+    reports = []
+    for index, event in enumerate([*event_names, "all"]):
+        reports.append(
+            EventReport(
+                event=str(event),
+                tickets=int(tickets_per_event[index]),
+                tshirt_sizes=as_dict(sizes, size_counts[index]),
+                levels=as_dict(level_names, level_counts[index]),
+                release_titles=as_dict(titles, title_counts[index]),
+                registrations_per_day=as_dict(days, day_counts[index]),
+                speaker_tickets=int(speaker_tickets[index]),
+            )
+        )
+    unique_speakers = np.unique(speaker_emails)
+    reports[-1].speakers = len(unique_speakers)
+    reports[-1].speakers_with_ticket = int(np.isin(unique_speakers, emails).sum())
+    return reports
@@ -0,0 +1,141 @@
+"""
+Print-ready versions of the images drawn on the badges.
+
+Each image is resampled to the print resolution at the size it is drawn,
+converted once to CMYK with its alpha channel kept as a separate soft mask,
+and cached on disk under the hash of the source file. Drawing the returned
+reader with ``mask="auto"`` embeds a single CMYK image plus its mask per PDF.
+"""
+
+import functools
+import hashlib
+import os
+import pathlib
+import threading
+
+import numpy as np
+from PIL import Image
+from reportlab.lib.utils import ImageReader
+
+from config import settings
+
+here = os.path.dirname(__file__)
+cache_dir = pathlib.Path(here) / ".asset-cache"
+img_dir = pathlib.Path(here) / "img"
+
+
+class CMYKImageReader(ImageReader):
+    """ImageReader for a CMYK image with its transparency in a separate file.
+
+    ReportLab only extracts a soft mask from RGBA/LA images, so the cached
+    alpha channel is attached here once the CMYK data has been read.
+
+    This sets ``ImageReader._dataA``, the private attribute holding the mask
+    reader, as of ReportLab 5.0.1: check it again when upgrading ReportLab.
+    """
+
+    def __init__(self, filename: str, mask_filename: str | None = None) -> None:
+        super().__init__(filename)
+        self._mask_filename = mask_filename
+
+    def getRGBData(self):
+        data = super().getRGBData()
+        if self._mask_filename is not None and self._dataA is None:
+            self._dataA = ImageReader(self._mask_filename)
+        return data
+
+
+def rgb_to_cmyk(image: Image.Image) -> Image.Image:
+    """Convert an RGB image to CMYK with full black generation.
+
+    Pillow's own conversion leaves K empty, which prints blacks as a muddy
+    mix of the three inks.
+    """
+    rgb = np.asarray(image.convert("RGB"), dtype=np.float32) / 255.0
+    k = 1.0 - rgb.max(axis=2)
+    scale = np.where(k < 1.0, 1.0 - k, 1.0)
+    cmy = (1.0 - rgb - k[..., None]) / scale[..., None]
+    cmyk = np.dstack([cmy, k]).clip(0.0, 1.0)
+    return Image.fromarray((cmyk * 255.0 + 0.5).astype(np.uint8), mode="CMYK")
+
+
+def target_size(
+    source_size: tuple[int, int],
+    width: float,
+    height: float,
+    dpi: int,
+) -> tuple[int, int]:
+    """Pixel size of the image once fitted in a ``width`` x ``height`` box.
+
+    The aspect ratio is preserved and images are never upsampled.
+    """
+    source_width, source_height = source_size
+    ratio = min(width / source_width, height / source_height) * dpi / 72.0
+    if ratio >= 1.0:
+        return source_size
+    return max(1, round(source_width * ratio)), max(1, round(source_height * ratio))
+
+
+def save_atomically(image: Image.Image, target: pathlib.Path, **params) -> None:
+    """Save through a temporary file, concurrent builds may share the cache."""
+    tmp = target.with_name(f"{target.name}.{os.getpid()}.tmp")
+    image.save(tmp, **params)
+    os.replace(tmp, target)
+
+
+def content_hash(source: pathlib.Path) -> str:
+    """SHA-1 of the bytes of ``source``, the images are cached under it."""
+    return hashlib.sha1(source.read_bytes()).hexdigest()
+
+
+def prepare(
+    source: pathlib.Path, width: float, height: float, dpi: int
+) -> CMYKImageReader:
+    """Return the cached print version of ``source``, building it if needed."""
+    digest = content_hash(source)
+    with Image.open(source) as image:
+        size = target_size(image.size, width, height, dpi)
+        key = f"{digest}-{size[0]}x{size[1]}"
+        cmyk_file = cache_dir / f"{key}.tiff"
+        mask_file = cache_dir / f"{key}-mask.png"
+
+        if not cmyk_file.exists():
+            cache_dir.mkdir(exist_ok=True)
+            image = image.convert("RGBA").resize(size, Image.Resampling.LANCZOS)
+            alpha = image.getchannel("A")
+            if alpha.getextrema()[0] < 255:
+                save_atomically(alpha, mask_file, format="PNG")
+            save_atomically(
+                rgb_to_cmyk(image), cmyk_file, format="TIFF", compression="tiff_deflate"
+            )
+
+    return CMYKImageReader(
+        str(cmyk_file),
+        str(mask_file) if mask_file.exists() else None,
+    )
+
+
+_lock = threading.Lock()
+
+
+@functools.lru_cache(maxsize=None)
+def print_image(
+    name: str, width: float, height: float, dpi: int | None = None
+) -> CMYKImageReader:
+    """Print-ready reader for ``img/<name>`` drawn in a ``width`` x ``height`` box.
+
+    Args:
+        name: Filename within the ``img`` directory.
+        width: Drawn width, in points.
+        height: Drawn height, in points.
+        dpi: Resolution, defaults to ``settings.printout.dpi``.
+
+    Returns:
+        A reader to pass to ``canvas.drawImage`` with ``mask="auto"``.
+    """
+    dpi = dpi or settings.printout.get("dpi", 300)
+    with _lock:
+        reader = prepare(img_dir / name, width, height, dpi)
+        # decode now, the reader is shared by every canvas of the process
+        reader.getRGBData()
+    return reader
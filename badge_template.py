@@ -0,0 +1,402 @@
+"""
+Declarative badge templates compiled to draw plans.
+
+A template (``badge-template.toml``) lists the elements of each side of the
+badge: images, texts, rectangles and the QR code, with their fonts, colours
+and geometry given as numbers or small expressions. ``compile_template``
+resolves everything that only depends on the layout (section size, title,
+colours, conditions on layout settings) once, and leaves a flat list of
+operations per side. Drawing a badge then only binds the ticket fields.
+"""
+
+import abc
+import ast
+import functools
+import pathlib
+import tomllib
+from collections.abc import Callable
+from typing import Any, Literal
+
+import pydantic
+from reportlab.graphics.barcode import qr
+from reportlab.lib.colors import Color, PCMYKColor, toColor
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.pdfmetrics import stringWidth
+
+from assets import print_image
+from models import TicketModel, roles
+
+Number = float | str
+
+
+class TemplateError(ValueError):
+    pass
+
+
+class Element(pydantic.BaseModel):
+    model_config = pydantic.ConfigDict(extra="forbid")
+
+    type: Literal["image", "text", "rect", "qrcode"]
+    when: str | None = None
+    repeat: str | None = None
+    x: Number = 0
+    y: Number = 0
+    width: Number | None = None
+    height: Number | None = None
+    # image
+    asset: str | None = None
+    preserve_aspect: bool = False
+    # text
+    text: str | None = None
+    font: str | None = None
+    size: Number | None = None
+    max_width: Number | None = None
+    stroke: str | None = None
+    line_width: float | None = None
+    render_mode: int | None = None
+    rotate: float = 0
+    # rect, text and qrcode
+    fill: str = "black"
+    # qrcode
+    payload: str = "{qr_payload}"
+
+
+class BadgeTemplate(pydantic.BaseModel):
+    model_config = pydantic.ConfigDict(extra="forbid")
+
+    colors: dict[str, list[float]] = {}
+    recto: list[Element] = []
+    verso: list[Element] = []
+    ordering: list[Element] = []
+
+
+@functools.cache
+def load_template(path: pathlib.Path) -> BadgeTemplate:
+    """Parse and validate a template file, once per path."""
+    with open(path, "rb") as fp:
+        data = tomllib.load(fp)
+    try:
+        return BadgeTemplate.model_validate(data)
+    except pydantic.ValidationError as e:
+        raise TemplateError(f"{path}: {e}") from e
+
+
+def get_font_size(font_size: float, fontname: str) -> float:
+    """Height of the font in points (ascent minus descent)."""
+    face = pdfmetrics.getFont(fontname).face
+    ascent = (face.ascent * font_size) / 1000.0
+    descent = (face.descent * font_size) / 1000.0
+    return ascent - descent  # descent is negative
+
+
+@functools.lru_cache(maxsize=4096)
+def qr_modules(payload: str, qr_size: float) -> tuple[tuple[float, ...], ...]:
+    """Compute the dark modules of the QR code for ``payload``.
+
+    Computing the QR matrix is the costly part of a verso. The result is a
+    plain tuple of rectangles, so it is cached and shared safely between
+    canvases and threads: reprints and multi-event builds compute it once.
+
+    Args:
+        payload: Text encoded in the QR code.
+        qr_size: Width and height of the QR code, in points.
+
+    Returns:
+        ``(x, y, width, height)`` rectangles relative to the QR code origin.
+    """
+    qr_code = qr.QrCodeWidget(
+        payload, barLevel="H", barWidth=qr_size, barHeight=qr_size
+    )
+    return tuple(
+        (rect.x, rect.y, rect.width, rect.height)
+        for rect in qr_code.draw().contents
+        if rect.fillColor is not None
+    )
+
+
+# expressions: arithmetic, comparisons and boolean logic over variables
+allowed_nodes = (
+    ast.Expression, ast.BinOp, ast.UnaryOp, ast.BoolOp, ast.Compare,
+    ast.Constant, ast.Name, ast.Load,
+    ast.Add, ast.Sub, ast.Mult, ast.Div, ast.FloorDiv, ast.Mod,
+    ast.USub, ast.UAdd, ast.Not, ast.And, ast.Or,
+    ast.Eq, ast.NotEq, ast.Lt, ast.LtE, ast.Gt, ast.GtE,
+)  # fmt: skip
+
+
+def compile_expression(value, static: dict[str, Any]):
+    """Compile a template value to a constant or a function of the badge.
+
+    Numbers are kept as they are. Expressions only using ``static`` names are
+    evaluated right away; the others become a function taking the per-badge
+    variables.
+    """
+    if not isinstance(value, str):
+        return value
+    try:
+        tree = ast.parse(value, mode="eval")
+    except SyntaxError as e:
+        raise TemplateError(f"invalid expression {value!r}") from e
+    for node in ast.walk(tree):
+        if not isinstance(node, allowed_nodes):
+            raise TemplateError(f"unsupported syntax in {value!r}")
+    code = compile(tree, "<template>", "eval")
+    names = {node.id for node in ast.walk(tree) if isinstance(node, ast.Name)}
+    if names <= static.keys():
+        return eval(code, {"__builtins__": {}}, static)
+    return lambda variables: eval(code, {"__builtins__": {}}, variables)
+
+
+def resolve(value, variables: dict[str, Any]):
+    return value(variables) if callable(value) else value
+
+
+def compile_format(text: str, static: dict[str, Any]) -> str | Callable:
+    """Fill the static fields of a format string now, the others per badge."""
+    try:
+        return text.format_map(static)
+    except KeyError:
+        return lambda variables: text.format_map(variables)
+
+
+class Operation(abc.ABC):
+    """A compiled element, drawn with the per-badge variables."""
+
+    def __init__(self, element: Element, static: dict[str, Any], colors) -> None:
+        self.when = compile_expression(element.when, static)
+        self.repeat = compile_expression(element.repeat, static)
+        self.x = compile_expression(element.x, static)
+        self.y = compile_expression(element.y, static)
+        self.width = compile_expression(element.width, static)
+        self.height = compile_expression(element.height, static)
+        self.fill = colors(element.fill)
+
+    def draw(self, canvas, variables: dict[str, Any]) -> None:
+        if self.when is not None and not resolve(self.when, variables):
+            return
+        if self.repeat is None:
+            self.draw_once(canvas, variables)
+            return
+        count = resolve(self.repeat, variables)
+        for i in range(count):
+            self.draw_once(canvas, {**variables, "i": i, "count": count})
+
+    def geometry(self, variables: dict[str, Any]) -> dict[str, Any]:
+        variables = {
+            **variables,
+            "width": resolve(self.width, variables),
+            "height": resolve(self.height, variables),
+        }
+        variables["x"] = resolve(self.x, variables)
+        variables["y"] = resolve(self.y, variables)
+        return variables
+
+    @abc.abstractmethod
+    def draw_once(self, canvas, variables: dict[str, Any]) -> None:
+        """Draw the element once, with ``i`` and ``count`` set when repeated."""
+
+
+class ImageOperation(Operation):
+    def __init__(self, element: Element, static: dict[str, Any], colors) -> None:
+        super().__init__(element, static, colors)
+        if element.asset is None or element.width is None or element.height is None:
+            raise TemplateError("an image needs an asset, a width and a height")
+        self.asset = compile_format(element.asset, static)
+        self.preserve_aspect = element.preserve_aspect
+        # the resolution of the layout, bound by compile_template
+        self.dpi: int | None = None
+
+    def draw_once(self, canvas, variables: dict[str, Any]) -> None:
+        g = self.geometry(variables)
+        canvas.drawImage(
+            print_image(
+                resolve(self.asset, variables), g["width"], g["height"], self.dpi
+            ),
+            g["x"],
+            g["y"],
+            width=g["width"],
+            height=g["height"],
+            preserveAspectRatio=self.preserve_aspect,
+            mask="auto",
+        )
+
+
+class RectOperation(Operation):
+    def __init__(self, element: Element, static: dict[str, Any], colors) -> None:
+        super().__init__(element, static, colors)
+        if element.width is None or element.height is None:
+            raise TemplateError("a rect needs a width and a height")
+
+    def draw_once(self, canvas, variables: dict[str, Any]) -> None:
+        g = self.geometry(variables)
+        canvas.saveState()
+        canvas.setFillColor(self.fill)
+        canvas.rect(g["x"], g["y"], g["width"], g["height"], fill=1, stroke=0)
+        canvas.restoreState()
+
+
+class TextOperation(Operation):
+    def __init__(self, element: Element, static: dict[str, Any], colors) -> None:
+        super().__init__(element, static, colors)
+        if element.text is None or element.font is None or element.size is None:
+            raise TemplateError("a text needs a text, a font and a size")
+        self.text = compile_format(element.text, static)
+        self.font = element.font
+        self.size = compile_expression(element.size, static)
+        self.max_width = compile_expression(element.max_width, static)
+        self.stroke = colors(element.stroke) if element.stroke else None
+        self.line_width = element.line_width
+        self.render_mode = element.render_mode
+        self.rotate = element.rotate
+        # the font_fallbacks of the plan, bound by compile_template
+        self.font_fallbacks: dict[tuple[str, str], str] = {}
+
+    def draw_once(self, canvas, variables: dict[str, Any]) -> None:
+        text = resolve(self.text, variables)
+        font = self.font_fallbacks.get((self.font, text), self.font)
+        size = resolve(self.size, variables)
+        text_width = stringWidth(text, font, size)
+        max_width = resolve(self.max_width, variables)
+        if max_width is not None:
+            # shrink to fit
+            while text_width > max_width:
+                size -= 1
+                text_width = stringWidth(text, font, size)
+        g = self.geometry(
+            {
+                **variables,
+                "text_width": text_width,
+                "font_height": get_font_size(size, font),
+            }
+        )
+
+        canvas.saveState()
+        if self.render_mode is not None:
+            t = canvas.beginText()
+            t.setTextRenderMode(self.render_mode)
+            canvas._code.append(t.getCode())
+        canvas.setFillColor(self.fill)
+        if self.stroke is not None:
+            canvas.setStrokeColor(self.stroke)
+        if self.line_width is not None:
+            canvas.setLineWidth(self.line_width)
+        canvas.setFont(font, size)
+        if self.rotate:
+            canvas.rotate(self.rotate)
+        canvas.drawString(g["x"], g["y"], text)
+        canvas.restoreState()
+
+
+class QrCodeOperation(Operation):
+    def __init__(self, element: Element, static: dict[str, Any], colors) -> None:
+        super().__init__(element, static, colors)
+        if element.size is None:
+            raise TemplateError("a qrcode needs a size")
+        self.size = compile_expression(element.size, static)
+        self.payload = compile_format(element.payload, static)
+
+    def draw_once(self, canvas, variables: dict[str, Any]) -> None:
+        size = resolve(self.size, variables)
+        g = self.geometry({**variables, "size": size})
+        path = canvas.beginPath()
+        for x, y, width, height in qr_modules(resolve(self.payload, variables), size):
+            path.rect(g["x"] + x, g["y"] + y, width, height)
+        canvas.saveState()
+        canvas.setFillColor(self.fill)
+        canvas.drawPath(path, stroke=0, fill=1)
+        canvas.restoreState()
+
+
+operation_types = {
+    "image": ImageOperation,
+    "text": TextOperation,
+    "rect": RectOperation,
+    "qrcode": QrCodeOperation,
+}
+
+
+class Side:
+    """Compiled operations of one side of the badge."""
+
+    def __init__(self, operations: list[Operation], static: dict[str, Any]) -> None:
+        self.operations = operations
+        self.static = static
+
+    def variables(self, ticket: TicketModel, **extra) -> dict[str, Any]:
+        return {
+            **self.static,
+            "display_name": ticket.display_name,
+            "name": ticket.name or "",
+            "reference": ticket.reference,
+            "level": ticket.level,
+            **{role: getattr(ticket, role) for role in roles},
+            "qr_payload": ticket.qr_payload,
+            **extra,
+        }
+
+    def draw(self, canvas, ticket: TicketModel, **extra) -> None:
+        variables = self.variables(ticket, **extra)
+        for operation in self.operations:
+            operation.draw(canvas, variables)
+
+
+class DrawPlan(pydantic.BaseModel):
+    model_config = pydantic.ConfigDict(arbitrary_types_allowed=True)
+
+    recto: Side
+    verso: Side
+    ordering: Side
+    # (template font, text) -> font drawing that text instead, see glyphs.py
+    font_fallbacks: dict[tuple[str, str], str] = {}
+
+
+def compile_template(template: BadgeTemplate, layout) -> DrawPlan:
+    """Resolve the layout dependent parts of ``template``.
+
+    Args:
+        template: Parsed template.
+        layout: ``LayoutParameters`` the badges are drawn with.
+
+    Raises:
+        TemplateError: On an unknown colour or an invalid element.
+    """
+    static = {
+        "W": layout.section_width,
+        "H": layout.section_height,
+        "title": layout.title,
+        "include_title": layout.include_title,
+        "background": layout.background,
+    }
+
+    @functools.cache
+    def colors(name: str) -> Color:
+        if name in template.colors:
+            return PCMYKColor(*template.colors[name])
+        try:
+            return toColor(name)
+        except ValueError:
+            raise TemplateError(f"unknown color {name!r}")
+
+    def compile_side(elements: list[Element]) -> Side:
+        operations = []
+        for element in elements:
+            operation = operation_types[element.type](element, static, colors)
+            if operation.when is None or callable(operation.when):
+                operations.append(operation)
+            elif operation.when:
+                operation.when = None
+                operations.append(operation)
+        return Side(operations, static)
+
+    plan = DrawPlan(
+        recto=compile_side(template.recto),
+        verso=compile_side(template.verso),
+        ordering=compile_side(template.ordering),
+    )
+    for side in (plan.recto, plan.verso, plan.ordering):
+        for operation in side.operations:
+            if isinstance(operation, TextOperation):
+                operation.font_fallbacks = plan.font_fallbacks
+            elif isinstance(operation, ImageOperation):
+                operation.dpi = layout.dpi
+    return plan
@@ -0,0 +1,144 @@
+"""
+Build the badges of several events in one process.
+
+Events are rendered concurrently on a thread pool and share everything that
+is expensive to set up: the registered fonts, the decoded print images
+(``assets.print_image``) and the QR code modules of the template's qrcode
+element (``badge_template.qr_modules``).
+
+An events file is TOML with one ``[[events]]`` table per event::
+
+    [[events]]
+    name = "pycon-ireland-2024"
+    tickets = ["pycon-ireland-2024-tickets.json"]
+    speakers = ["pycon-ireland-2024-speakers.json"]
+    title = "Pycon Ireland 2024"
+    background = "pycon_ireland_2024_banner.png"
+    paper_size = "A4"
+    template = "badge-template.toml"
+
+Only ``name`` and ``tickets`` are required, the other print settings default
+to ``settings.toml``. The ``where`` queries of every event are compiled
+(``compile_queries``) before any event is rendered.
+"""
+
+import pathlib
+import time
+import tomllib
+from concurrent.futures import ThreadPoolExecutor
+
+import pydantic
+
+from build_badge import (
+    LayoutParameters,
+    apply_email_mapping,
+    create_badges,
+    inject_speakers_in_tickets,
+    load_speakers,
+    load_tickets,
+    register_fonts,
+)
+from ticket_query import Filter, QueryError, compile_query
+from ticket_table import TicketTable
+
+
+class EventConfig(pydantic.BaseModel):
+    name: str
+    tickets: list[pathlib.Path]
+    speakers: list[pathlib.Path] = []
+    output: pathlib.Path | None = None
+    where: list[str] = []
+    title: str | None = None
+    include_title: bool | None = None
+    background: str | None = None
+    paper_size: str | None = None
+    template: pathlib.Path | None = None
+
+    @property
+    def output_filename(self) -> str:
+        return str(self.output or f"{self.name}-badges.pdf")
+
+
+class EventResult(pydantic.BaseModel):
+    name: str
+    output: str
+    badges: int
+    seconds: float
+
+
+def load_events(events_file: pathlib.Path) -> list[EventConfig]:
+    """Parse an events TOML file."""
+    with open(events_file, "rb") as fp:
+        data = tomllib.load(fp)
+    return pydantic.TypeAdapter(list[EventConfig]).validate_python(
+        data.get("events", [])
+    )
+
+
+def compile_queries(events: list[EventConfig], timezone: str) -> list[Filter | None]:
+    """Compile the ``where`` conditions of every event.
+
+    Raises:
+        QueryError: If a query is invalid, the message names the event.
+    """
+    queries = []
+    for event in events:
+        if not event.where:
+            queries.append(None)
+            continue
+        try:
+            queries.append(
+                compile_query(
+                    " and ".join(f"({condition})" for condition in event.where),
+                    timezone,
+                )
+            )
+        except QueryError as e:
+            raise QueryError(f"{event.name}: {e}") from e
+    return queries
+
+
+def build_event(event: EventConfig, query: Filter | None) -> EventResult:
+    """Load, filter and render the badges of a single event."""
+    start = time.perf_counter()
+
+    speakers = apply_email_mapping(load_speakers(event.speakers))
+    tickets = inject_speakers_in_tickets(load_tickets(event.tickets), speakers)
+    if query is not None:
+        table = TicketTable(tickets)
+        tickets = table.select(query(table))
+
+    if tickets:
+        layout = LayoutParameters(
+            output_filename=event.output_filename,
+            paper_size=event.paper_size,
+            background=event.background,
+            title=event.title,
+            include_title=event.include_title,
+            template=event.template,
+        )
+        create_badges(sorted(tickets, key=lambda ticket: ticket.reference), layout)
+
+    return EventResult(
+        name=event.name,
+        output=event.output_filename,
+        badges=len(tickets),
+        seconds=time.perf_counter() - start,
+    )
+
+
+def build_events(
+    events: list[EventConfig],
+    queries: list[Filter | None],
+    workers: int | None = None,
+) -> list[EventResult]:
+    """Render every event concurrently, results keep the events order.
+
+    Args:
+        events: Events to render.
+        queries: Compiled ``where`` filter of each event, see ``compile_queries``.
+        workers: Number of events rendered at the same time.
+    """
+    register_fonts()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(build_event, events, queries))
@@ -1,42 +1,52 @@
 import datetime
 import enum
 import functools
+import io
 import json
 import os
 import pathlib
+import time
 import typing
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
 
 import pandas as pd
-import pytz
 import reportlab.rl_config
 import typer as typer
 from pydantic import TypeAdapter
-from reportlab.graphics import renderPDF
-from reportlab.graphics.barcode import qr
-from reportlab.graphics.shapes import Drawing
-from reportlab.lib.colors import PCMYKColor, black, white
 from reportlab.lib.pagesizes import A4, A5, landscape, portrait
 from reportlab.lib.units import cm
 from reportlab.pdfbase import pdfmetrics
-from reportlab.pdfbase.pdfmetrics import stringWidth
 from reportlab.pdfbase.ttfonts import TTFont
 from reportlab.pdfgen import canvas
 
 from alignment_guidelines import draw_guidelines, draw_margins
+from badge_template import DrawPlan, compile_template, load_template
+from columnar import is_snapshot, read_tickets, write_snapshot
 from config import settings
-from get_tickets import get_tickets
-from models import SpeakerModel, TicketModel
+from decoders import get_decoder
+from get_tickets import PageNotCached, TitoSession, get_checkins, get_tickets
+from glyphs import assign_fonts, fallback_font_name, report_uncovered
+from http_trace import HttpTrace
+from models import SpeakerModel, TicketModel, roles
+from page_cache import PageCache
+from roles import RoleResolver
+from ticket_query import QueryError, compile_query
+from ticket_table import TicketTable
 from utils import make_batches, two_per_page
 
 here = os.path.dirname(__file__)
 reportlab.rl_config.warnOnMissingFontGlyphs = 0
 
 
+@functools.cache
 def register_fonts() -> None:
     """Register the TrueType fonts used for badge rendering.
 
     Loads the fonts configured in settings from the local ``fonts`` directory
-    and registers them with ReportLab so they can be used when drawing text.
+    and registers them with ReportLab so they can be used when drawing text,
+    ``fallback_fonts`` under their file stem (see ``glyphs``). Fonts are
+    parsed once per process, later calls do nothing.
 
     Raises:
         FileNotFoundError: If any configured font file cannot be found.
@@ -54,11 +64,26 @@ def register_fonts() -> None:
     pdfmetrics.registerFont(
         TTFont("nameFont", os.path.join(here, "fonts", settings.fonts.name_font))
     )
+    for font_file in settings.fonts.get("fallback_fonts", []):
+        pdfmetrics.registerFont(
+            TTFont(
+                fallback_font_name(font_file), os.path.join(here, "fonts", font_file)
+            )
+        )
 
 
-irish_green = PCMYKColor(71, 0, 72, 40)
-irish_orange = PCMYKColor(0, 43, 91, 0)
-banner_blue = PCMYKColor(98, 82, 0, 44)
+def template_path(template: str | pathlib.Path | None = None) -> pathlib.Path:
+    """Locate a badge template, by default ``settings.printout.template``.
+
+    A relative path is looked up in the current directory, then next to this
+    script.
+    """
+    path = pathlib.Path(
+        template or settings.printout.get("template", "badge-template.toml")
+    )
+    if not path.is_absolute() and not path.exists():
+        path = pathlib.Path(here) / path
+    return path
 
 
 class LayoutParameters:
@@ -71,9 +96,25 @@ class LayoutParameters:
         output_filename: Name of the output PDF file. If ``None``, a timestamped
             filename is generated unless ``settings.printout.debug`` is enabled,
             in which case ``tickets.pdf`` is used.
+        paper_size: Paper size name, defaults to ``settings.printout.paper_size``.
+        background: Banner image in ``img``, defaults to
+            ``settings.printout.background``.
+        title: Event title, defaults to ``settings.printout.title``.
+        include_title: Whether to print the title, defaults to
+            ``settings.printout.include_title``.
+        template: Badge template file (see ``badge-template.toml``), defaults
+            to ``settings.printout.template``, see ``template_path``.
+        dpi: Resolution the images are resampled to, defaults to
+            ``settings.printout.dpi``; previews use a screen resolution.
 
     Attributes:
         paper_size: The selected ReportLab page size (e.g., A4, A5).
+        background: Banner image drawn at the top of the recto.
+        title: Event title.
+        include_title: Whether the title is printed under the banner.
+        template: Path of the badge template.
+        dpi: Resolution of the images.
+        plan: The template compiled for this layout, built on first use.
         canvas: The ReportLab canvas used to draw the PDF.
         width: Page width in points.
         height: Page height in points.
@@ -85,7 +126,24 @@ class LayoutParameters:
         section_width: Width of a single badge section (recto/verso).
     """
 
-    def __init__(self, output_filename: str | None = None) -> None:
+    def __init__(
+        self,
+        output_filename: str | None = None,
+        paper_size: str | None = None,
+        background: str | None = None,
+        title: str | None = None,
+        include_title: bool | None = None,
+        template: str | pathlib.Path | None = None,
+        dpi: int | None = None,
+    ) -> None:
+        self.background = background or settings.printout.background
+        self.dpi = dpi or settings.printout.get("dpi", 300)
+        self.title = title or settings.printout.title
+        if include_title is None:
+            include_title = settings.printout.include_title
+        self.include_title = include_title
+        self.template = template_path(template)
+
         if output_filename is None:
             if settings.printout.debug:
                 output_filename = "tickets.pdf"
@@ -95,7 +153,7 @@ class LayoutParameters:
 
         self.paper_size = getattr(
             reportlab.lib.pagesizes,
-            settings.printout.paper_size,
+            paper_size or settings.printout.paper_size,
             A4,
         )
         if self.paper_size == A4:
@@ -129,142 +187,34 @@ class LayoutParameters:
         # section means recto or verso
         self.section_width = self.width / 2.0 - self.margin
 
+    @functools.cached_property
+    def plan(self) -> DrawPlan:
+        return compile_template(load_template(self.template), self)
 
-def get_font_size(font_size: int, fontname: str) -> int:
-    """Compute the font height in points for a given font face and size.
-
-    Args:
-        font_size: Requested font size in points.
-        fontname: Registered ReportLab font name.
-
-    Returns:
-        The computed font height in points (ascent minus descent).
-    """
-    face = pdfmetrics.getFont(fontname).face
-    ascent = (face.ascent * font_size) / 1000.0
-    descent = (face.descent * font_size) / 1000.0
-    height = ascent - descent  # <-- descent it's negative
-    return height
-
-
-def write_qr_code(delegate: TicketModel, layout) -> None:
-    """Draw a QR code for the given attendee on the current section.
 
-    The QR encodes "name <email>" and has the conference logo overlaid in the
-    center to improve visual identity.
-
-    Args:
-        delegate: The attendee/ticket data used to populate the QR code.
-        layout: The active layout/canvas context.
-    """
-    qr_code = qr.QrCodeWidget(
-        "{} <{}>".format(delegate.name, delegate.email), barLevel="H"
-    )
-    bounds = qr_code.getBounds()
-    qr_width = bounds[2] - bounds[0]
-    qr_height = bounds[3] - bounds[1]
-    qr_size = 200.0
-    d = Drawing(
-        qr_size,
-        qr_size,
-        transform=[qr_size / qr_width, 0, 0, qr_size / qr_height, 0, 0],
-    )
-    d.add(qr_code)
-    renderPDF.draw(
-        d,
-        layout.canvas,
-        (layout.section_width - qr_size) / 2.0,
-        (layout.section_height - qr_size) / 2.0,
-    )
-
-    logo_width = 60
-    logo_height = 60
-    layout.canvas.drawImage(
-        os.path.join(here, "img", "logo_in_qrcode.png"),
-        (layout.section_width - logo_width) / 2.0,
-        (layout.section_height - logo_height) / 2.0,
-        width=logo_width,
-        height=logo_height,
-        mask="auto",
-    )
-
-
-def write_ticket_num(ticket_reference: str, layout) -> None:
-    """Render the ticket reference number on the verso section.
-
-    The reference is drawn once horizontally and once rotated near the fold
-    line so it remains visible after cutting/folding.
+def write_verso(attendee: TicketModel, ticket_index: int | None, layout) -> None:
+    """Compose the verso: QR code, reference, and ordering number.
 
     Args:
-        ticket_reference: The ticket reference string to display.
+        attendee: The attendee/ticket information.
+        ticket_index: Position of the ticket in the print order, or None to
+            leave the ordering number out.
         layout: The active layout/canvas context.
     """
-    layout.canvas.saveState()
-
-    t = layout.canvas.beginText()
-    t.setTextRenderMode(2)
-    layout.canvas._code.append(t.getCode())
-
-    # ticket num
-    layout.canvas.setStrokeColor(black)
-    layout.canvas.setFillColor(black)
-    layout.canvas.setLineWidth(0.5)
-
-    font_size = 28
-    layout.canvas.setFont("reference", font_size)
-    text_w = stringWidth(ticket_reference, "reference", font_size)
+    layout.plan.verso.draw(layout.canvas, attendee)
+    if ticket_index is not None:
+        write_ordering_num(attendee, ticket_index, layout)
 
-    y_pos = layout.section_height - 20
-    layout.canvas.drawString(0, y_pos, ticket_reference)
-    # write again near fold line
-    layout.canvas.rotate(-90)
-    layout.canvas.drawString(-text_w, layout.section_width - 20, ticket_reference)
-    layout.canvas.restoreState()
 
-
-def write_ordering_num(order_num, layout):
+def write_ordering_num(attendee: TicketModel, order_num: int, layout) -> None:
     """Draw the ordering/index number for the ticket on the verso.
 
-    Args:
-        order_num: The ticket position/index to display.
-        layout: The active layout/canvas context.
-    """
-    layout.canvas.saveState()
-    t = layout.canvas.beginText()
-    t.setTextRenderMode(2)
-    layout.canvas._code.append(t.getCode())
-
-    # ticket ordering index
-    layout.canvas.setStrokeColor(black)
-    layout.canvas.setFillColor(black)
-    layout.canvas.setLineWidth(0.5)
-
-    order_num = str(order_num)
-    font_size = 28
-    layout.canvas.setFont("reference", font_size)
-    text_w = stringWidth(order_num, "reference", font_size)
-
-    layout.canvas.drawString(
-        layout.section_width - text_w, layout.section_height - 20, order_num
-    )
-    x_pos = -(layout.section_height + text_w) / 2.0
-    layout.canvas.rotate(-90)
-    layout.canvas.drawString(x_pos, layout.section_width - 20, order_num)
-    layout.canvas.restoreState()
-
-
-def write_verso(attendee: TicketModel, ticket_index: int, layout) -> None:
-    """Compose the verso: QR code, reference, and ordering number.
-
     Args:
         attendee: The attendee/ticket information.
-        ticket_index: Position of the ticket in the current batch.
+        order_num: The ticket position/index to display.
         layout: The active layout/canvas context.
     """
-    write_qr_code(attendee, layout)
-    # ticket num
-    write_ticket_num(attendee.reference, layout)
-    write_ordering_num(ticket_index, layout)
+    layout.plan.ordering.draw(layout.canvas, attendee, order=order_num)
 
 
 def write_recto(delegate: TicketModel, layout):
@@ -274,112 +224,7 @@ def write_recto(delegate: TicketModel, layout):
         delegate: The attendee/ticket information.
         layout: The active layout/canvas context.
     """
-    t = layout.canvas.beginText()
-    t.setTextRenderMode(2)
-    layout.canvas._code.append(t.getCode())
-
-    # banner
-    remove_width = 40
-    banner_width = layout.section_width - remove_width
-    banner_height = layout.section_height * 0.3333
-    layout.canvas.drawImage(
-        os.path.join(here, "img", settings.printout.background),
-        remove_width // 2,
-        layout.section_height - banner_height,
-        width=banner_width,
-        height=banner_height,
-        preserveAspectRatio=True,
-        mask="auto",
-    )
-
-    # Conference name and year
-    layout.canvas.setFont("conferenceFont", 32)
-    layout.canvas.setStrokeColor(white)
-    layout.canvas.setFillColor(irish_green)
-    layout.canvas.setLineWidth(1.3)
-
-    if settings.printout.include_title:
-        event_title = settings.printout.title
-        text_w = stringWidth(event_title, "conferenceFont", 32)
-        x_pos = (layout.section_width - text_w) / 2
-        layout.canvas.drawString(x_pos, layout.section_height - 64, event_title)
-
-    # logo tri snake
-    # logo_width = 300 / 2
-    # logo_height = 240 / 2
-    logo_height = 960 * 0.5
-    logo_width = 720 * 0.5
-    # logo_width = logo_height = 110
-    layout.canvas.drawImage(
-        # os.path.join(here, "img", "tri-snakes_transparent_small_square.png"),
-        os.path.join(here, "img", "tri-snake-jentic.png"),
-        (layout.section_width - logo_width) / 2.0,
-        (layout.section_height - logo_height) / 2.0 - 30,
-        width=logo_width,
-        height=logo_height,
-        preserveAspectRatio=True,
-        mask="auto",
-    )
-
-    # delegate name
-    layout.canvas.setStrokeColor(black)
-    layout.canvas.setFillColor(irish_green)
-    layout.canvas.setLineWidth(0.7)
-
-    font_size = 36
-    fontname = "nameFont"
-
-    layout.canvas.setFont(fontname, font_size)
-    text_w = stringWidth(delegate.display_name, fontname, font_size)
-    # resize as necessary to fit
-    while text_w > layout.section_width:
-        font_size -= 1
-        layout.canvas.setFont(fontname, font_size)
-        text_w = stringWidth(delegate.display_name, fontname, font_size)
-    x_pos = (layout.section_width - text_w) / 2
-
-    height = get_font_size(font_size, fontname)
-    y_pos = layout.section_height * 0.25 - height / 4.0
-    layout.canvas.drawString(x_pos, y_pos, delegate.display_name)
-
-    # rectangle bottom
-    border_thickness = layout.section_height / 6.0
-    if delegate.exhibitor:
-        layout.canvas.rect(
-            0, 0, layout.section_width, border_thickness, fill=1, stroke=0
-        )
-        layout.canvas.setStrokeColor(black)
-        layout.canvas.setFillColor(white)
-        layout.canvas.setLineWidth(0.7)
-
-        font_size = 32
-        layout.canvas.setFont("nameFont", font_size)
-        text_w = stringWidth("EXHIBITOR", "nameFont", font_size)
-        x_pos = (layout.section_width - text_w) / 2
-        layout.canvas.drawString(x_pos, 25, "EXHIBITOR")
-
-    else:
-        if delegate.speaker:
-            layout.canvas.setFillColor(irish_orange)
-        else:
-            layout.canvas.setFillColor(banner_blue)
-        layout.canvas.rect(
-            0, 0, layout.section_width, border_thickness, fill=1, stroke=0
-        )
-
-        # level
-        logo_width = logo_height = 30
-        power_size = logo_width * delegate.level + 5 * (delegate.level - 1)
-        power_start_x = (layout.section_width - power_size) / 2.0
-        for i in range(delegate.level):
-            layout.canvas.drawImage(
-                os.path.join(here, "img", "Psf-Logo.png"),
-                power_start_x + (logo_width + 5) * i,
-                (layout.section_height / 6 - logo_height) / 2.0,
-                width=logo_width,
-                height=logo_height,
-                mask="auto",
-            )
+    layout.plan.recto.draw(layout.canvas, delegate)
 
 
 def draw_page_borders(layout):
@@ -417,140 +262,167 @@ def create_badges(data, layout):
     """Build the full badge PDF for the provided ticket data.
 
     Iterates through tickets in page-sized batches, drawing verso and recto for
-    each badge, and writes out the resulting PDF to ``layout.canvas``.
+    each badge, and writes out the resulting PDF to ``layout.canvas``. The
+    texts are checked against the fonts first, see ``glyphs``.
 
     Args:
-        data: Iterable of ``TicketModel`` instances to render.
+        data: List of ``TicketModel`` instances to render.
         layout: Configured ``LayoutParameters`` with an active canvas.
     """
-    for batch in make_batches(layout.ordering_function(data), layout.badge_per_sheet):
-        if settings.printout.show_guidelines:
-            draw_margins(layout)
-            draw_guidelines(layout)
-
-        draw_cutlines(layout)
-        draw_page_borders(layout)
-
-        layout.canvas.translate(0, layout.height_offset)
-        for ticket_index, attendee in batch:
-            write_verso(attendee, ticket_index, layout)
-            layout.canvas.translate(layout.section_width, 0)
-            write_recto(attendee, layout)
-            layout.canvas.translate(-layout.section_width, -layout.height_offset)
-        layout.canvas.showPage()  # finish the page, next statements should go next page
-    layout.canvas.save()
+    report_uncovered(assign_fonts(data, layout.plan))
+    draw_badges(layout.ordering_function(data), layout)
 
 
-def create_empty_badges(data, layout) -> None:
-    """Build badges without verso (blank tickets) using the provided data.
+def draw_badges(ordered, layout):
+    """Draw badges already in imposition order and save the PDF.
 
     Args:
-        data: Iterable of ``TicketModel`` (or placeholders) used only for recto.
+        ordered: Iterable of ``(ticket_index, TicketModel)`` pairs, in the
+            order they go on the sheets (see ``layout.ordering_function``).
         layout: Configured ``LayoutParameters`` with an active canvas.
     """
-    for batch in make_batches(layout.ordering_function(data), layout.badge_per_sheet):
-        if settings.printout.show_guidelines:
-            draw_margins(layout)
-            draw_guidelines(layout)
-
-        draw_cutlines(layout)
-        draw_page_borders(layout)
-
-        layout.canvas.translate(0, layout.height_offset)
-        for ticket_index, attendee in batch:
-            layout.canvas.translate(layout.section_width, 0)
-            write_recto(attendee, layout)
-            layout.canvas.translate(-layout.section_width, -layout.height_offset)
-        layout.canvas.showPage()  # finish the page, next statements should go next page
+    for batch in make_batches(ordered, layout.badge_per_sheet):
+        draw_sheet(batch, layout)
     layout.canvas.save()
 
 
-class DateTimeEncoder(json.JSONEncoder):
-    """JSON encoder that serializes ``datetime`` objects as ISO-8601 strings."""
-
-    def default(self, obj):
-        if isinstance(obj, (datetime.datetime,)):
-            return obj.isoformat()
+def draw_sheet_decorations(layout) -> None:
+    """Draw the guidelines, cut lines and borders of a sheet."""
+    if settings.printout.show_guidelines:
+        draw_margins(layout)
+        draw_guidelines(layout)
 
+    draw_cutlines(layout)
+    draw_page_borders(layout)
 
-app = typer.Typer()
 
+def draw_sheet(
+    batch,
+    layout,
+    verso: bool = True,
+    draw_verso: Callable[[TicketModel, int, typing.Any], None] = write_verso,
+    draw_recto: Callable[[TicketModel, typing.Any], None] = write_recto,
+    draw_decorations: Callable[[typing.Any], None] = draw_sheet_decorations,
+) -> None:
+    """Draw one sheet of badges and move the canvas to the next page.
 
-def predicate_updated_from(
-    ticket: TicketModel,
-    when: datetime.datetime,
-) -> bool:
-    """Return True if the ticket was updated on/after the given datetime.
+    Blank badges (``TicketModel.make_empty``, without a reference) only get
+    their recto, so they can pad a sheet of real badges. The sides and the
+    decorations are drawn by callbacks, so that badges drawn ahead into
+    forms are placed on the same sheet layout.
 
     Args:
-        ticket: Ticket to evaluate.
-        when: Cutoff datetime (timezone-aware recommended).
-
-    Returns:
-        True if ``ticket.updated_at >= when``.
+        batch: ``(ticket_index, TicketModel)`` pairs of the sheet.
+        layout: Configured ``LayoutParameters`` with an active canvas.
+        verso: Whether the versos are drawn at all.
+        draw_verso: Draws the verso of a ticket with its ordering number,
+            ``write_verso`` by default.
+        draw_recto: Draws the recto of a ticket, ``write_recto`` by default.
+        draw_decorations: Draws the guidelines, cut lines and borders.
     """
-    return ticket.updated_at >= when
+    draw_decorations(layout)
 
+    layout.canvas.translate(0, layout.height_offset)
+    for ticket_index, attendee in batch:
+        if verso and attendee.reference:
+            draw_verso(attendee, ticket_index, layout)
+        layout.canvas.translate(layout.section_width, 0)
+        draw_recto(attendee, layout)
+        layout.canvas.translate(-layout.section_width, -layout.height_offset)
+    layout.canvas.showPage()  # finish the page, next statements should go next page
 
-def predicate_created_from(
-    ticket: TicketModel,
-    when: datetime.datetime,
-) -> bool:
-    """Return True if the ticket was created on/after the given datetime.
 
-    Args:
-        ticket: Ticket to evaluate.
-        when: Cutoff datetime (timezone-aware recommended).
+def create_empty_badges(data, layout) -> None:
+    """Build badges without verso (blank tickets) using the provided data.
 
-    Returns:
-        True if ``ticket.created_at >= when``.
+    Blank badges are all alike: every distinct recto is drawn once into a
+    form, as are the guidelines, cut lines and borders of a sheet, and the
+    forms are stamped on every sheet. Drawing N blanks costs about as much as
+    drawing one, and each page only adds a few form references to the PDF.
+
+    Args:
+        data: List of ``TicketModel`` (or placeholders) used only for recto.
+        layout: Configured ``LayoutParameters`` with an active canvas.
     """
-    return ticket.created_at >= when
+    # short form names: every page lists them in its resources
+    forms = {}
+    for ticket in data:
+        forms.setdefault(ticket.render_hash, (f"r{len(forms)}", ticket))
+    report_uncovered(
+        assign_fonts([ticket for _, ticket in forms.values()], layout.plan)
+    )
+    for name, ticket in forms.values():
+        layout.canvas.beginForm(name)
+        write_recto(ticket, layout)
+        layout.canvas.endForm()
+    layout.canvas.beginForm("s")
+    draw_sheet_decorations(layout)
+    layout.canvas.endForm()
 
+    for batch in make_batches(layout.ordering_function(data), layout.badge_per_sheet):
+        draw_sheet(
+            batch,
+            layout,
+            verso=False,
+            draw_recto=lambda ticket, layout: layout.canvas.doForm(
+                forms[ticket.render_hash][0]
+            ),
+            draw_decorations=lambda layout: layout.canvas.doForm("s"),
+        )
+    layout.canvas.save()
 
-def predicate_created_on(
-    ticket: TicketModel,
-    when: datetime.datetime,
-) -> bool:
-    """Return True if the ticket was created on the same calendar day.
 
-    Args:
-        ticket: Ticket to evaluate.
-        when: Reference datetime.
+class DateTimeEncoder(json.JSONEncoder):
+    """JSON encoder that serializes ``datetime`` objects as ISO-8601 strings."""
 
-    Returns:
-        True if ``ticket.created_at.date() == when.date()``.
-    """
-    return ticket.created_at.date() == when.date()
+    def default(self, obj):
+        if isinstance(obj, (datetime.datetime,)):
+            return obj.isoformat()
+
+
+app = typer.Typer()
 
 
 def inject_speakers_in_tickets(
     tickets: list[TicketModel],
     speakers: list[SpeakerModel],
 ) -> list[TicketModel]:
-    """Mark tickets as speakers/exhibitors based on metadata.
+    """Set the roles of the tickets (speaker, exhibitor, volunteer...).
 
-    A ticket is marked as a speaker if its email matches a provided speaker
-    email. It is marked as exhibitor if the release title contains "exhibitor".
+    Roles follow the rules of ``settings.toml`` (see ``roles``); a ticket is
+    a speaker when its email matches one of ``speakers``.
 
     Args:
         tickets: Original list of tickets.
         speakers: Known speakers (typically from Sessionize or similar).
 
     Returns:
-        A new list of tickets with ``speaker`` and ``exhibitor`` flags updated.
+        The tickets with their role flags updated; only the tickets whose
+        roles changed are copies.
     """
-    local_speakers = {speaker.email for speaker in speakers}
+    return RoleResolver.from_settings(speakers).apply(tickets)
 
-    return [
-        ticket.model_copy(
-            update={
-                "speaker": ticket.email in local_speakers,
-                "exhibitor": "exhibitor" in ticket.release_title.lower(),
-            }
-        )
-        for ticket in tickets
-    ]
+
+def apply_email_mapping(speakers: list[SpeakerModel]) -> list[SpeakerModel]:
+    """Replace Sessionize emails by their Tito counterpart.
+
+    The mapping is read from ``emails.mapping.csv``, see the README.
+
+    Args:
+        speakers: Speakers as loaded from the Sessionize export.
+
+    Returns:
+        The same speakers, with their email remapped in place.
+    """
+    mapping_df: pd.DataFrame = pd.read_csv("emails.mapping.csv")
+    mapping_df["tito_email"] = mapping_df["tito_email"].str.lower()
+    mapping_df["sessionize_email"] = mapping_df["sessionize_email"].str.lower()
+
+    for index, row in mapping_df.iterrows():
+        for speaker in speakers:
+            if speaker.email == row.sessionize_email:
+                speaker.email = row.tito_email
+    return speakers
 
 
 @app.command(name="build")
@@ -559,6 +431,7 @@ def cmd_build_new(
     speaker_files: typing.Annotated[
         list[pathlib.Path], typer.Option("--speakers", default_factory=list)
     ],
+    where: typing.Annotated[list[str], typer.Option("--where", default_factory=list)],
     output: typing.Annotated[pathlib.Path | None, typer.Option("--output")] = None,
     updated_from: typing.Annotated[
         datetime.datetime | None, typer.Option("--updated-from")
@@ -574,16 +447,26 @@ def cmd_build_new(
         bool, typer.Option("--fake-data/--no-fake-data")
     ] = False,
     limit: typing.Annotated[int | None, typer.Option("--limit")] = None,
+    reference_mapping_file: typing.Annotated[
+        pathlib.Path | None, typer.Option("--reference-mapping")
+    ] = None,
+    timezone: typing.Annotated[str, typer.Option("--timezone")] = settings.printout.get(
+        "timezone", "Europe/Brussels"
+    ),
+    low_memory: typing.Annotated[bool, typer.Option("--low-memory")] = False,
+    run_size: typing.Annotated[int, typer.Option("--run-size")] = 10_000,
 ):
     """Build badges from ticket JSON files, with optional filtering.
 
     This is the primary command used to generate the badges PDF from one or more
     exported JSON files. Optionally merges speaker information, filters by
-    creation/update dates, and can limit the number of badges.
+    creation/update dates or ``--where`` queries (see ``ticket_query``), and
+    can limit the number of badges. All the filters are combined.
 
     Args:
         ticket_files: One or more JSON files containing ``TicketModel`` entries.
         speaker_files: Optional JSON files containing ``SpeakerModel`` entries.
+        where: Queries selecting the tickets, e.g. ``role = speaker``.
         output: Output PDF filename. If None, uses default naming.
         updated_from: Only include tickets updated on/after this datetime.
         created_from: Only include tickets created on/after this datetime.
@@ -591,48 +474,72 @@ def cmd_build_new(
         build: When True, generate the PDF; otherwise, only prepares data.
         fake_data: When True, use local fixture data instead of files.
         limit: If provided, limit the number of tickets processed.
+        reference_mapping_file: Optional JSON old → new reference mapping
+            applied at load time.
+        timezone: Timezone of the dates given without an offset.
+        low_memory: Stream the tickets through an external sort (see
+            ``external_sort``) instead of loading them all, for huge builds.
+        run_size: Tickets held in memory at a time with ``low_memory``.
     """
-    if fake_data:
-        from fixture_attendees import fake_data as tickets
-    else:
-        tickets = load_tickets(ticket_files)
-        speakers = load_speakers(speaker_files)
-
-        mapping_df: pd.DataFrame = pd.read_csv("emails.mapping.csv")
-        mapping_df["tito_email"] = mapping_df["tito_email"].str.lower()
-        mapping_df["sessionize_email"] = mapping_df["sessionize_email"].str.lower()
-
-        for index, row in mapping_df.iterrows():
-            for speaker in speakers:
-                if speaker.email == row.sessionize_email:
-                    # print(speaker, row)
-                    speaker.email = row.tito_email
-
-        tickets = inject_speakers_in_tickets(tickets, speakers)
+    conditions = list(where)
+    if updated_from:
+        conditions.append(f"updated_at >= {updated_from.isoformat()}")
+    if created_from:
+        conditions.append(f"created_at >= {created_from.isoformat()}")
+    if created_on:
+        conditions.append(f"created_at = {created_on.date().isoformat()}")
+
+    query = None
+    if conditions:
+        try:
+            query = compile_query(
+                " and ".join(f"({condition})" for condition in conditions),
+                timezone,
+            )
+        except QueryError as e:
+            typer.echo(f"invalid --where: {e}", err=True)
+            raise typer.Exit(code=1)
 
-    if len(list(filter(None, [updated_from, created_from, created_on]))) > 1:
-        typer.echo(
-            "--updated-from, --created-from, --created-on are mutually exclusive"
-        )
-        typer.Exit()
+    def select(tickets: list[TicketModel]) -> list[TicketModel]:
+        if query is None:
+            return tickets
+        table = TicketTable(tickets)
+        return table.select(query(table))
 
-    predicate = None
-    timezone = pytz.timezone("Europe/Brussels")
+    reference_mapping = load_reference_mapping(reference_mapping_file)
 
-    if updated_from:
-        when = updated_from.astimezone(timezone)
-        predicate = functools.partial(predicate_updated_from, when=when)
+    if low_memory and build and not fake_data:
+        from external_sort import build_low_memory
 
-    if created_from:
-        when = created_from.astimezone(timezone)
-        predicate = functools.partial(predicate_created_from, when=when)
+        speakers = apply_email_mapping(load_speakers(speaker_files))
+        resolver = RoleResolver.from_settings(speakers)
+        layout = LayoutParameters(output_filename=str(output) if output else None)
+        register_fonts()
 
-    if created_on:
-        when = created_on.astimezone(timezone)
-        predicate = functools.partial(predicate_created_on, when=when)
+        def prepare(chunk: list[TicketModel]) -> list[TicketModel]:
+            chunk = select(resolver.apply(remap_references(chunk, reference_mapping)))
+            # fonts are assigned by text, before the chunk is spilled
+            report_uncovered(assign_fonts(chunk, layout.plan))
+            return chunk
+
+        count = build_low_memory(
+            ticket_files,
+            prepare,
+            layout,
+            limit,
+            run_size,
+        )
+        if not count:
+            print("Nothing to do")
+        return
 
-    if predicate:
-        tickets = [ticket for ticket in tickets if predicate(ticket)]
+    if fake_data:
+        from fixture_attendees import fake_data as tickets
+    else:
+        tickets = load_tickets(ticket_files, reference_mapping)
+        speakers = apply_email_mapping(load_speakers(speaker_files))
+        tickets = inject_speakers_in_tickets(tickets, speakers)
+    tickets = select(tickets)
 
     if isinstance(limit, int):
         tickets = tickets[:limit]
@@ -659,6 +566,84 @@ def cmd_build_new(
             print("Nothing to do")
 
 
+@app.command(name="watch")
+def cmd_watch(
+    ticket_files: typing.Annotated[list[pathlib.Path], typer.Argument()],
+    speaker_files: typing.Annotated[
+        list[pathlib.Path], typer.Option("--speakers", default_factory=list)
+    ],
+    where: typing.Annotated[list[str], typer.Option("--where", default_factory=list)],
+    output: typing.Annotated[pathlib.Path, typer.Option("--output")] = pathlib.Path(
+        "tickets-watch.pdf"
+    ),
+    reference_mapping_file: typing.Annotated[
+        pathlib.Path | None, typer.Option("--reference-mapping")
+    ] = None,
+    timezone: typing.Annotated[str, typer.Option("--timezone")] = settings.printout.get(
+        "timezone", "Europe/Brussels"
+    ),
+    interval: typing.Annotated[float, typer.Option("--interval")] = 1.0,
+    debounce: typing.Annotated[float, typer.Option("--debounce")] = 0.5,
+) -> None:
+    """Build the badges, then rebuild them whenever an input changes.
+
+    Watches the ticket, speaker and mapping files, ``settings.toml``, the
+    badge template, ``img/`` and ``fonts/``. Data changes only redraw the
+    badges whose printed content changed; design changes redraw them all
+    (see ``watch``). Stop with Ctrl-C.
+
+    Args:
+        ticket_files: One or more ticket files.
+        speaker_files: Optional JSON files containing ``SpeakerModel`` entries.
+        where: Queries selecting the tickets, like ``build --where``.
+        output: PDF file kept up to date.
+        reference_mapping_file: Optional JSON old → new reference mapping.
+        timezone: Timezone of the dates given without an offset.
+        interval: Seconds between two checks of the inputs.
+        debounce: Seconds the inputs must stay unchanged before rebuilding.
+    """
+    from watch import IncrementalBuild, watch
+
+    query = None
+    if where:
+        try:
+            query = compile_query(
+                " and ".join(f"({condition})" for condition in where), timezone
+            )
+        except QueryError as e:
+            typer.echo(f"invalid --where: {e}", err=True)
+            raise typer.Exit(code=1)
+
+    def load() -> list[TicketModel]:
+        tickets = load_tickets(
+            ticket_files, load_reference_mapping(reference_mapping_file)
+        )
+        speakers = apply_email_mapping(load_speakers(speaker_files))
+        tickets = inject_speakers_in_tickets(tickets, speakers)
+        if query is None:
+            return tickets
+        table = TicketTable(tickets)
+        return table.select(query(table))
+
+    data_paths = [*ticket_files, *speaker_files, pathlib.Path("emails.mapping.csv")]
+    if reference_mapping_file:
+        data_paths.append(reference_mapping_file)
+    design_paths = [
+        pathlib.Path(path) for path in ("settings.toml", ".secret.toml")
+    ] + [template_path(), pathlib.Path(here, "img"), pathlib.Path(here, "fonts")]
+
+    try:
+        watch(
+            IncrementalBuild(load, output),
+            data_paths,
+            design_paths,
+            interval,
+            debounce,
+        )
+    except KeyboardInterrupt:
+        pass
+
+
 def load_speakers(speaker_files: list[pathlib.Path]) -> list[SpeakerModel]:
     """Load and parse speakers from JSON files into ``SpeakerModel`` objects.
 
@@ -676,43 +661,502 @@ def load_speakers(speaker_files: list[pathlib.Path]) -> list[SpeakerModel]:
     return speakers
 
 
-def load_tickets(ticket_files: list[pathlib.Path]) -> list[TicketModel]:
+def load_reference_mapping(mapping_file: pathlib.Path | None) -> dict[str, str]:
+    """Load an old → new reference mapping (see ``reference-mapping.example.json``).
+
+    Args:
+        mapping_file: JSON object file, or None for no mapping.
+
+    Returns:
+        The mapping, empty when no file is given.
+    """
+    if mapping_file is None:
+        return {}
+    return TypeAdapter(dict[str, str]).validate_json(mapping_file.read_text())
+
+
+def load_tickets(
+    ticket_files: list[pathlib.Path],
+    reference_mapping: dict[str, str] | None = None,
+) -> list[TicketModel]:
     """Load and parse tickets from JSON files into ``TicketModel`` objects.
 
+    Columnar snapshots (``.parquet``/``.arrow``, see ``columnar``) are read
+    as well.
+
     Args:
-        ticket_files: Paths to JSON files with arrays of tickets.
+        ticket_files: Paths to JSON files with arrays of tickets, or to
+            columnar snapshots.
+        reference_mapping: Optional old → new reference overlay, applied on
+            the freshly parsed tickets instead of rewriting the files.
 
     Returns:
         A list of parsed ``TicketModel`` instances.
     """
     tickets: list[TicketModel] = []
     for ticket_file in ticket_files:
-        tickets.extend(
-            TypeAdapter(list[TicketModel]).validate_json(ticket_file.read_text())
-        )
+        if is_snapshot(ticket_file):
+            tickets.extend(read_tickets(ticket_file))
+            continue
+        tickets.extend(get_decoder().tickets(ticket_file.read_bytes()))
+    return remap_references(tickets, reference_mapping)
+
+
+def remap_references(
+    tickets: list[TicketModel], reference_mapping: dict[str, str] | None
+) -> list[TicketModel]:
+    """Apply an old → new reference overlay to the tickets, in place."""
+    if reference_mapping:
+        for ticket in tickets:
+            new_reference = reference_mapping.get(ticket.reference)
+            if new_reference is not None:
+                ticket.reference = new_reference
     return tickets
 
 
+def save_tickets(tickets: list[TicketModel], store_name: str | pathlib.Path) -> None:
+    """Store tickets as pretty-printed JSON, readable by ``load_tickets``.
+
+    The file is written under a temporary name and then moved in place, so
+    readers never see a partially written file.
+
+    Args:
+        tickets: Tickets to store.
+        store_name: Output filename.
+    """
+    store_path = pathlib.Path(store_name)
+    tmp_path = store_path.with_name(f".{store_path.name}.tmp")
+    with open(tmp_path, "w") as fp:
+        json.dump(
+            fp=fp,
+            obj=[ticket.model_dump() for ticket in tickets],
+            indent=4,
+            cls=DateTimeEncoder,
+        )
+    os.replace(tmp_path, store_path)
+
+
+def make_page_cache() -> PageCache:
+    """Page cache of the configured Tito account."""
+    return PageCache(
+        pathlib.Path(settings.API.get("cache_dir", ".tito-cache")),
+        settings.API.account,
+    )
+
+
 @app.command(name="download-tickets")
 def cmd_download_tickets(
     store_name: str = "tickets.json",
     event: str = settings.API.event,
+    cache: bool = typer.Option(True, "--cache/--no-cache"),
+    offline: bool = typer.Option(False, "--offline"),
+    snapshot: pathlib.Path | None = typer.Option(None, "--snapshot"),
+    trace: pathlib.Path | None = typer.Option(None, "--trace"),
 ):
     """Download tickets from the API and store them as pretty-printed JSON.
 
+    Pages are cached in ``settings.API.cache_dir``: an interrupted download
+    resumes after its last completed page, and unchanged pages are
+    revalidated with conditional requests.
+
     Args:
         store_name: Output filename for the JSON payload.
         event: The event slug/identifier used by the API.
+        cache: Use the on-disk page cache.
+        offline: Replay the download from the cache, without calling the API.
+        snapshot: Optional ``.parquet``/``.arrow`` columnar snapshot written
+            alongside the JSON file.
+        trace: Optional JSONL file recording every HTTP request, a latency
+            and throughput summary is printed at the end.
     """
-    tickets: list[TicketModel] = list(get_tickets(event))
-    with open(store_name, "w") as fp:
-        json.dump(
-            fp=fp,
-            obj=[ticket.model_dump() for ticket in tickets],
-            indent=4,
-            cls=DateTimeEncoder,
+    page_cache = make_page_cache() if cache or offline else None
+    with HttpTrace(trace) as http_trace:
+        session = TitoSession(pool_size=1, trace=http_trace if trace else None)
+        try:
+            tickets: list[TicketModel] = list(
+                get_tickets(event, session=session, cache=page_cache, offline=offline)
+            )
+        except PageNotCached as e:
+            typer.echo(f"--offline: {e}", err=True)
+            raise typer.Exit(code=1)
+    save_tickets(tickets, store_name)
+    if snapshot:
+        write_snapshot(tickets, snapshot)
+    print(f"{len(tickets)} tickets")
+    if trace:
+        print(f"HTTP: {http_trace.summary()}")
+
+
+@app.command(name="download-all")
+def cmd_download_all(
+    events: typing.Annotated[list[str], typer.Argument()],
+    concurrency: typing.Annotated[int, typer.Option("--concurrency")] = 4,
+    rate: typing.Annotated[float | None, typer.Option("--rate")] = None,
+    store_pattern: typing.Annotated[
+        str, typer.Option("--store-pattern")
+    ] = "{event}-tickets.json",
+    cache: typing.Annotated[bool, typer.Option("--cache/--no-cache")] = True,
+    offline: typing.Annotated[bool, typer.Option("--offline")] = False,
+    snapshot_pattern: typing.Annotated[
+        str | None, typer.Option("--snapshot-pattern")
+    ] = None,
+    trace: typing.Annotated[pathlib.Path | None, typer.Option("--trace")] = None,
+) -> None:
+    """Download the tickets of several events concurrently.
+
+    All downloads go through one pooled session, with at most
+    ``concurrency`` requests in flight and an optional global rate budget.
+    Each event file is written atomically once its last page is in.
+
+    Args:
+        events: Event slugs, e.g. ``pycon-ireland-2024``.
+        concurrency: Number of events downloaded at the same time.
+        rate: Maximum requests per second across all events.
+        store_pattern: Output filename, ``{event}`` is replaced by the slug.
+        cache: Use the on-disk page cache, see ``download-tickets``.
+        offline: Replay the downloads from the cache.
+        snapshot_pattern: Optional columnar snapshot filename written
+            alongside each JSON file, e.g. ``{event}-tickets.parquet``.
+        trace: Optional JSONL file recording every HTTP request, see
+            ``download-tickets``.
+    """
+    http_trace = HttpTrace(trace) if trace else None
+    session = TitoSession(pool_size=concurrency, rate=rate, trace=http_trace)
+    page_cache = make_page_cache() if cache or offline else None
+
+    def download(event: str) -> tuple[int, float]:
+        start = time.perf_counter()
+        tickets = list(
+            get_tickets(event, session=session, cache=page_cache, offline=offline)
+        )
+        save_tickets(tickets, store_pattern.format(event=event))
+        if snapshot_pattern:
+            write_snapshot(tickets, snapshot_pattern.format(event=event))
+        return len(tickets), time.perf_counter() - start
+
+    start = time.perf_counter()
+    failed = False
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        futures = {event: pool.submit(download, event) for event in events}
+        for event, future in futures.items():
+            try:
+                count, seconds = future.result()
+            except Exception as e:
+                failed = True
+                print(f"{event:<30} failed: {e}")
+            else:
+                print(f"{event:<30} {count:>5} tickets {seconds:>7.2f}s")
+    print(f"{'total':<30} {time.perf_counter() - start:>21.2f}s")
+    if http_trace is not None:
+        http_trace.close()
+        print(f"HTTP: {http_trace.summary()}")
+
+    if failed:
+        raise typer.Exit(code=1)
+
+
+@app.command(name="fetch-and-build")
+def cmd_fetch_and_build(
+    speaker_files: typing.Annotated[
+        list[pathlib.Path], typer.Option("--speakers", default_factory=list)
+    ],
+    event: typing.Annotated[str, typer.Option("--event")] = settings.API.event,
+    output: typing.Annotated[pathlib.Path | None, typer.Option("--output")] = None,
+    store_name: typing.Annotated[
+        pathlib.Path | None, typer.Option("--store-name")
+    ] = None,
+    cache: typing.Annotated[bool, typer.Option("--cache/--no-cache")] = True,
+    offline: typing.Annotated[bool, typer.Option("--offline")] = False,
+    queue_size: typing.Annotated[int, typer.Option("--queue-size")] = 4,
+    trace: typing.Annotated[pathlib.Path | None, typer.Option("--trace")] = None,
+) -> None:
+    """Download the tickets of an event and build its badges in one run.
+
+    Badges are rendered while the next API pages are downloading, then laid
+    out in reference order (see ``pipeline``).
+
+    Args:
+        speaker_files: JSON files with speakers.
+        event: The event slug/identifier used by the API.
+        output: Output PDF filename. If None, uses default naming.
+        store_name: Optional JSON file receiving the downloaded tickets.
+        cache: Use the on-disk page cache, see ``download-tickets``.
+        offline: Replay the download from the cache.
+        queue_size: API pages buffered ahead of the rendering.
+        trace: Optional JSONL file recording every HTTP request, see
+            ``download-tickets``.
+    """
+    from pipeline import fetch_and_build
+
+    speakers = apply_email_mapping(load_speakers(speaker_files))
+    layout = LayoutParameters(output_filename=str(output) if output else None)
+    page_cache = make_page_cache() if cache or offline else None
+    with HttpTrace(trace) as http_trace:
+        session = TitoSession(pool_size=1, trace=http_trace if trace else None)
+        try:
+            result = fetch_and_build(
+                event, speakers, layout, page_cache, offline, queue_size, session
+            )
+        except PageNotCached as e:
+            typer.echo(f"--offline: {e}", err=True)
+            raise typer.Exit(code=1)
+    if store_name:
+        save_tickets(result.tickets, store_name)
+    if not result.badges:
+        print("Nothing to do")
+        return
+
+    print(
+        f"{result.badges} badges: fetch {result.fetch_seconds:.2f}s, "
+        f"render {result.render_seconds:.2f}s, "
+        f"assembly {result.assembly_seconds:.2f}s, "
+        f"total {result.total_seconds:.2f}s"
+    )
+    if trace:
+        print(f"HTTP: {http_trace.summary()}")
+
+
+@app.command(name="download-checkins")
+def cmd_download_checkins(
+    checkin_list: typing.Annotated[
+        str | None, typer.Option("--checkin-list")
+    ] = settings.get("TITO_CHECKIN_TOKEN"),
+    store_name: typing.Annotated[
+        pathlib.Path, typer.Option("--store-name")
+    ] = pathlib.Path("checkins.json"),
+    trace: typing.Annotated[pathlib.Path | None, typer.Option("--trace")] = None,
+) -> None:
+    """Download the check-ins of a check-in list from the Tito Check-in API.
+
+    Args:
+        checkin_list: Check-in list slug, defaults to ``TITO_CHECKIN_TOKEN``
+            in ``.secret.toml``.
+        store_name: Output JSON file.
+        trace: Optional JSONL file recording the HTTP request, see
+            ``download-tickets``.
+    """
+    if not checkin_list:
+        typer.echo("--checkin-list or TITO_CHECKIN_TOKEN is required", err=True)
+        raise typer.Exit(code=1)
+
+    with HttpTrace(trace) as http_trace:
+        session = TitoSession(pool_size=1, trace=http_trace if trace else None)
+        checkins = get_checkins(checkin_list, session)
+    tmp = store_name.with_name(f".{store_name.name}.tmp")
+    with open(tmp, "w") as fp:
+        json.dump(checkins, fp, indent=4)
+    os.replace(tmp, store_name)
+    print(f"{len(checkins)} check-ins")
+    if trace:
+        print(f"HTTP: {http_trace.summary()}")
+
+
+@app.command(name="trace-summary")
+def cmd_trace_summary(
+    trace_files: typing.Annotated[list[pathlib.Path], typer.Argument()],
+) -> None:
+    """Print the latency and throughput summary of recorded HTTP traces.
+
+    Args:
+        trace_files: JSONL files written with ``--trace``.
+    """
+    from http_trace import load_trace
+
+    for trace_file in trace_files:
+        print(f"{trace_file}: {load_trace(trace_file).summary()}")
+
+
+@app.command(name="simulate-tito")
+def cmd_simulate_tito(
+    host: typing.Annotated[str, typer.Option("--host")] = "127.0.0.1",
+    port: typing.Annotated[int, typer.Option("--port")] = 8000,
+    tickets: typing.Annotated[int, typer.Option("--tickets")] = 1000,
+    page_size: typing.Annotated[int, typer.Option("--page-size")] = 100,
+    latency: typing.Annotated[float, typer.Option("--latency")] = 0.0,
+    jitter: typing.Annotated[float, typer.Option("--jitter")] = 0.0,
+    rate_limit: typing.Annotated[float | None, typer.Option("--rate-limit")] = None,
+    error_rate: typing.Annotated[float, typer.Option("--error-rate")] = 0.0,
+    updates_per_page: typing.Annotated[int, typer.Option("--updates-per-page")] = 0,
+    inserts_per_page: typing.Annotated[int, typer.Option("--inserts-per-page")] = 0,
+    seed: typing.Annotated[int, typer.Option("--seed")] = 0,
+) -> None:
+    """Serve a local simulator of the Tito tickets API until interrupted.
+
+    Run the download commands against it with
+    ``DYNACONF_API__base_url=http://127.0.0.1:8000`` (see ``tito_simulator``).
+
+    Args:
+        host: Interface to listen on.
+        port: Port to listen on.
+        tickets: Tickets of each event.
+        page_size: Tickets per page.
+        latency: Seconds added to every response.
+        jitter: Random extra seconds added to the latency, up to this value.
+        rate_limit: Requests per second allowed before answering 429.
+        error_rate: Share of requests answered with a 5xx error.
+        updates_per_page: Tickets modified after each page served.
+        inserts_per_page: Tickets created after each page served.
+        seed: Seed of the ticket data and of the faults.
+    """
+    from tito_simulator import SimulatorConfig, TitoSimulator
+
+    config = SimulatorConfig(
+        tickets=tickets,
+        page_size=page_size,
+        latency=latency,
+        jitter=jitter,
+        rate_limit=rate_limit,
+        error_rate=error_rate,
+        updates_per_page=updates_per_page,
+        inserts_per_page=inserts_per_page,
+        seed=seed,
+    )
+    server = TitoSimulator((host, port), config)
+    print(f"Serving the Tito API on {server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(
+            ", ".join(f"{key}: {value}" for key, value in sorted(server.stats.items()))
         )
-        print(f"{len(tickets)} tickets")
+
+
+@app.command(name="benchmark-download")
+def cmd_benchmark_download(
+    events: typing.Annotated[int, typer.Option("--events")] = 4,
+    tickets: typing.Annotated[int, typer.Option("--tickets")] = 1000,
+    page_size: typing.Annotated[int, typer.Option("--page-size")] = 100,
+    latency: typing.Annotated[float, typer.Option("--latency")] = 0.05,
+    jitter: typing.Annotated[float, typer.Option("--jitter")] = 0.0,
+    rate_limit: typing.Annotated[float | None, typer.Option("--rate-limit")] = None,
+    error_rate: typing.Annotated[float, typer.Option("--error-rate")] = 0.0,
+    updates_per_page: typing.Annotated[int, typer.Option("--updates-per-page")] = 0,
+    inserts_per_page: typing.Annotated[int, typer.Option("--inserts-per-page")] = 0,
+    seed: typing.Annotated[int, typer.Option("--seed")] = 0,
+    concurrency: typing.Annotated[int, typer.Option("--concurrency")] = 4,
+    repeat: typing.Annotated[int, typer.Option("--repeat")] = 1,
+    cache: typing.Annotated[bool, typer.Option("--cache/--no-cache")] = False,
+    trace: typing.Annotated[pathlib.Path | None, typer.Option("--trace")] = None,
+) -> None:
+    """Measure the download throughput against a local Tito API simulator.
+
+    Downloads ``events`` simulated events like ``download-all`` and prints,
+    for each repetition, the time taken, tickets and pages per second, the
+    references received twice or missed, and the responses of the server
+    (pages, 304, 429, 5xx).
+
+    Args:
+        events: Number of simulated events downloaded concurrently.
+        tickets: Tickets of each event.
+        page_size: Tickets per page.
+        latency: Seconds added to every response.
+        jitter: Random extra seconds added to the latency, up to this value.
+        rate_limit: Requests per second allowed before answering 429.
+        error_rate: Share of requests answered with a 5xx error.
+        updates_per_page: Tickets modified after each page served.
+        inserts_per_page: Tickets created after each page served.
+        seed: Seed of the ticket data and of the faults.
+        concurrency: Events downloaded at the same time.
+        repeat: Downloads of every event.
+        cache: Go through a temporary page cache, the repetitions then
+            revalidate the pages with conditional requests.
+        trace: Optional JSONL file recording every HTTP request, see
+            ``download-tickets``.
+    """
+    import tempfile
+
+    from tito_simulator import SimulatorConfig, benchmark_download
+
+    config = SimulatorConfig(
+        tickets=tickets,
+        page_size=page_size,
+        latency=latency,
+        jitter=jitter,
+        rate_limit=rate_limit,
+        error_rate=error_rate,
+        updates_per_page=updates_per_page,
+        inserts_per_page=inserts_per_page,
+        seed=seed,
+    )
+    slugs = [f"simulated-{index}" for index in range(1, events + 1)]
+    with tempfile.TemporaryDirectory(prefix="tito-cache-") as tmp:
+        page_cache = (
+            PageCache(pathlib.Path(tmp), settings.API.account) if cache else None
+        )
+        with HttpTrace(trace) as http_trace:
+            runs = benchmark_download(
+                config,
+                slugs,
+                concurrency,
+                repeat,
+                page_cache,
+                http_trace if trace else None,
+            )
+
+    for index, run in enumerate(runs, start=1):
+        server = ", ".join(
+            f"{key}: {value}" for key, value in sorted(run.server.items())
+        )
+        print(
+            f"run {index}: {run.tickets} tickets in {run.seconds:.2f}s, "
+            f"{run.tickets_per_second:.0f} tickets/s, "
+            f"{run.pages_per_second:.1f} pages/s, "
+            f"{run.duplicates} duplicates, {run.missing} missing ({server})"
+        )
+    if trace:
+        print(f"HTTP: {http_trace.summary()}")
+
+
+@app.command(name="benchmark-decoders")
+def cmd_benchmark_decoders(
+    backends: typing.Annotated[
+        list[str], typer.Option("--backend", default_factory=list)
+    ],
+    tickets: typing.Annotated[int, typer.Option("--tickets")] = 5000,
+    page_size: typing.Annotated[int, typer.Option("--page-size")] = 100,
+    repeat: typing.Annotated[int, typer.Option("--repeat")] = 5,
+) -> None:
+    """Compare the deserialisation backends on synthetic API pages and files.
+
+    Every backend decodes the same pages and ticket file, its tickets are
+    compared with the ``pydantic`` ones, and the fastest correct backend is
+    the one to set as ``decoding.backend`` (see ``decoders``).
+
+    Args:
+        backends: Backends to compare, all of them by default.
+        tickets: Tickets of the synthetic event.
+        page_size: Tickets per API page.
+        repeat: Runs per backend, the fastest one counts.
+    """
+    from decoders import backends as known_backends
+    from decoders import benchmark
+
+    unknown = set(backends) - known_backends.keys()
+    if unknown:
+        typer.echo(
+            f"unknown backend {', '.join(sorted(unknown))}, "
+            f"one of {', '.join(known_backends)}",
+            err=True,
+        )
+        raise typer.Exit(code=1)
+
+    runs = benchmark(tickets, page_size, repeat, backends or None)
+    print(f"{'backend':<16} {'pages':>8} {'file':>8} {'tickets/s':>10}  result")
+    for run in runs:
+        if run.error:
+            print(f"{run.backend:<16} {'':>8} {'':>8} {'':>10}  {run.error}")
+            continue
+        print(
+            f"{run.backend:<16} {run.pages_seconds:>7.3f}s {run.file_seconds:>7.3f}s "
+            f"{run.tickets_per_second:>10.0f}  {'ok' if run.correct else 'DIFFERENT'}"
+        )
+    correct = [run for run in runs if run.correct]
+    if correct:
+        fastest = max(correct, key=lambda run: run.tickets_per_second)
+        print(f"fastest correct backend: {fastest.backend}")
 
 
 @app.command(name="missing-tickets-for-speakers")
@@ -745,6 +1189,9 @@ def cmd_print_reference(
     ticket_files: list[pathlib.Path],
     reference: str,
     speaker_files: list[pathlib.Path] = typer.Option([], "--speakers"),
+    reference_mapping_file: pathlib.Path | None = typer.Option(
+        None, "--reference-mapping"
+    ),
 ):
     """Build a badge PDF for a single ticket reference.
 
@@ -752,8 +1199,12 @@ def cmd_print_reference(
         ticket_files: JSON files with attendee tickets.
         reference: Ticket reference to print.
         speaker_files: JSON files with speakers (to mark speakers/exhibitors).
+        reference_mapping_file: Optional JSON old → new reference mapping.
     """
-    tickets: list[TicketModel] = load_tickets(ticket_files=ticket_files)
+    tickets: list[TicketModel] = load_tickets(
+        ticket_files=ticket_files,
+        reference_mapping=load_reference_mapping(reference_mapping_file),
+    )
     speakers: list[SpeakerModel] = load_speakers(speaker_files=speaker_files)
     tickets = inject_speakers_in_tickets(tickets, speakers)
 
@@ -770,6 +1221,32 @@ def cmd_print_reference(
         print("Nothing to do")
 
 
+@app.command(name="check-glyphs")
+def cmd_check_glyphs(
+    ticket_files: typing.Annotated[list[pathlib.Path], typer.Argument()],
+) -> None:
+    """List the badges with characters missing from every configured font.
+
+    Texts the template font cannot draw but a ``fallback_fonts`` can are
+    counted, the others are listed; the exit code is 1 when there are any.
+
+    Args:
+        ticket_files: JSON files with tickets.
+    """
+    start = time.perf_counter()
+    tickets = load_tickets(ticket_files)
+    register_fonts()
+    layout = LayoutParameters(output_filename=io.BytesIO())
+    uncovered = assign_fonts(tickets, layout.plan)
+    print(
+        f"{len(tickets)} tickets checked in {time.perf_counter() - start:.2f}s, "
+        f"{len(layout.plan.font_fallbacks)} texts drawn with a fallback font"
+    )
+    report_uncovered(uncovered)
+    if uncovered:
+        raise typer.Exit(code=1)
+
+
 @app.command(name="blank-tickets")
 def cmd_build_blank_tickets(
     limit: int = 5,
@@ -787,8 +1264,8 @@ def cmd_build_blank_tickets(
         Exit: When both ``exhibitor`` and ``speaker`` are True.
     """
     if exhibitor and speaker:
-        typer.echo("--exhibitor, --speaker are mutually exclusive")
-        typer.Exit()
+        typer.echo("--exhibitor, --speaker are mutually exclusive", err=True)
+        raise typer.Exit(code=1)
 
     register_fonts()
     layout = LayoutParameters(output_filename="blank-tickets.pdf")
@@ -802,6 +1279,142 @@ def cmd_build_blank_tickets(
     create_empty_badges(tickets, layout)
 
 
+def reprint_queue_path(queue: pathlib.Path | None) -> pathlib.Path:
+    return queue or pathlib.Path(
+        settings.get("reprint", {}).get("queue", "reprint-queue.db")
+    )
+
+
+@app.command(name="reprint-add")
+def cmd_reprint_add(
+    references: typing.Annotated[list[str], typer.Argument()],
+    ticket_files: typing.Annotated[
+        list[pathlib.Path], typer.Option("--tickets", default_factory=list)
+    ],
+    speaker_files: typing.Annotated[
+        list[pathlib.Path], typer.Option("--speakers", default_factory=list)
+    ],
+    kind: typing.Annotated[str, typer.Option("--kind")] = "reprint",
+    reference_mapping_file: typing.Annotated[
+        pathlib.Path | None, typer.Option("--reference-mapping")
+    ] = None,
+    queue: typing.Annotated[pathlib.Path | None, typer.Option("--queue")] = None,
+) -> None:
+    """Queue badges to reprint at the desk, printed by ``reprint-flush``.
+
+    Args:
+        references: Ticket references to reprint.
+        ticket_files: Ticket files holding them (download them again for
+            walk-ins registered since).
+        speaker_files: JSON files with speakers.
+        kind: Why the badge is printed, e.g. ``walk-in`` or ``correction``.
+        reference_mapping_file: Optional JSON old → new reference mapping.
+        queue: Queue database, defaults to ``settings.reprint.queue``.
+
+    Raises:
+        Exit: When a reference is not in the ticket files.
+    """
+    from reprint_queue import ReprintQueue
+
+    tickets = load_tickets(
+        ticket_files=ticket_files,
+        reference_mapping=load_reference_mapping(reference_mapping_file),
+    )
+    tickets = inject_speakers_in_tickets(
+        tickets, apply_email_mapping(load_speakers(speaker_files))
+    )
+    by_reference = {ticket.reference: ticket for ticket in tickets}
+    missing = [reference for reference in references if reference not in by_reference]
+    if missing:
+        print(f"Unknown references: {', '.join(missing)}")
+        raise typer.Exit(code=1)
+
+    with ReprintQueue(reprint_queue_path(queue)) as reprints:
+        for reference in references:
+            job_id = reprints.add(by_reference[reference], kind)
+            print(f"#{job_id} {reference} {by_reference[reference].display_name}")
+        print(f"{len(reprints.pending())} badges waiting")
+
+
+@app.command(name="reprint-status")
+def cmd_reprint_status(
+    queue: typing.Annotated[pathlib.Path | None, typer.Option("--queue")] = None,
+) -> None:
+    """List the badges waiting in the reprint queue.
+
+    Args:
+        queue: Queue database, defaults to ``settings.reprint.queue``.
+    """
+    from reprint_queue import ReprintQueue
+
+    now = datetime.datetime.now(datetime.timezone.utc)
+    with ReprintQueue(reprint_queue_path(queue)) as reprints:
+        for job in reprints.pending():
+            waiting = (now - job.queued_at).total_seconds()
+            print(
+                f"#{job.id:<5} {job.ticket.reference:<10} {job.kind:<12} "
+                f"{waiting:>6.0f}s {job.ticket.display_name}"
+            )
+
+
+@app.command(name="reprint-flush")
+def cmd_reprint_flush(
+    queue: typing.Annotated[pathlib.Path | None, typer.Option("--queue")] = None,
+    output_dir: typing.Annotated[
+        pathlib.Path, typer.Option("--output-dir")
+    ] = pathlib.Path("reprints"),
+    deadline: typing.Annotated[float | None, typer.Option("--deadline")] = None,
+    force: typing.Annotated[bool, typer.Option("--force")] = False,
+    watch: typing.Annotated[bool, typer.Option("--watch")] = False,
+    interval: typing.Annotated[float, typer.Option("--interval")] = 5.0,
+    print_command: typing.Annotated[str | None, typer.Option("--print-command")] = None,
+) -> None:
+    """Print the queued badges once they fill whole sheets.
+
+    Full sheets are printed as soon as there are enough badges waiting. When
+    the oldest badge has waited ``deadline`` seconds, the others are printed
+    anyway and the last sheet is padded with blank badges (see
+    ``reprint_queue``).
+
+    Args:
+        queue: Queue database, defaults to ``settings.reprint.queue``.
+        output_dir: Directory receiving the PDF files.
+        deadline: Seconds a badge waits for its sheet to fill up, defaults
+            to ``settings.reprint.deadline``.
+        force: Print every waiting badge now.
+        watch: Keep checking the queue every ``interval`` seconds.
+        interval: Seconds between two checks with ``watch``.
+        print_command: Command sending each PDF to the printer, ``{path}`` is
+            replaced by the file, defaults to ``settings.reprint.print_command``.
+    """
+    from reprint_queue import PrintError, ReprintQueue, flush
+
+    config = settings.get("reprint", {})
+    if deadline is None:
+        deadline = float(config.get("deadline", 300))
+    print_command = print_command or config.get("print_command")
+
+    with ReprintQueue(reprint_queue_path(queue)) as reprints:
+        while True:
+            try:
+                flushed = flush(reprints, output_dir, deadline, force, print_command)
+            except PrintError as e:
+                typer.echo(f"{e}, the badges stay queued", err=True)
+                if not watch:
+                    raise typer.Exit(code=1)
+                flushed = None
+            if flushed is not None:
+                path, jobs = flushed
+                references = ", ".join(job.ticket.reference for job in jobs)
+                print(f"{path}: {references}")
+            if not watch:
+                break
+            try:
+                time.sleep(interval)
+            except KeyboardInterrupt:
+                break
+
+
 class SpeakerEnum(str, enum.Enum):
     """Sorting options for speaker ticket listings."""
 
@@ -846,5 +1459,486 @@ def cmd_print_speaker_tickets(
         create_badges(ticket_speakers, layout)
 
 
+@app.command(name="preview")
+def cmd_preview(
+    ticket_files: typing.Annotated[list[pathlib.Path], typer.Argument()],
+    speaker_files: typing.Annotated[
+        list[pathlib.Path], typer.Option("--speakers", default_factory=list)
+    ],
+    output_dir: typing.Annotated[
+        pathlib.Path, typer.Option("--output-dir")
+    ] = pathlib.Path("previews"),
+    dpi: typing.Annotated[int, typer.Option("--dpi")] = 36,
+    workers: typing.Annotated[int | None, typer.Option("--workers")] = None,
+    reference_mapping_file: typing.Annotated[
+        pathlib.Path | None, typer.Option("--reference-mapping")
+    ] = None,
+) -> None:
+    """Rasterise every badge to a PNG thumbnail and write a contact sheet.
+
+    Thumbnails are cached by the ticket render hash, so only badges whose
+    printed content changed since the last proof are rasterised again.
+
+    Args:
+        ticket_files: JSON files with attendee tickets.
+        speaker_files: JSON files with speakers.
+        output_dir: Directory for the thumbnails and ``index.html``.
+        dpi: Thumbnail resolution.
+        workers: Number of rendering processes, defaults to the CPU count.
+        reference_mapping_file: Optional JSON old → new reference mapping.
+    """
+    from previews import build_previews
+
+    tickets = load_tickets(ticket_files, load_reference_mapping(reference_mapping_file))
+    speakers = apply_email_mapping(load_speakers(speaker_files))
+    tickets = sorted(
+        inject_speakers_in_tickets(tickets, speakers),
+        key=lambda ticket: ticket.reference,
+    )
+
+    index_file, rendered = build_previews(tickets, output_dir, dpi, workers)
+    print(f"{rendered}/{len(tickets)} badges rasterised, contact sheet: {index_file}")
+
+
+@app.command(name="diff")
+def cmd_diff(
+    previous_file: typing.Annotated[pathlib.Path, typer.Argument()],
+    current_file: typing.Annotated[pathlib.Path, typer.Argument()],
+    speaker_files: typing.Annotated[
+        list[pathlib.Path], typer.Option("--speakers", default_factory=list)
+    ],
+    previous_speaker_files: typing.Annotated[
+        list[pathlib.Path], typer.Option("--previous-speakers", default_factory=list)
+    ],
+    output: typing.Annotated[pathlib.Path, typer.Option("--output")] = pathlib.Path(
+        "tickets-diff.json"
+    ),
+    voided_output: typing.Annotated[
+        pathlib.Path | None, typer.Option("--voided")
+    ] = None,
+) -> None:
+    """Write the badges to reprint between two ticket snapshots.
+
+    Only the printed content is compared (name, level, roles, QR payload), so
+    tickets updated on unprinted answers are left out. The output file is a
+    regular ticket file, ready for ``build``.
+
+    Args:
+        previous_file: Ticket snapshot the badges were printed from.
+        current_file: Latest ticket snapshot.
+        speaker_files: JSON files with speakers, roles are printed too.
+        previous_speaker_files: JSON files with the speakers the previous
+            badges were printed with, defaults to ``speaker_files``. An
+            attendee who became a speaker since is only reprinted when the
+            previous snapshot is resolved with the speakers of that time.
+        output: Ticket file receiving the added and changed badges.
+        voided_output: Optional ticket file receiving the voided tickets.
+    """
+    from snapshots import diff_snapshots
+
+    speakers = apply_email_mapping(load_speakers(speaker_files))
+    previous_speakers = (
+        apply_email_mapping(load_speakers(previous_speaker_files))
+        if previous_speaker_files
+        else speakers
+    )
+    diff = diff_snapshots(
+        inject_speakers_in_tickets(load_tickets([previous_file]), previous_speakers),
+        inject_speakers_in_tickets(load_tickets([current_file]), speakers),
+    )
+
+    save_tickets(diff.to_print, output)
+    if voided_output:
+        save_tickets(diff.voided, voided_output)
+
+    for ticket in diff.voided:
+        print("voided", ticket.reference, ticket.name)
+    print(
+        f"{len(diff.added)} added, {len(diff.changed)} changed, "
+        f"{len(diff.voided)} voided, {diff.unchanged} unchanged -> {output}"
+    )
+
+
+@app.command(name="build-many")
+def cmd_build_many(
+    events_file: typing.Annotated[pathlib.Path, typer.Argument()],
+    workers: typing.Annotated[int | None, typer.Option("--workers")] = None,
+    timezone: typing.Annotated[str, typer.Option("--timezone")] = settings.printout.get(
+        "timezone", "Europe/Brussels"
+    ),
+) -> None:
+    """Build the badges of several events in one process.
+
+    Events are rendered concurrently and share fonts, print images and QR
+    codes. See ``batch_build`` for the events file format.
+
+    Args:
+        events_file: TOML file with one ``[[events]]`` table per event.
+        workers: Number of events rendered at the same time.
+        timezone: Timezone of the dates used in ``where`` queries.
+    """
+    from batch_build import build_events, compile_queries, load_events
+
+    events = load_events(events_file)
+    try:
+        queries = compile_queries(events, timezone)
+    except QueryError as e:
+        typer.echo(f"invalid --where: {e}", err=True)
+        raise typer.Exit(code=1)
+
+    start = time.perf_counter()
+    results = build_events(events, queries, workers)
+    elapsed = time.perf_counter() - start
+
+    for result in results:
+        print(
+            f"{result.name:<30} {result.badges:>5} badges "
+            f"{result.seconds:>7.2f}s  {result.output}"
+        )
+    total = sum(result.badges for result in results)
+    print(f"{'total':<30} {total:>5} badges {elapsed:>7.2f}s")
+
+
+@app.command(name="analytics")
+def cmd_analytics(
+    ticket_files: typing.Annotated[list[pathlib.Path], typer.Argument()],
+    speaker_files: typing.Annotated[
+        list[pathlib.Path], typer.Option("--speakers", default_factory=list)
+    ],
+    tshirt_question: typing.Annotated[
+        str, typer.Option("--tshirt-question")
+    ] = "t-shirt-size",
+    output: typing.Annotated[pathlib.Path | None, typer.Option("--json")] = None,
+) -> None:
+    """Print t-shirt sizes, levels, releases and registrations per event.
+
+    Every ticket file is an event; tickets are loaded once and all the
+    figures are computed together, per event and for all events.
+    Registrations are counted per UTC day.
+
+    Args:
+        ticket_files: JSON files with tickets, one per event.
+        speaker_files: JSON files with speakers, to report their coverage.
+        tshirt_question: Slug of the Tito question asking the t-shirt size.
+        output: Optional JSON file receiving the reports.
+    """
+    from analytics import event_reports, load_table
+
+    speakers = apply_email_mapping(load_speakers(speaker_files))
+    reports = event_reports(load_table(ticket_files), speakers, tshirt_question)
+
+    for report in reports:
+        print(f"== {report.event}: {report.tickets} tickets")
+        for title, counts in (
+            ("t-shirt sizes", report.tshirt_sizes),
+            ("levels", report.levels),
+            ("releases", report.release_titles),
+            ("registrations per day", report.registrations_per_day),
+        ):
+            print(f"  {title}:")
+            for label, count in counts.items():
+                print(f"    {label:<40} {count:>5}")
+        print(f"  speaker tickets: {report.speaker_tickets}")
+    if speakers:
+        total = reports[-1]
+        print(f"speakers with a ticket: {total.speakers_with_ticket}/{total.speakers}")
+
+    if output:
+        output.write_text(
+            json.dumps([report.model_dump() for report in reports], indent=2)
+        )
+
+
+@app.command(name="dedupe")
+def cmd_dedupe(
+    ticket_files: typing.Annotated[list[pathlib.Path], typer.Argument()],
+    output: typing.Annotated[pathlib.Path, typer.Option("--output")] = pathlib.Path(
+        "attendee-clusters.json"
+    ),
+    aliases_file: typing.Annotated[
+        pathlib.Path | None, typer.Option("--aliases")
+    ] = None,
+    threshold: typing.Annotated[float, typer.Option("--threshold")] = 0.85,
+    max_block: typing.Annotated[int, typer.Option("--max-block")] = 500,
+    export: typing.Annotated[pathlib.Path | None, typer.Option("--export")] = None,
+) -> None:
+    """Group the tickets of several events into people, with a confidence.
+
+    Tickets are linked by normalised email, by email alias, and by fuzzy
+    name matching within blocks of similar names (see ``dedupe``), so all
+    the years can be processed at once, e.g. ``pycon-*-tickets.json``.
+
+    Args:
+        ticket_files: JSON files with tickets, one per event.
+        output: JSON file receiving the clusters, largest first.
+        aliases_file: CSV of emails of a same person, one pair per line;
+            defaults to ``emails.mapping.csv`` when present.
+        threshold: Minimal name score (0 to 1) linking two tickets.
+        max_block: Blocks of similar names larger than this are skipped.
+        export: Optional ``.xlsx``, ``.csv`` or ``.parquet`` file with a
+            row per ticket and its cluster.
+    """
+    from analytics import event_name
+    from dedupe import dedupe, load_aliases
+
+    if aliases_file is None and pathlib.Path("emails.mapping.csv").exists():
+        aliases_file = pathlib.Path("emails.mapping.csv")
+    aliases = load_aliases(aliases_file) if aliases_file else []
+    events = {
+        event_name(ticket_file): load_tickets([ticket_file])
+        for ticket_file in ticket_files
+    }
+    start = time.perf_counter()
+    result = dedupe(events, aliases, threshold=threshold, max_block=max_block)
+    elapsed = time.perf_counter() - start
+
+    output.write_text(result.model_dump_json(indent=2))
+    merged = [cluster for cluster in result.clusters if len(cluster.members) > 1]
+    doubtful = sum(1 for cluster in merged if cluster.confidence < 1)
+    print(
+        f"{result.tickets} tickets -> {len(result.clusters)} people "
+        f"({len(merged)} with several tickets, {doubtful} linked by name only) "
+        f"in {elapsed:.2f}s, {result.comparisons} name comparisons"
+    )
+    if result.oversized_blocks:
+        print(f"{result.oversized_blocks} blocks over --max-block were skipped")
+    print(f"-> {output}")
+
+    if export:
+        from exporters import export_rows
+
+        rows = (
+            (
+                cluster.id,
+                cluster.confidence,
+                member.event,
+                member.reference,
+                member.name,
+                member.email,
+            )
+            for cluster in result.clusters
+            for member in cluster.members
+        )
+        try:
+            export_rows(
+                export,
+                ["Cluster", "Confidence", "Event", "Reference", "Name", "Email"],
+                rows,
+                title="Attendees",
+                types={"Cluster": int, "Confidence": float},
+            )
+        except (ValueError, RuntimeError) as e:
+            typer.echo(str(e), err=True)
+            raise typer.Exit(code=1)
+        print(f"-> {export}")
+
+
+def format_wait(seconds: float) -> str:
+    return f"{int(seconds // 60)}m{int(seconds % 60):02d}s"
+
+
+@app.command(name="simulate-registration")
+def cmd_simulate_registration(
+    ticket_files: typing.Annotated[list[pathlib.Path], typer.Argument()],
+    checkin_files: typing.Annotated[
+        list[pathlib.Path],
+        typer.Option(
+            "--checkins", default_factory=lambda: [pathlib.Path("checkins.json")]
+        ),
+    ],
+    lanes: typing.Annotated[str | None, typer.Option("--lanes")] = None,
+    staff: typing.Annotated[int, typer.Option("--staff")] = 1,
+    max_lanes: typing.Annotated[int, typer.Option("--max-lanes")] = 8,
+    target_wait: typing.Annotated[float, typer.Option("--target-wait")] = 600,
+    service_seconds: typing.Annotated[float, typer.Option("--service-seconds")] = 45,
+    service_cv: typing.Annotated[float, typer.Option("--service-cv")] = 0.5,
+    show_rate: typing.Annotated[float, typer.Option("--show-rate")] = 1.0,
+    bin_minutes: typing.Annotated[float, typer.Option("--bin-minutes")] = 5,
+    replications: typing.Annotated[int, typer.Option("--replications")] = 200,
+    seed: typing.Annotated[int, typer.Option("--seed")] = 0,
+    timezone: typing.Annotated[str, typer.Option("--timezone")] = settings.printout.get(
+        "timezone", "Europe/Brussels"
+    ),
+) -> None:
+    """Simulate the registration queues and recommend the lanes.
+
+    The arrival curve is fitted on past check-ins (``download-checkins``),
+    the attendees get the references of ``ticket_files``, and each lane is
+    simulated as a queue (see ``registration``). Without ``--lanes``, 1 to
+    ``--max-lanes`` balanced lanes are compared and the fewest keeping the
+    p95 wait under ``--target-wait`` is recommended.
+
+    Args:
+        ticket_files: JSON files with the tickets of the event.
+        checkin_files: Check-in exports of past events.
+        lanes: Lanes to evaluate instead, e.g. ``0-F,G-P,Q-Z`` or
+            ``0-F:2,G-Z`` for two people at the first lane.
+        staff: People serving each lane.
+        max_lanes: Most lanes compared.
+        target_wait: Target p95 wait, in seconds.
+        service_seconds: Mean time to hand over a badge.
+        service_cv: Coefficient of variation of that time.
+        show_rate: Share of the tickets showing up.
+        bin_minutes: Width of the bins of the arrival curve.
+        replications: Mornings simulated per configuration.
+        seed: Seed of the simulation.
+        timezone: Timezone of the desk, to split the check-ins in days.
+    """
+    from registration import (
+        Draws,
+        count_tickets,
+        fit_arrivals,
+        load_checkins,
+        parse_lanes,
+        recommend,
+        simulate,
+    )
+
+    references = [ticket.reference for ticket in load_tickets(ticket_files)]
+    try:
+        profile = fit_arrivals(load_checkins(checkin_files), timezone, bin_minutes)
+        chosen_lanes = (
+            count_tickets(parse_lanes(lanes, staff), references) if lanes else None
+        )
+    except ValueError as e:
+        typer.echo(str(e), err=True)
+        raise typer.Exit(code=1)
+    attendees = round(len(references) * show_rate)
+    print(
+        f"arrivals fitted on {profile.checkins} check-ins over {profile.days} days, "
+        f"peak {profile.peak_share_per_minute:.1%} of the attendees per minute "
+        f"({profile.peak_share_per_minute * attendees:.1f}/min for {attendees})"
+    )
+
+    start = time.perf_counter()
+    draws = Draws(
+        profile,
+        references,
+        attendees,
+        service_seconds=service_seconds,
+        service_cv=service_cv,
+        replications=replications,
+        seed=seed,
+    )
+    if chosen_lanes:
+        result = simulate(draws, chosen_lanes)
+        for lane in result.lanes:
+            print(
+                f"  {str(lane.lane):<6} {lane.lane.tickets:>5} tickets "
+                f"{lane.lane.staff} staff  p95 {format_wait(lane.p95_wait)} "
+                f"max {format_wait(lane.max_wait)}"
+            )
+        results, chosen = [result], result if result.p95_wait <= target_wait else None
+    else:
+        results, chosen = recommend(draws, references, target_wait, staff, max_lanes)
+    elapsed = time.perf_counter() - start
+
+    print(f"{'lanes':>5} {'staff':>5} {'p50':>7} {'p95':>7} {'max':>7}  split")
+    for result in results:
+        print(
+            f"{len(result.lanes):>5} {result.staff:>5} "
+            f"{format_wait(result.p50_wait):>7} {format_wait(result.p95_wait):>7} "
+            f"{format_wait(result.max_wait):>7}  "
+            + ", ".join(f"{lane.lane} ({lane.lane.tickets})" for lane in result.lanes)
+        )
+    print(f"{len(results)} configurations x {replications} mornings in {elapsed:.2f}s")
+    if chosen is None:
+        print(f"no configuration keeps the p95 wait under {format_wait(target_wait)}")
+        raise typer.Exit(code=1)
+    print(
+        f"recommended: {len(chosen.lanes)} lanes, "
+        + ", ".join(str(lane.lane) for lane in chosen.lanes)
+        + f" (p95 wait {format_wait(chosen.p95_wait)})"
+    )
+
+
+export_fields = (
+    "reference",
+    "first_name",
+    "last_name",
+    "name",
+    "email",
+    "release_title",
+    "created_at",
+    "updated_at",
+    *roles,
+)
+
+
+@app.command(name="export-tickets")
+def cmd_export_tickets(
+    ticket_files: typing.Annotated[list[pathlib.Path], typer.Argument()],
+    output: typing.Annotated[pathlib.Path, typer.Option("--output")],
+    speaker_files: typing.Annotated[
+        list[pathlib.Path], typer.Option("--speakers", default_factory=list)
+    ],
+    where: typing.Annotated[list[str], typer.Option("--where", default_factory=list)],
+    timezone: typing.Annotated[str, typer.Option("--timezone")] = settings.printout.get(
+        "timezone", "Europe/Brussels"
+    ),
+) -> None:
+    """Export tickets to xlsx, CSV or Parquet, following the output suffix.
+
+    Rows are streamed to the file (see ``exporters``), one column per ticket
+    field and per question of ``responses``. The ticket files are read twice,
+    one ticket at a time: once for the questions, once for the rows. A
+    ``--where`` query runs on a ``TicketTable``, which holds the tickets in
+    memory.
+
+    Args:
+        ticket_files: JSON files with tickets.
+        output: Output file, ``.xlsx``, ``.csv`` or ``.parquet``.
+        speaker_files: JSON files with speakers, to fill the role columns.
+        where: Queries selecting the tickets, as for ``build``.
+        timezone: Timezone of the dates used in ``--where`` queries.
+    """
+    from exporters import export_rows
+    from external_sort import iter_ticket_files
+
+    resolver = RoleResolver.from_settings(
+        apply_email_mapping(load_speakers(speaker_files))
+    )
+    if where:
+        try:
+            query = compile_query(
+                " and ".join(f"({condition})" for condition in where), timezone
+            )
+        except QueryError as e:
+            typer.echo(f"invalid --where: {e}", err=True)
+            raise typer.Exit(code=1)
+        table = TicketTable(resolver.apply(load_tickets(ticket_files)))
+        selected = table.select(query(table))
+
+        def tickets() -> typing.Iterable[TicketModel]:
+            return selected
+
+    else:
+
+        def tickets() -> typing.Iterable[TicketModel]:
+            for ticket in iter_ticket_files(ticket_files):
+                yield from resolver.apply([ticket])
+
+    questions = sorted({key for ticket in tickets() for key in ticket.responses})
+    header = [*export_fields, *(f"responses.{key}" for key in questions)]
+    rows = (
+        [
+            *(getattr(ticket, field) for field in export_fields),
+            *(ticket.responses.get(key) for key in questions),
+        ]
+        for ticket in tickets()
+    )
+    types = {
+        "created_at": datetime.datetime,
+        "updated_at": datetime.datetime,
+        **{role: bool for role in roles},
+    }
+    try:
+        count = export_rows(output, header, rows, title="Tickets", types=types)
+    except (ValueError, RuntimeError) as e:
+        typer.echo(str(e), err=True)
+        raise typer.Exit(code=1)
+    print(f"{count} tickets -> {output}")
+
+
 if __name__ == "__main__":
     app()
@@ -0,0 +1,220 @@
+"""
+Typed columnar ticket snapshots, in Parquet or Arrow IPC format.
+
+A snapshot holds one column per ticket field, dates as UTC microsecond
+timestamps and one ``responses.<question>`` text column per question. The
+format follows the file suffix: ``.parquet`` is compact and reads only the
+requested columns, ``.arrow`` is memory-mapped so columns are used in place
+without copying.
+
+``SnapshotTable`` is a ``TicketTable`` reading each column from the files on
+first use; the tickets themselves are only rebuilt when rows are selected.
+Snapshots need ``pyarrow`` (in requirements.txt), imported on first use so
+that JSON-only commands do not pay for it.
+"""
+
+import os
+import pathlib
+from collections.abc import Iterator
+
+import numpy as np
+
+from models import PythonLevel, TicketModel
+from ticket_table import (
+    TicketTable,
+    date_fields,
+    flag_fields,
+    response_prefix,
+    text_fields,
+)
+
+suffixes = (".parquet", ".arrow")
+
+
+def is_snapshot(path: str | pathlib.Path) -> bool:
+    return pathlib.Path(path).suffix.lower() in suffixes
+
+
+def import_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.ipc
+        import pyarrow.parquet
+    except ImportError as e:
+        raise ImportError(
+            "columnar snapshots need pyarrow: pip install -r requirements.txt"
+        ) from e
+    return pyarrow
+
+
+def to_arrow(tickets: list[TicketModel]):
+    """Build the Arrow table of ``tickets``; answers are stored as text."""
+    pa = import_pyarrow()
+    columns = {
+        field: pa.array([getattr(ticket, field) for ticket in tickets], pa.string())
+        for field in text_fields
+    }
+    for field in date_fields:
+        columns[field] = pa.array(
+            [getattr(ticket, field) for ticket in tickets],
+            pa.timestamp("us", tz="UTC"),
+        )
+    for field in flag_fields:
+        columns[field] = pa.array(
+            [getattr(ticket, field) for ticket in tickets], pa.bool_()
+        )
+    questions = sorted({key for ticket in tickets for key in ticket.responses})
+    for key in questions:
+        values = (ticket.responses.get(key) for ticket in tickets)
+        columns[response_prefix + key] = pa.array(
+            [value if value is None else str(value) for value in values], pa.string()
+        )
+    return pa.table(columns)
+
+
+def write_snapshot(tickets: list[TicketModel], path: str | pathlib.Path) -> None:
+    """Write a snapshot atomically, in the format of the ``path`` suffix."""
+    pa = import_pyarrow()
+    path = pathlib.Path(path)
+    table = to_arrow(tickets)
+    tmp_path = path.with_name(f".{path.name}.tmp")
+    if path.suffix.lower() == ".parquet":
+        pa.parquet.write_table(table, tmp_path)
+    else:
+        with pa.OSFile(str(tmp_path), "wb") as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+    os.replace(tmp_path, path)
+
+
+def read_snapshot(path: str | pathlib.Path, columns: list[str] | None = None):
+    """Read the Arrow table of a snapshot, restricted to ``columns`` if given.
+
+    Columns missing from the snapshot are left out.
+    """
+    pa = import_pyarrow()
+    path = pathlib.Path(path)
+    if path.suffix.lower() == ".parquet":
+        if columns is not None:
+            names = pa.parquet.read_schema(path).names
+            columns = [column for column in columns if column in names]
+        return pa.parquet.read_table(path, columns=columns)
+    table = pa.ipc.open_file(pa.memory_map(str(path))).read_all()
+    if columns is not None:
+        table = table.select(
+            [column for column in columns if column in table.column_names]
+        )
+    return table
+
+
+def snapshot_rows(path: str | pathlib.Path) -> int:
+    pa = import_pyarrow()
+    path = pathlib.Path(path)
+    if path.suffix.lower() == ".parquet":
+        return pa.parquet.ParquetFile(path).metadata.num_rows
+    return read_snapshot(path).num_rows
+
+
+def row_to_ticket(row: dict) -> TicketModel:
+    """Rebuild a ticket from a snapshot row, as given by ``to_pylist``."""
+    responses = {
+        name[len(response_prefix) :]: row.pop(name)
+        for name in list(row)
+        if name.startswith(response_prefix)
+    }
+    responses = {key: value for key, value in responses.items() if value is not None}
+    return TicketModel(**row, responses=responses)
+
+
+def read_tickets(path: str | pathlib.Path) -> list[TicketModel]:
+    """Rebuild the tickets stored in a snapshot."""
+    return [row_to_ticket(row) for row in read_snapshot(path).to_pylist()]
+
+
+def iter_tickets(
+    path: str | pathlib.Path, batch_size: int = 1024
+) -> Iterator[TicketModel]:
+    """Yield the tickets of a snapshot, reading one record batch at a time.
+
+    Only one batch is decoded at once: Parquet row groups are read batch by
+    batch and Arrow files are memory-mapped.
+    """
+    pa = import_pyarrow()
+    path = pathlib.Path(path)
+    if path.suffix.lower() == ".parquet":
+        batches = pa.parquet.ParquetFile(path).iter_batches(batch_size=batch_size)
+    else:
+        reader = pa.ipc.open_file(pa.memory_map(str(path)))
+        batches = (
+            reader.get_batch(index) for index in range(reader.num_record_batches)
+        )
+    for batch in batches:
+        for offset in range(0, batch.num_rows, batch_size):
+            for row in batch.slice(offset, batch_size).to_pylist():
+                yield row_to_ticket(row)
+
+
+class SnapshotTable(TicketTable):
+    """``TicketTable`` over one or several snapshot files, in order.
+
+    Args:
+        paths: Snapshot files.
+    """
+
+    def __init__(self, paths: list[pathlib.Path]) -> None:
+        super().__init__(None)
+        self.paths = list(paths)
+        self.row_counts = [snapshot_rows(path) for path in self.paths]
+
+    @property
+    def tickets(self) -> list[TicketModel]:
+        if self._tickets is None:
+            self._tickets = [
+                ticket for path in self.paths for ticket in read_tickets(path)
+            ]
+        return self._tickets
+
+    def __len__(self) -> int:
+        return sum(self.row_counts)
+
+    def _read(self, name: str, dtype: str = "string"):
+        """The ``name`` column of every file, nulls where a file lacks it."""
+        pa = import_pyarrow()
+        dtype = pa.type_for_alias(dtype)
+        chunks = []
+        for path, rows in zip(self.paths, self.row_counts):
+            table = read_snapshot(path, [name])
+            if table.num_columns:
+                chunks.extend(table.column(0).chunks)
+            elif rows:
+                chunks.append(pa.nulls(rows, dtype))
+        if not chunks:
+            return pa.chunked_array([], dtype)
+        return pa.chunked_array(chunks)
+
+    def _text(self, name: str) -> list[str]:
+        return [value or "" for value in self._read(name).to_pylist()]
+
+    def _build(self, name: str) -> np.ndarray:
+        if name in text_fields or name.startswith(response_prefix):
+            return np.array([value.casefold() for value in self._text(name)], dtype=str)
+        if name in date_fields:
+            return self._read(name).cast("int64").to_numpy()
+        if name in flag_fields:
+            return (
+                self._read(name, "bool").fill_null(False).to_numpy(zero_copy_only=False)
+            )
+        if name == "level":
+            answers = np.array(
+                self._text(response_prefix + "python-experience"), dtype=str
+            )
+            levels = np.zeros(len(answers), dtype=np.int8)
+            for level in PythonLevel:
+                levels[answers == level.name] = level.value
+            return levels
+        raise KeyError(name)
+
+    def labels(self, name: str) -> np.ndarray:
+        if name not in self._labels and name in text_fields:
+            self._labels[name] = np.array(self._text(name), dtype=str)
+        return super().labels(name)
@@ -1,41 +1,117 @@
 import json
 import pathlib
 import typing
+from collections.abc import Iterator
+
 import typer
 from openpyxl.reader.excel import load_workbook
-import pandas as pd
 
 from models import SpeakerModel
 
 app = typer.Typer()
 
+columns = {
+    "Speaker Id": "speaker_id",
+    "FirstName": "first_name",
+    "LastName": "last_name",
+    "Email": "email",
+}
+
+
+class SessionizeError(ValueError):
+    pass
+
+
+def read_speakers(
+    sessionize_file: pathlib.Path,
+    sheet_names: list[str],
+) -> Iterator[tuple[str, str, str, str | None]]:
+    """Stream the speaker columns out of a Sessionize export.
+
+    The workbook is opened read-only, rows are read one at a time and only
+    the four columns we need are kept.
+
+    Yields:
+        ``(speaker_id, first_name, last_name, email)`` tuples.
+
+    Raises:
+        SessionizeError: When a sheet, or a column of a sheet, is missing.
+    """
+    workbook = load_workbook(sessionize_file, read_only=True, data_only=True)
+    try:
+        for sheet_name in sheet_names:
+            if sheet_name not in workbook.sheetnames:
+                raise SessionizeError(
+                    f"{sessionize_file}: no sheet {sheet_name!r}, "
+                    f"sheets are {', '.join(map(repr, workbook.sheetnames))}"
+                )
+            rows = workbook[sheet_name].iter_rows(values_only=True)
+            header = next(rows, ())
+            missing = [column for column in columns if column not in header]
+            if missing:
+                raise SessionizeError(
+                    f"{sessionize_file}: sheet {sheet_name!r} has no column "
+                    f"{', '.join(map(repr, missing))}"
+                )
+            positions = [header.index(column) for column in columns]
+            for row in rows:
+                speaker_id, first_name, last_name, email = (
+                    row[position] if position < len(row) else None
+                    for position in positions
+                )
+                if speaker_id is None:
+                    continue
+                yield (
+                    str(speaker_id),
+                    first_name or "",
+                    last_name or "",
+                    email.lower() if email else None,
+                )
+    finally:
+        workbook.close()
+
 
 @app.command()
 def main(
-    sessionize_file: typing.Annotated[
-        pathlib.Path,
-        typer.Argument(help="Sessionize file", default=...),
+    sessionize_files: typing.Annotated[
+        list[pathlib.Path],
+        typer.Argument(help="Sessionize files, one per event", default=...),
     ],
     speakers_file: typing.Annotated[
         pathlib.Path,
         typer.Argument(help="JSON target file for the accepted speakers", default=...),
     ],
+    sheet_names: typing.Annotated[
+        list[str],
+        typer.Option("--sheet", help="Sheets to read in every file"),
+    ] = ["Accepted speakers"],
 ):
-    columns = {
-        "Speaker Id": "speaker_id",
-        "FirstName": "first_name",
-        "LastName": "last_name",
-        "Email": "email",
-    }
-    df: pd.DataFrame = pd.read_excel(
-        sessionize_file,
-        sheet_name="Accepted speakers",
-        usecols=columns.keys(),
-    ).rename(columns=columns)
-    df['email'] = df['email'].str.lower()
-    df['full_name'] = df['first_name'] + ' ' + df['last_name']
-    df = df.sort_values(by=['full_name'],ascending=True)
-    df.to_json(speakers_file, orient="records", indent=4)
+    speakers = {}
+    try:
+        for sessionize_file in sessionize_files:
+            for row in read_speakers(sessionize_file, sheet_names):
+                speakers.setdefault(row[0], row)
+    except SessionizeError as e:
+        typer.echo(str(e), err=True)
+        raise typer.Exit(code=1)
+
+    rows = sorted(speakers.values(), key=lambda row: f"{row[1]} {row[2]}")
+    with open(speakers_file, "w") as fp:
+        json.dump(
+            fp=fp,
+            obj=[
+                SpeakerModel(
+                    speaker_id=speaker_id,
+                    first_name=first_name,
+                    last_name=last_name,
+                    email=email,
+                ).model_dump()
+                | {"full_name": f"{first_name} {last_name}"}
+                for speaker_id, first_name, last_name, email in rows
+            ],
+            indent=4,
+        )
+    print(f"{len(rows)} speakers")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,254 @@
+"""
+Deserialisation of ticket files and Tito API pages, with selectable backends.
+
+Every backend turns the same JSON into the same ``TicketModel`` and
+``TicketAPIModel`` objects:
+
+- ``pydantic``: the models validate themselves (lax mode, the default);
+- ``pydantic-strict``: the same in strict mode, no type coercion;
+- ``msgspec``: ``msgspec`` structs mirroring the models decode the JSON, the
+  models are then built without validating again (needs ``msgspec``);
+- ``marshmallow``: the legacy schemas of ``schema.py``, likewise.
+
+The backend is ``decoding.backend`` in ``settings.toml``. Decoders are built
+once per process, not per file. ``benchmark`` decodes synthetic API pages and
+ticket files with each backend and checks the result against ``pydantic``.
+"""
+
+import abc
+import datetime
+import functools
+import json
+import time
+from collections.abc import Iterable
+
+import pydantic
+
+from config import settings
+from models import PaginationModel, TicketAPIModel, TicketModel
+
+
+class Decoder(abc.ABC):
+    """Decodes ticket files (a JSON array of tickets) and API pages."""
+
+    name: str
+
+    @abc.abstractmethod
+    def tickets(self, data: bytes | str) -> list[TicketModel]:
+        """Decode a JSON array of tickets."""
+
+    @abc.abstractmethod
+    def page(self, data: bytes | str) -> TicketAPIModel:
+        """Decode one page of the Tito tickets API."""
+
+
+class PydanticDecoder(Decoder):
+    def __init__(self, strict: bool = False) -> None:
+        self.name = "pydantic-strict" if strict else "pydantic"
+        self.strict = strict
+        self.adapter = pydantic.TypeAdapter(list[TicketModel])
+
+    def tickets(self, data: bytes | str) -> list[TicketModel]:
+        return self.adapter.validate_json(data, strict=self.strict)
+
+    def page(self, data: bytes | str) -> TicketAPIModel:
+        return TicketAPIModel.model_validate_json(data, strict=self.strict)
+
+
+class MsgspecDecoder(Decoder):
+    name = "msgspec"
+
+    def __init__(self) -> None:
+        try:
+            import msgspec
+        except ImportError:
+            raise RuntimeError("the msgspec backend needs msgspec: pip install msgspec")
+
+        class Ticket(msgspec.Struct, kw_only=True):
+            first_name: str | None = ""
+            last_name: str | None = ""
+            name: str | None = None
+            email: str | None = None
+            responses: dict
+            reference: str
+            release_title: str
+            created_at: datetime.datetime
+            updated_at: datetime.datetime
+            speaker: bool = False
+            exhibitor: bool = False
+            volunteer: bool = False
+            organiser: bool = False
+            sponsor: bool = False
+
+        class Pagination(msgspec.Struct):
+            next_page: int | None = None
+
+        class Page(msgspec.Struct):
+            tickets: list[Ticket]
+            meta: Pagination
+
+        self.fields = Ticket.__struct_fields__
+        self.tickets_decoder = msgspec.json.Decoder(list[Ticket])
+        self.page_decoder = msgspec.json.Decoder(Page)
+
+    def model(self, ticket) -> TicketModel:
+        return TicketModel.model_construct(
+            **{field: getattr(ticket, field) for field in self.fields}
+        )
+
+    def tickets(self, data: bytes | str) -> list[TicketModel]:
+        return [self.model(ticket) for ticket in self.tickets_decoder.decode(data)]
+
+    def page(self, data: bytes | str) -> TicketAPIModel:
+        page = self.page_decoder.decode(data)
+        return TicketAPIModel.model_construct(
+            tickets=[self.model(ticket) for ticket in page.tickets],
+            meta=PaginationModel.model_construct(next_page=page.meta.next_page),
+        )
+
+
+class MarshmallowDecoder(Decoder):
+    name = "marshmallow"
+
+    def __init__(self) -> None:
+        from schema import TicketAPISchema, TicketSchema
+
+        self.tickets_schema = TicketSchema(many=True)
+        self.page_schema = TicketAPISchema()
+
+    def tickets(self, data: bytes | str) -> list[TicketModel]:
+        return self.tickets_schema.load(json.loads(data))
+
+    def page(self, data: bytes | str) -> TicketAPIModel:
+        return self.page_schema.load(json.loads(data))
+
+
+backends = {
+    "pydantic": PydanticDecoder,
+    "pydantic-strict": lambda: PydanticDecoder(strict=True),
+    "msgspec": MsgspecDecoder,
+    "marshmallow": MarshmallowDecoder,
+}
+
+
+@functools.cache
+def get_decoder(name: str | None = None) -> Decoder:
+    """The decoder of backend ``name``, by default ``decoding.backend``.
+
+    Raises:
+        ValueError: On an unknown backend.
+        RuntimeError: When the backend library is not installed.
+    """
+    name = name or settings.get("decoding", {}).get("backend", "pydantic")
+    if name not in backends:
+        raise ValueError(
+            f"unknown decoding backend {name!r}, one of {', '.join(backends)}"
+        )
+    return backends[name]()
+
+
+class DecoderRun(pydantic.BaseModel):
+    backend: str
+    tickets: int
+    pages_seconds: float | None = None
+    file_seconds: float | None = None
+    correct: bool = False
+    error: str | None = None
+
+    @property
+    def tickets_per_second(self) -> float:
+        if not self.pages_seconds or not self.file_seconds:
+            return 0.0
+        return 2 * self.tickets / (self.pages_seconds + self.file_seconds)
+
+
+def synthetic_payloads(
+    tickets: int, page_size: int, seed: int = 0
+) -> tuple[list[bytes], bytes]:
+    """API pages of a simulated event, and a ticket file of the same tickets.
+
+    A few tickets miss their names or email, or hold a role, so the backends
+    are compared on the optional fields as well.
+    """
+    from tito_simulator import SimulatedEvent, SimulatorConfig
+
+    config = SimulatorConfig(tickets=tickets, seed=seed)
+    event = SimulatedEvent("benchmark", config)
+    for index, ticket in enumerate(event.tickets):
+        if index % 50 == 1:
+            ticket["first_name"] = None
+        if index % 70 == 2:
+            del ticket["name"], ticket["last_name"]
+        if index % 90 == 3:
+            ticket["email"] = None
+        if index % 40 == 4:
+            ticket["speaker"] = True
+
+    page_count = max(1, -(-tickets // page_size))
+    pages = [
+        json.dumps(event.page(number, page_size)).encode()
+        for number in range(1, page_count + 1)
+    ]
+    # ticket files are written by save_tickets, from the models
+    models = PydanticDecoder().tickets(json.dumps(event.tickets))
+    ticket_file = json.dumps(
+        [ticket.model_dump(mode="json") for ticket in models]
+    ).encode()
+    return pages, ticket_file
+
+
+def best_of(repeat: int, function) -> tuple[float, object]:
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def benchmark(
+    tickets: int = 5000,
+    page_size: int = 100,
+    repeat: int = 5,
+    names: Iterable[str] | None = None,
+) -> list[DecoderRun]:
+    """Time every backend on the same payloads, checked against ``pydantic``.
+
+    Args:
+        tickets: Tickets of the synthetic event.
+        page_size: Tickets per API page.
+        repeat: Runs per backend, the fastest one counts.
+        names: Backends to compare, all of them by default.
+
+    Returns:
+        A run per backend, ``correct`` when its tickets and pages equal the
+        ones of the ``pydantic`` backend.
+    """
+    pages, ticket_file = synthetic_payloads(tickets, page_size)
+    reference = PydanticDecoder()
+    expected_pages = [reference.page(page) for page in pages]
+    expected_file = reference.tickets(ticket_file)
+
+    runs = []
+    for name in names or backends:
+        run = DecoderRun(backend=name, tickets=tickets)
+        try:
+            decoder = backends[name]()
+            run.pages_seconds, decoded_pages = best_of(
+                repeat, lambda: [decoder.page(page) for page in pages]
+            )
+            run.file_seconds, decoded_file = best_of(
+                repeat, lambda: decoder.tickets(ticket_file)
+            )
+        except Exception as e:
+            run.error = f"{type(e).__name__}: {e}"
+        else:
+            run.correct = (
+                decoded_file == expected_file
+                and [page.tickets for page in decoded_pages]
+                == [page.tickets for page in expected_pages]
+                and [page.meta.next_page for page in decoded_pages]
+                == [page.meta.next_page for page in expected_pages]
+            )
+        runs.append(run)
+    return runs
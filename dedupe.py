@@ -0,0 +1,374 @@
+"""
+Attendees across events: tickets of the same person grouped into clusters.
+
+Two tickets are linked when their emails are the same once normalised
+(case, ``+tag`` suffixes, dots of Gmail addresses), when an alias file maps
+one email to the other, or when their names are close enough. Comparing the
+names of every pair of tickets of every year would be quadratic, so names are
+only compared within blocks of tickets sharing a key:
+
+- the Soundex code of the last name with the first initial, and the other
+  way round, which tolerates a typo in one of the names;
+- the bands of a MinHash signature of the name trigrams, which catch
+  reordered, accented or hyphenated names with a similar spelling;
+- the local part of the email, for work and personal addresses of a person.
+
+Links are merged strongest first. A name link only merges two clusters when
+their first tickets match as well, so similar names do not chain into one
+cluster. The confidence of a cluster is its weakest link: a cluster held
+together by a single doubtful name match shows it.
+"""
+
+import collections
+import csv
+import difflib
+import functools
+import pathlib
+import re
+import unicodedata
+import zlib
+from collections.abc import Iterable, Mapping
+
+import numpy as np
+import pydantic
+
+from models import TicketModel
+
+gmail_domains = {"gmail.com", "googlemail.com"}
+free_domains = gmail_domains | {
+    "hotmail.com",
+    "outlook.com",
+    "yahoo.com",
+    "icloud.com",
+    "live.com",
+    "eircom.net",
+    "protonmail.com",
+}
+
+soundex_codes = {
+    **dict.fromkeys("bfpv", "1"),
+    **dict.fromkeys("cgjkqsxz", "2"),
+    **dict.fromkeys("dt", "3"),
+    "l": "4",
+    **dict.fromkeys("mn", "5"),
+    "r": "6",
+}
+
+
+def fold(text: str | None) -> str:
+    """Lower case ASCII letters and single spaces: "Ó Súilleabháin" → "o suilleabhain"."""
+    text = unicodedata.normalize("NFKD", text or "")
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    return " ".join(re.sub(r"[^a-z ]+", " ", text.casefold()).split())
+
+
+def normalise_email(email: str | None) -> str:
+    email = (email or "").strip().casefold()
+    local, at, domain = email.rpartition("@")
+    if not at:
+        return email
+    local = local.split("+", 1)[0]
+    if domain in gmail_domains:
+        local, domain = local.replace(".", ""), "gmail.com"
+    return f"{local}@{domain}"
+
+
+def soundex(word: str) -> str:
+    """American Soundex of a folded word, "" for an empty one."""
+    letters = word.replace(" ", "")
+    if not letters:
+        return ""
+    code = letters[0]
+    previous = soundex_codes.get(letters[0], "")
+    for letter in letters[1:]:
+        digit = soundex_codes.get(letter, "")
+        if digit and digit != previous:
+            code += digit
+        if letter not in "hw":
+            previous = digit
+    return (code + "000")[:4]
+
+
+class MinHash:
+    """MinHash signatures of sets of strings, cut in bands for LSH.
+
+    With ``bands`` bands of ``rows`` rows, two sets share a band with a
+    probability of ``1 - (1 - j ** rows) ** bands`` for a Jaccard similarity
+    ``j``: about 0.9 at j = 0.7 and 0.2 at j = 0.3 with the defaults.
+
+    Args:
+        bands: Number of bands, each one a blocking key.
+        rows: Hashes per band.
+        seed: Seed of the hash functions, signatures are reproducible.
+    """
+
+    prime = (1 << 31) - 1
+
+    def __init__(self, bands: int = 8, rows: int = 4, seed: int = 0) -> None:
+        self.bands = bands
+        self.rows = rows
+        rng = np.random.default_rng(seed)
+        size = bands * rows
+        self.a = rng.integers(1, self.prime, size, dtype=np.uint64)
+        self.b = rng.integers(0, self.prime, size, dtype=np.uint64)
+
+    def signature(self, items: Iterable[str]) -> np.ndarray:
+        hashes = np.array(
+            [zlib.crc32(item.encode()) & self.prime for item in items], dtype=np.uint64
+        )
+        if not len(hashes):
+            return np.zeros(self.bands * self.rows, dtype=np.uint64)
+        return ((np.outer(hashes, self.a) + self.b) % self.prime).min(axis=0)
+
+    def band_keys(self, items: Iterable[str]) -> list[tuple]:
+        signature = self.signature(items).reshape(self.bands, self.rows)
+        return [("minhash", band, row.tobytes()) for band, row in enumerate(signature)]
+
+
+def trigrams(name: str) -> set[str]:
+    padded = f" {name} "
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+class Member(pydantic.BaseModel):
+    event: str
+    reference: str
+    name: str | None
+    email: str | None
+
+
+class Cluster(pydantic.BaseModel):
+    id: int
+    confidence: float
+    name: str
+    emails: list[str]
+    events: list[str]
+    links: list[str]
+    members: list[Member]
+
+
+class DedupeResult(pydantic.BaseModel):
+    tickets: int
+    comparisons: int
+    oversized_blocks: int
+    clusters: list[Cluster]
+
+
+class Record:
+    """A ticket with its normalised name and email."""
+
+    __slots__ = ("event", "ticket", "first", "last", "email", "local", "domain")
+
+    def __init__(self, event: str, ticket: TicketModel) -> None:
+        self.event = event
+        self.ticket = ticket
+        self.first = fold(ticket.first_name)
+        self.last = fold(ticket.last_name)
+        if not (self.first or self.last):
+            self.first, _, self.last = fold(ticket.name).partition(" ")
+        self.email = normalise_email(ticket.email)
+        self.local, _, self.domain = self.email.rpartition("@")
+
+    @property
+    def full_name(self) -> str:
+        return f"{self.first} {self.last}".strip()
+
+
+@functools.lru_cache(maxsize=1 << 16)
+def ratio(a: str, b: str) -> float:
+    # first names, and last names within a block, come back over and over
+    return difflib.SequenceMatcher(None, a, b).ratio()
+
+
+def part_similarity(a: str, b: str) -> float:
+    if a == b:
+        return 1.0
+    if not a or not b:
+        return 0.0
+    if len(a) == 1 or len(b) == 1:
+        # an initial: "J. Smith"
+        return 0.85 if a[0] == b[0] else 0.0
+    return ratio(a, b) if a < b else ratio(b, a)
+
+
+def name_similarity(a: Record, b: Record) -> float:
+    straight = part_similarity(a.first, b.first) + part_similarity(a.last, b.last)
+    swapped = part_similarity(a.first, b.last) + part_similarity(a.last, b.first)
+    return max(straight, swapped) / 2
+
+
+def score(a: Record, b: Record) -> float:
+    """Likelihood that two tickets without a common email are the same person.
+
+    Namesakes exist: a name alone never reaches the certainty of an email.
+    """
+    value = 0.9 * name_similarity(a, b)
+    if a.local and a.local == b.local and len(a.local) >= 4:
+        value += 0.1
+    elif a.domain and a.domain == b.domain and a.domain not in free_domains:
+        value += 0.05
+    if a.event == b.event and a.email and b.email:
+        # two tickets of the same event under two emails: usually two people
+        value -= 0.2
+    return max(0.0, min(1.0, value))
+
+
+def blocking_keys(record: Record, minhash: MinHash) -> list[tuple]:
+    keys = []
+    if record.first and record.last:
+        keys.append(("soundex-last", soundex(record.last), record.first[0]))
+        keys.append(("soundex-first", soundex(record.first), record.last[0]))
+    if record.full_name:
+        keys.extend(minhash.band_keys(trigrams(record.full_name)))
+    if len(record.local) >= 4:
+        keys.append(("local", record.local))
+    return keys
+
+
+def load_aliases(path: str | pathlib.Path) -> list[tuple[str, str]]:
+    """Pairs of emails of a same person, from a CSV like ``emails.mapping.csv``."""
+    aliases = []
+    with open(path, newline="") as fp:
+        for row in csv.reader(fp):
+            emails = [cell.strip() for cell in row if cell.strip()]
+            if len(emails) < 2 or emails[0].startswith("#") or "@" not in emails[0]:
+                continue
+            aliases.extend((emails[0], email) for email in emails[1:])
+    return aliases
+
+
+class UnionFind:
+    def __init__(self, size: int) -> None:
+        self.parent = list(range(size))
+
+    def find(self, item: int) -> int:
+        while self.parent[item] != item:
+            self.parent[item] = self.parent[self.parent[item]]
+            item = self.parent[item]
+        return item
+
+    def union(self, a: int, b: int) -> bool:
+        a, b = self.find(a), self.find(b)
+        if a == b:
+            return False
+        self.parent[b] = a
+        return True
+
+
+def dedupe(
+    events: Mapping[str, list[TicketModel]],
+    aliases: Iterable[tuple[str, str]] = (),
+    threshold: float = 0.85,
+    max_block: int = 500,
+    minhash: MinHash | None = None,
+) -> DedupeResult:
+    """Group the tickets of all events into clusters, one per person.
+
+    Args:
+        events: Tickets per event.
+        aliases: Pairs of emails of a same person.
+        threshold: Minimal name score linking two tickets.
+        max_block: Blocks with more tickets are not compared, a key shared
+            by that many people ("john", a company address) says nothing.
+        minhash: MinHash of the name trigrams, defaults to ``MinHash()``.
+
+    Returns:
+        The clusters, the largest first, and the work done.
+    """
+    minhash = minhash or MinHash()
+    records = [
+        Record(event, ticket) for event, tickets in events.items() for ticket in tickets
+    ]
+    # (score, kind, a, b)
+    links: list[tuple[float, str, int, int]] = []
+
+    by_email = collections.defaultdict(list)
+    for index, record in enumerate(records):
+        if record.email:
+            by_email[record.email].append(index)
+    for indices in by_email.values():
+        links.extend((1.0, "email", indices[0], other) for other in indices[1:])
+    for email, alias in aliases:
+        a, b = (
+            by_email.get(normalise_email(email)),
+            by_email.get(normalise_email(alias)),
+        )
+        if a and b:
+            links.append((1.0, "alias", a[0], b[0]))
+
+    blocks = collections.defaultdict(list)
+    for index, record in enumerate(records):
+        for key in blocking_keys(record, minhash):
+            blocks[key].append(index)
+
+    compared = set()
+    oversized = 0
+    for indices in blocks.values():
+        if len(indices) > max_block:
+            oversized += 1
+            continue
+        for i, a in enumerate(indices):
+            for b in indices[i + 1 :]:
+                if records[a].email and records[a].email == records[b].email:
+                    continue
+                pair = (a, b) if a < b else (b, a)
+                if pair in compared:
+                    continue
+                compared.add(pair)
+                value = score(records[a], records[b])
+                if value >= threshold:
+                    links.append((value, "name", a, b))
+
+    clusters = UnionFind(len(records))
+    confidence = [1.0] * len(records)
+    kinds = [set() for _ in records]
+    for value, kind, a, b in sorted(links, key=lambda link: -link[0]):
+        root_a, root_b = clusters.find(a), clusters.find(b)
+        if root_a == root_b:
+            continue
+        if kind == "name" and score(records[root_a], records[root_b]) < threshold:
+            # "John Murtel" ~ "John Murtell" ~ "Jon Murtell": no chaining
+            # away from the first ticket of the cluster
+            continue
+        clusters.union(root_a, root_b)
+        # strongest links first: this one is the weakest of the cluster
+        confidence[root_a] = min(confidence[root_a], confidence[root_b], value)
+        kinds[root_a] |= kinds[root_b] | {kind}
+
+    members = collections.defaultdict(list)
+    for index in range(len(records)):
+        members[clusters.find(index)].append(records[index])
+
+    result = []
+    for root, cluster in members.items():
+        names = collections.Counter(record.ticket.name or "" for record in cluster)
+        result.append(
+            Cluster(
+                id=0,
+                confidence=round(confidence[root], 3),
+                name=names.most_common(1)[0][0],
+                emails=sorted({r.ticket.email for r in cluster if r.ticket.email}),
+                events=sorted({record.event for record in cluster}),
+                links=sorted(kinds[root]),
+                members=[
+                    Member(
+                        event=record.event,
+                        reference=record.ticket.reference,
+                        name=record.ticket.name,
+                        email=record.ticket.email,
+                    )
+                    for record in cluster
+                ],
+            )
+        )
+    result.sort(
+        key=lambda cluster: (-len(cluster.members), cluster.confidence, cluster.name)
+    )
+    for id, cluster in enumerate(result, 1):
+        cluster.id = id
+    return DedupeResult(
+        tickets=len(records),
+        comparisons=len(compared),
+        oversized_blocks=oversized,
+        clusters=result,
+    )
@@ -1,57 +1,62 @@
-import collections
+import glob
 import json
+import pathlib
+import sys
 
-import pydantic
-from openpyxl.workbook import Workbook
-
-from models import TicketModel
+from decoders import get_decoder
+from dedupe import dedupe
+from exporters import export_rows
 
 
 def main():
-    years = [2015, 2016, 2017, 2018, 2019, 2020]
-    ticket_files = [
-        (year, pydantic.parse_file_as(list[TicketModel], f"tickets-{year}.json"))
-        for year in years
-    ]
-
-    attendees = collections.defaultdict(lambda: {"name": "", "years": []})
-
-    for (year, tickets) in ticket_files:
-        for ticket in tickets:
-            if not ticket.email:
-                continue
-            attendees[ticket.email]["name"] = ticket.name
-            attendees[ticket.email]["years"].append(year)
+    # one file per year, e.g. pycon-2019-tickets.json
+    patterns = sys.argv[1:] or ["pycon-*-tickets.json"]
+    ticket_files = sorted(
+        pathlib.Path(path) for pattern in patterns for path in glob.glob(pattern)
+    )
+    decoder = get_decoder()
+    events = {
+        ticket_file.stem.removesuffix("-tickets"): decoder.tickets(
+            ticket_file.read_bytes()
+        )
+        for ticket_file in ticket_files
+    }
+    # an attendee is a cluster of tickets, see dedupe.py
+    clusters = sorted(
+        (cluster for cluster in dedupe(events).clusters if cluster.emails),
+        key=lambda cluster: cluster.emails[0].lower(),
+    )
 
-    # sorted_emails = sorted(attendees.keys())
     with open("sorted_attendees.json", "w") as fp:
         json.dump(
             fp=fp,
             obj=[
                 {
-                    "email": email,
-                    "name": attendees[email]["name"],
-                    "years": attendees[email]["years"],
+                    "email": cluster.emails[0],
+                    "emails": cluster.emails,
+                    "name": cluster.name,
+                    "years": cluster.events,
+                    "confidence": cluster.confidence,
                 }
-                for email in sorted(attendees.keys())
+                for cluster in clusters
             ],
             indent=4,
         )
 
-    wb = Workbook()
-    ws1 = wb.active
-    ws1.title = "Attendees"
-    ws1.append(["Email", "Name"]) # , "Years"])
-
-    for index, email in enumerate(sorted(attendees.keys()), 1):
-        ws1.append(
-            [
-                email,
-                attendees[email]["name"],
-                # ",".join(map(str, attendees[email]["years"])),
-            ],
-        )
-    wb.save("attendees.xlsx")
+    export_rows(
+        "attendees.xlsx",
+        ["Email", "Name", "Years", "Confidence"],
+        (
+            (
+                cluster.emails[0],
+                cluster.name,
+                ",".join(cluster.events),
+                cluster.confidence,
+            )
+            for cluster in clusters
+        ),
+        title="Attendees",
+    )
 
 
 if __name__ == "__main__":
@@ -0,0 +1,154 @@
+"""
+Streaming exports to xlsx, CSV and Parquet.
+
+Rows are consumed from an iterable one at a time and written straight out, so
+an export runs in constant memory whatever its size: xlsx goes through
+openpyxl's write-only mode, Parquet is written in record batches. The format
+follows the output file suffix. Parquet needs ``pyarrow``, imported on first
+use.
+
+Parquet columns are typed up front from the header (``types``, strings by
+default), not guessed from the first batch: a column empty in the first rows
+and filled later is still a string column. Exports are written to a temporary
+file renamed over the output once complete.
+"""
+
+import csv
+import datetime
+import itertools
+import json
+import os
+import pathlib
+from collections.abc import Iterable, Mapping, Sequence
+
+from openpyxl import Workbook
+
+formats = (".xlsx", ".csv", ".parquet")
+
+
+def xlsx_value(value):
+    """Excel has no timezones, aware datetimes are written in UTC."""
+    if isinstance(value, datetime.datetime) and value.tzinfo is not None:
+        return value.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def write_xlsx(
+    path: pathlib.Path, header: Sequence[str], rows: Iterable[Sequence], title: str
+) -> int:
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(title)
+    sheet.append(list(header))
+    count = 0
+    for count, row in enumerate(rows, 1):
+        sheet.append([xlsx_value(value) for value in row])
+    workbook.save(path)
+    return count
+
+
+def write_csv(
+    path: pathlib.Path, header: Sequence[str], rows: Iterable[Sequence]
+) -> int:
+    count = 0
+    with open(path, "w", newline="") as fp:
+        writer = csv.writer(fp)
+        writer.writerow(header)
+        for count, row in enumerate(rows, 1):
+            writer.writerow(row)
+    return count
+
+
+def parquet_type(pa, python_type: type):
+    return {
+        str: pa.string(),
+        int: pa.int64(),
+        float: pa.float64(),
+        bool: pa.bool_(),
+        datetime.datetime: pa.timestamp("us", tz="UTC"),
+    }[python_type]
+
+
+def parquet_value(value):
+    """String columns take any answer, lists and numbers are written as JSON."""
+    if value is None or isinstance(value, str):
+        return value
+    return json.dumps(value, default=str)
+
+
+def write_parquet(
+    path: pathlib.Path,
+    header: Sequence[str],
+    rows: Iterable[Sequence],
+    types: Mapping[str, type] | None = None,
+    batch_size: int = 10_000,
+) -> int:
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise ImportError(
+            "Parquet exports need pyarrow: pip install -r requirements.txt"
+        ) from e
+
+    types = types or {}
+    schema = pa.schema(
+        [pa.field(name, parquet_type(pa, types.get(name, str))) for name in header]
+    )
+    rows = iter(rows)
+    count = 0
+    with pq.ParquetWriter(path, schema) as writer:
+        while batch := list(itertools.islice(rows, batch_size)):
+            arrays = []
+            for field, column in zip(schema, zip(*batch)):
+                if field.type == pa.string():
+                    column = [parquet_value(value) for value in column]
+                arrays.append(pa.array(column, type=field.type))
+            writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+            count += len(batch)
+    return count
+
+
+def export_rows(
+    path: str | pathlib.Path,
+    header: Sequence[str],
+    rows: Iterable[Sequence],
+    title: str = "Sheet",
+    types: Mapping[str, type] | None = None,
+) -> int:
+    """Write ``rows`` under ``header`` to ``path``, in the format of its suffix.
+
+    Args:
+        path: Output file, ending with ``.xlsx``, ``.csv`` or ``.parquet``.
+        header: Column names.
+        rows: Rows, each with one value per column; a generator is consumed
+            lazily.
+        title: Name of the xlsx worksheet.
+        types: Python type (``str``, ``int``, ``float``, ``bool`` or
+            ``datetime.datetime``) of the Parquet columns, by name; the
+            columns not listed are strings.
+
+    Returns:
+        The number of rows written.
+
+    Raises:
+        ValueError: If the suffix is not a supported format.
+    """
+    path = pathlib.Path(path)
+    suffix = path.suffix.lower()
+    if suffix not in formats:
+        raise ValueError(
+            f"unsupported export format {path.suffix!r}, use one of {formats}"
+        )
+
+    tmp = path.with_name(f".{path.name}.tmp")
+    try:
+        if suffix == ".xlsx":
+            count = write_xlsx(tmp, header, rows, title)
+        elif suffix == ".csv":
+            count = write_csv(tmp, header, rows)
+        else:
+            count = write_parquet(tmp, header, rows, types)
+        os.replace(tmp, path)
+    finally:
+        tmp.unlink(missing_ok=True)
+    return count
@@ -0,0 +1,145 @@
+"""
+Bounded-memory badge builds for very large ticket sets.
+
+Ticket files are streamed (``utils.iter_json_array``, or
+``columnar.iter_tickets`` for snapshots) in chunks of
+``run_size`` tickets. Each chunk gets its references remapped, its roles
+marked and its filter applied, then is sorted by reference and spilled to a
+run file. The runs are merged lazily with ``heapq.merge``.
+
+The A4 imposition puts badge ``i`` and ``i + nb_pages`` on the same sheet so
+the stacks stay in order once cut (``utils.two_per_page``). Knowing the
+number of tickets from the run pass, ``two_per_page_stream`` spills the first
+half of the merged stream to a file and reads it back while the second half
+arrives. At any time only a chunk of tickets is held in memory.
+"""
+
+import heapq
+import itertools
+import math
+import pathlib
+import tempfile
+from collections.abc import Callable, Iterable, Iterator
+
+from build_badge import LayoutParameters, draw_badges, register_fonts
+from columnar import is_snapshot, iter_tickets
+from models import TicketModel
+from utils import iter_json_array, two_per_page
+
+
+def iter_ticket_files(ticket_files: list[pathlib.Path]) -> Iterator[TicketModel]:
+    """Yield the tickets of every file, parsing one ticket at a time."""
+    for ticket_file in ticket_files:
+        if is_snapshot(ticket_file):
+            yield from iter_tickets(ticket_file)
+            continue
+        with open(ticket_file) as fp:
+            for item in iter_json_array(fp):
+                yield TicketModel.model_validate(item)
+
+
+def write_run(tickets: list[TicketModel], path: pathlib.Path) -> None:
+    with open(path, "w") as fp:
+        for ticket in tickets:
+            fp.write(ticket.model_dump_json())
+            fp.write("\n")
+
+
+def read_run(path: pathlib.Path) -> Iterator[TicketModel]:
+    with open(path) as fp:
+        for line in fp:
+            yield TicketModel.model_validate_json(line)
+
+
+def sorted_runs(
+    chunks: Iterable[list[TicketModel]], directory: pathlib.Path
+) -> tuple[list[pathlib.Path], int]:
+    """Sort each chunk by reference and spill it to a run file.
+
+    Returns:
+        The run files and the total number of tickets.
+    """
+    runs = []
+    count = 0
+    for index, chunk in enumerate(chunks):
+        if not chunk:
+            continue
+        path = directory / f"run-{index:05d}.jsonl"
+        write_run(sorted(chunk, key=lambda ticket: ticket.reference), path)
+        runs.append(path)
+        count += len(chunk)
+    return runs, count
+
+
+def merge_runs(runs: list[pathlib.Path]) -> Iterator[TicketModel]:
+    """Merge sorted runs; equal references keep their input order."""
+    return heapq.merge(
+        *(read_run(run) for run in runs), key=lambda ticket: ticket.reference
+    )
+
+
+def two_per_page_stream(
+    tickets: Iterator[TicketModel], count: int, directory: pathlib.Path
+) -> Iterator[tuple[int, TicketModel]]:
+    """Same order as ``utils.two_per_page``, for a stream of ``count`` tickets."""
+    nb_pages = math.ceil(count / 2.0)
+    spill = directory / "first-half.jsonl"
+    with open(spill, "w") as fp:
+        for ticket in itertools.islice(tickets, nb_pages):
+            fp.write(ticket.model_dump_json())
+            fp.write("\n")
+
+    first_half = read_run(spill)
+    for i, ticket in enumerate(first_half):
+        yield i, ticket
+        second = next(tickets, None)
+        if second is not None:
+            yield i + nb_pages, second
+
+
+def chunked(iterable: Iterable, size: int) -> Iterator[list]:
+    iterator = iter(iterable)
+    while chunk := list(itertools.islice(iterator, size)):
+        yield chunk
+
+
+def build_low_memory(
+    ticket_files: list[pathlib.Path],
+    prepare: Callable[[list[TicketModel]], list[TicketModel]],
+    layout: LayoutParameters,
+    limit: int | None = None,
+    run_size: int = 10_000,
+) -> int:
+    """Build the badges of ``ticket_files`` holding one chunk at a time.
+
+    Args:
+        ticket_files: JSON ticket files (or columnar snapshots).
+        prepare: Applied to every chunk: reference mapping, roles and
+            filters; it must treat each ticket on its own.
+        layout: Layout holding the output canvas.
+        limit: Keep only the first ``limit`` selected tickets.
+        run_size: Tickets per sorted run.
+
+    Returns:
+        The number of badges drawn.
+    """
+    selected = itertools.chain.from_iterable(
+        prepare(chunk) for chunk in chunked(iter_ticket_files(ticket_files), run_size)
+    )
+    if limit is not None:
+        selected = itertools.islice(selected, limit)
+
+    with tempfile.TemporaryDirectory(prefix="badges-") as tmp:
+        directory = pathlib.Path(tmp)
+        runs, count = sorted_runs(chunked(selected, run_size), directory)
+        if not count:
+            return 0
+
+        tickets = merge_runs(runs)
+        if layout.ordering_function is two_per_page:
+            ordered = two_per_page_stream(tickets, count, directory)
+        else:
+            ordered = enumerate(tickets)
+        register_fonts()
+        draw_badges(ordered, layout)
+    return count
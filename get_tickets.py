@@ -1,13 +1,22 @@
+import datetime
 import logging
-from urllib.parse import urlunsplit, urlencode
+import threading
+import time
+from urllib.parse import urlencode, urlsplit, urlunsplit
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 from config import settings
-from models import TicketAPIModel
+from decoders import get_decoder
+from http_trace import HttpTrace
+from page_cache import PageCache
 
 log = logging.getLogger(__name__)
 ACCOUNT = settings.API.account
+BASE_URL = settings.API.get("base_url", "https://api.tito.io")
+CHECKIN_URL = settings.API.get("checkin_url", "https://checkin.tito.io")
 
 headers = {
     "Authorization": f"Token token={settings.TITO_TOKEN}",
@@ -15,25 +24,188 @@ headers = {
 }
 
 
-def get_url(account: str, event: str, page: int) -> str:
-    query: str = urlencode(dict(page=page, view='extended'))
-    path: str = f'/v3/{account}/{event}/tickets'
-    return urlunsplit(('https', 'api.tito.io', path, query, ''))
+def get_url(account: str, event: str, page: int, base_url: str = BASE_URL) -> str:
+    scheme, netloc, prefix, *_ = urlsplit(base_url)
+    query: str = urlencode(dict(page=page, view="extended"))
+    path: str = f"{prefix.rstrip('/')}/v3/{account}/{event}/tickets"
+    return urlunsplit((scheme, netloc, path, query, ""))
 
 
-def get_tickets(event: str):
+class RateLimiter:
+    """Token bucket shared by every thread using a session.
+
+    Args:
+        rate: Requests per second allowed on average.
+        burst: Requests allowed back to back after an idle period.
+    """
+
+    def __init__(self, rate: float, burst: int = 1) -> None:
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self) -> None:
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(
+                self.burst, self.tokens + (now - self.updated_at) * self.rate
+            )
+            self.updated_at = now
+            self.tokens -= 1
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+        if wait:
+            time.sleep(wait)
+
+
+class TitoSession(requests.Session):
+    """Pooled session with retries on rate limiting and server errors.
+
+    Args:
+        pool_size: Connections kept open, match the number of threads.
+        rate: Optional requests per second budget shared by all threads.
+        base_url: API root, e.g. a local ``tito_simulator``.
+        trace: Optional ``HttpTrace`` recording every request.
+    """
+
+    def __init__(
+        self,
+        pool_size: int = 10,
+        rate: float | None = None,
+        base_url: str = BASE_URL,
+        trace: HttpTrace | None = None,
+    ) -> None:
+        super().__init__()
+        self.base_url = base_url
+        self.trace = trace
+        self.headers.update(headers)
+        self.rate_limiter = RateLimiter(rate, burst=pool_size) if rate else None
+        retry = Retry(
+            total=5,
+            backoff_factor=0.5,
+            status_forcelist=(429, 500, 502, 503, 504),
+            respect_retry_after_header=True,
+        )
+        adapter = HTTPAdapter(
+            pool_connections=1, pool_maxsize=pool_size, max_retries=retry
+        )
+        self.mount("https://", adapter)
+        self.mount("http://", adapter)
+
+    def request(self, method, url, *args, **kwargs):
+        if self.rate_limiter is not None:
+            self.rate_limiter.acquire()
+        if self.trace is None:
+            return super().request(method, url, *args, **kwargs)
+
+        started_at = datetime.datetime.now(datetime.timezone.utc)
+        start = time.perf_counter()
+        try:
+            response = super().request(method, url, *args, **kwargs)
+        except requests.RequestException as e:
+            self.trace.record(
+                method, url, started_at, time.perf_counter() - start, error=e
+            )
+            raise
+        self.trace.record(
+            method, url, started_at, time.perf_counter() - start, response
+        )
+        return response
+
+
+class PageNotCached(LookupError):
+    """An offline download needs a page the cache does not hold."""
+
+
+def fetch_page(
+    session: requests.Session | None,
+    event: str,
+    page: int,
+    cache: PageCache | None = None,
+    offline: bool = False,
+    resume_until: int = 0,
+) -> bytes:
+    """Return the body of a ticket page, going through the cache if any.
+
+    Pages up to ``resume_until``, completed by an interrupted download, are
+    read back from the cache; other cached pages are revalidated with a
+    conditional request. In offline mode the API is never called.
+
+    Raises:
+        PageNotCached: In offline mode, when the page is not in the cache.
+    """
+    if cache is not None and (offline or page <= resume_until):
+        cached = cache.load(event, page)
+        if cached is not None:
+            return cached[0]
+    if offline:
+        raise PageNotCached(f"page {page} of {event} is not in the cache")
+
+    validators = cache.validators(event, page) if cache is not None else {}
+    base_url = getattr(session, "base_url", BASE_URL)
+    response = session.get(get_url(ACCOUNT, event, page, base_url), headers=validators)
+    if response.status_code == 304:
+        return cache.load(event, page)[0]
+    response.raise_for_status()
+    if cache is not None:
+        cache.store(event, page, response.content, response.headers)
+    return response.content
+
+
+def get_ticket_pages(
+    event: str,
+    session: requests.Session | None = None,
+    cache: PageCache | None = None,
+    offline: bool = False,
+):
+    """Yield the tickets of each API page as soon as the page is parsed."""
+    if session is None and not offline:
+        session = TitoSession(pool_size=1)
+    resume_until = cache.completed_pages(event) if cache is not None else 0
     page: int | None = 1
     while page is not None:
-        response = requests.get(get_url(ACCOUNT, event, page), headers=headers)
-        response.raise_for_status()
-
-        instance = TicketAPIModel.parse_obj(response.json())
-        for ticket in instance.tickets:
-            if not ticket.email:
-                continue
-            yield ticket
+        body = fetch_page(session, event, page, cache, offline, resume_until)
+
+        instance = get_decoder().page(body)
+        yield [ticket for ticket in instance.tickets if ticket.email]
+        if cache is not None and not offline:
+            cache.mark_completed(event, page)
         page = instance.meta.next_page
 
+    if cache is not None and not offline:
+        cache.finish(event)
+
+
+def get_tickets(
+    event: str,
+    session: requests.Session | None = None,
+    cache: PageCache | None = None,
+    offline: bool = False,
+):
+    for tickets in get_ticket_pages(event, session, cache, offline):
+        yield from tickets
+
+
+def get_checkins(
+    checkin_list: str,
+    session: requests.Session | None = None,
+    base_url: str = CHECKIN_URL,
+) -> list[dict]:
+    """Return the check-ins of a check-in list, as sent by the Check-in API.
+
+    Args:
+        checkin_list: Slug of the check-in list, it grants access on its own.
+        session: Optional session, e.g. a traced ``TitoSession``.
+        base_url: Root of the Check-in API.
+    """
+    if session is None:
+        session = TitoSession(pool_size=1)
+    url = f"{base_url.rstrip('/')}/checkin_lists/{checkin_list}/checkins"
+    response = session.get(url)
+    response.raise_for_status()
+    return response.json()
+
 
 if __name__ == "__main__":
     print(get_url(settings.API.account, settings.API.event, 1))
@@ -0,0 +1,115 @@
+"""
+Glyph coverage of the badge fonts, and fonts substituted ahead of drawing.
+
+ReportLab draws a character missing from a TrueType font as an empty box,
+silently (``warnOnMissingFontGlyphs`` is off). The characters of every font
+are read once from its cmap; before a build, every text of every badge
+(``{display_name}`` mostly) is checked against the font the template draws it
+with, distinct texts only. A text the font cannot draw gets the first font of
+``settings.fonts.fallback_fonts`` covering it, recorded in the
+``font_fallbacks`` of the draw plan: drawing a badge only looks the text up,
+it never measures glyphs. Texts no font covers are reported before printing,
+by every build.
+"""
+
+import collections
+import functools
+import pathlib
+from collections.abc import Callable, Iterable
+
+import pydantic
+from reportlab.pdfbase import pdfmetrics
+
+from badge_template import DrawPlan, TextOperation, resolve
+from config import settings
+from models import TicketModel
+
+
+class UncoveredText(pydantic.BaseModel):
+    font: str
+    text: str
+    missing: str
+    references: list[str]
+
+
+def fallback_font_name(font_file: str) -> str:
+    """Name a fallback font file is registered under, e.g. ``NotoSans-Regular``."""
+    return pathlib.Path(font_file).stem
+
+
+def fallback_fonts() -> list[str]:
+    return [
+        fallback_font_name(font_file)
+        for font_file in settings.fonts.get("fallback_fonts", [])
+    ]
+
+
+@functools.cache
+def coverage(font: str) -> frozenset[str]:
+    """Characters in the cmap of a registered TrueType font."""
+    return frozenset(map(chr, pdfmetrics.getFont(font).face.charToGlyph))
+
+
+def text_operations(plan: DrawPlan) -> Iterable[tuple[object, TextOperation]]:
+    for side in (plan.recto, plan.verso, plan.ordering):
+        for operation in side.operations:
+            if isinstance(operation, TextOperation):
+                yield side, operation
+
+
+def assign_fonts(tickets: Iterable[TicketModel], plan: DrawPlan) -> list[UncoveredText]:
+    """Check the texts of ``tickets`` and record a fallback font where needed.
+
+    Args:
+        tickets: Tickets about to be drawn.
+        plan: Compiled template they are drawn with, its ``font_fallbacks``
+            receive the fonts assigned.
+
+    Returns:
+        The texts that no font of the chain covers entirely; they are drawn
+        with the font missing the fewest characters.
+    """
+    operations = list(text_operations(plan))
+    # font -> text -> references of the tickets printing it
+    texts: dict[str, dict[str, list[str]]] = collections.defaultdict(dict)
+    for ticket in tickets:
+        for side, operation in operations:
+            # the ordering side is drawn with an order, its digits are covered
+            variables = side.variables(ticket, order=0)
+            text = resolve(operation.text, variables)
+            texts[operation.font].setdefault(text, []).append(ticket.reference)
+
+    uncovered = []
+    for font, references in texts.items():
+        chain = [font, *fallback_fonts()]
+        for text, text_references in references.items():
+            characters = set(text)
+            if characters <= coverage(font):
+                continue
+            missing = {name: characters - coverage(name) for name in chain}
+            best = min(chain, key=lambda name: len(missing[name]))
+            if best != font:
+                plan.font_fallbacks[(font, text)] = best
+            if missing[best]:
+                uncovered.append(
+                    UncoveredText(
+                        font=best,
+                        text=text,
+                        missing="".join(sorted(missing[best])),
+                        references=text_references,
+                    )
+                )
+    return uncovered
+
+
+def report_uncovered(
+    uncovered: list[UncoveredText], report: Callable[[str], None] = print
+) -> None:
+    if not uncovered:
+        return
+    report(f"{len(uncovered)} texts have characters missing from every font:")
+    for item in uncovered:
+        references = ", ".join(item.references[:3])
+        if len(item.references) > 3:
+            references += f" and {len(item.references) - 3} more"
+        report(f"  {references}: {item.text!r} missing {item.missing!r} in {item.font}")
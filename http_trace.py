@@ -0,0 +1,219 @@
+"""
+Per-request trace of the calls made to the Tito APIs.
+
+``TitoSession`` hands every response (or failure) to an ``HttpTrace``, which
+records its timing, size, status, the retries urllib3 made before it and the
+rate-limit headers of the response. Records are appended to a JSONL file as
+they come, so a trace survives an interrupted download, and ``summary``
+computes the latency percentiles and the throughput at the end of the run.
+"""
+
+import datetime
+import json
+import pathlib
+import threading
+from urllib.parse import urlsplit, urlunsplit
+
+import numpy as np
+import pydantic
+import requests
+
+
+class RequestRecord(pydantic.BaseModel):
+    started_at: datetime.datetime
+    method: str
+    url: str
+    status: int | None
+    seconds: float
+    bytes: int
+    retries: int = 0
+    rate_limit: int | None = None
+    rate_limit_remaining: int | None = None
+    rate_limit_reset: str | None = None
+    retry_after: str | None = None
+    error: str | None = None
+
+
+class TraceSummary(pydantic.BaseModel):
+    requests: int
+    statuses: dict[str, int]
+    retries: int
+    bytes: int
+    wall_seconds: float
+    p50_seconds: float
+    p95_seconds: float
+    max_seconds: float
+    min_rate_limit_remaining: int | None
+
+    @property
+    def requests_per_second(self) -> float:
+        return self.requests / self.wall_seconds if self.wall_seconds else 0.0
+
+    @property
+    def bytes_per_second(self) -> float:
+        return self.bytes / self.wall_seconds if self.wall_seconds else 0.0
+
+    def __str__(self) -> str:
+        statuses = ", ".join(
+            f"{status}: {n}" for status, n in sorted(self.statuses.items())
+        )
+        headroom = (
+            f", rate limit headroom {self.min_rate_limit_remaining}"
+            if self.min_rate_limit_remaining is not None
+            else ""
+        )
+        return (
+            f"{self.requests} requests ({statuses}), {self.retries} retries, "
+            f"{self.bytes / 1024:.0f} KiB in {self.wall_seconds:.2f}s: "
+            f"p50 {self.p50_seconds * 1000:.0f}ms, p95 {self.p95_seconds * 1000:.0f}ms, "
+            f"max {self.max_seconds * 1000:.0f}ms, "
+            f"{self.requests_per_second:.1f} req/s, "
+            f"{self.bytes_per_second / 1024:.0f} KiB/s{headroom}"
+        )
+
+
+def header(response: requests.Response, *names: str) -> str | None:
+    for name in names:
+        if name in response.headers:
+            return response.headers[name]
+    return None
+
+
+def as_int(value: str | None) -> int | None:
+    try:
+        return int(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+def redact(url: str) -> str:
+    """Drop the query string, check-in list URLs are secrets themselves."""
+    scheme, netloc, path, *_ = urlsplit(url)
+    if "/checkin_lists/" in path:
+        prefix, _, rest = path.partition("/checkin_lists/")
+        _, _, rest = rest.partition("/")
+        path = f"{prefix}/checkin_lists/…/{rest}"
+    return urlunsplit((scheme, netloc, path, "", ""))
+
+
+class HttpTrace:
+    """Records of the requests of a run, optionally written to ``path``.
+
+    Args:
+        path: JSONL file receiving a record per request, as they complete.
+    """
+
+    def __init__(self, path: str | pathlib.Path | None = None) -> None:
+        self.records: list[RequestRecord] = []
+        self.lock = threading.Lock()
+        self.file = open(path, "w") if path else None
+
+    def close(self) -> None:
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def __enter__(self) -> "HttpTrace":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def add(self, record: RequestRecord) -> None:
+        with self.lock:
+            self.records.append(record)
+            if self.file is not None:
+                self.file.write(record.model_dump_json())
+                self.file.write("\n")
+                self.file.flush()
+
+    def record(
+        self,
+        method: str,
+        url: str,
+        started_at: datetime.datetime,
+        seconds: float,
+        response: requests.Response | None = None,
+        error: BaseException | None = None,
+    ) -> None:
+        """Record a completed request, or the error it ended with."""
+        if response is None:
+            self.add(
+                RequestRecord(
+                    started_at=started_at,
+                    method=method,
+                    url=redact(url),
+                    status=None,
+                    seconds=seconds,
+                    bytes=0,
+                    error=f"{type(error).__name__}: {error}",
+                )
+            )
+            return
+
+        retries = getattr(response.raw, "retries", None)
+        self.add(
+            RequestRecord(
+                started_at=started_at,
+                method=method,
+                url=redact(url),
+                status=response.status_code,
+                seconds=seconds,
+                bytes=len(response.content),
+                retries=len(retries.history) if retries is not None else 0,
+                rate_limit=as_int(
+                    header(response, "X-RateLimit-Limit", "RateLimit-Limit")
+                ),
+                rate_limit_remaining=as_int(
+                    header(response, "X-RateLimit-Remaining", "RateLimit-Remaining")
+                ),
+                rate_limit_reset=header(
+                    response, "X-RateLimit-Reset", "RateLimit-Reset"
+                ),
+                retry_after=header(response, "Retry-After"),
+            )
+        )
+
+    def summary(self) -> TraceSummary:
+        with self.lock:
+            records = list(self.records)
+        seconds = np.array([record.seconds for record in records] or [0.0])
+        statuses: dict[str, int] = {}
+        for record in records:
+            key = str(record.status) if record.status is not None else "error"
+            statuses[key] = statuses.get(key, 0) + 1
+        if records:
+            start = min(record.started_at for record in records)
+            end = max(
+                record.started_at + datetime.timedelta(seconds=record.seconds)
+                for record in records
+            )
+            wall_seconds = (end - start).total_seconds()
+        else:
+            wall_seconds = 0.0
+        remaining = [
+            record.rate_limit_remaining
+            for record in records
+            if record.rate_limit_remaining is not None
+        ]
+        return TraceSummary(
+            requests=len(records),
+            statuses=statuses,
+            retries=sum(record.retries for record in records),
+            bytes=sum(record.bytes for record in records),
+            wall_seconds=wall_seconds,
+            p50_seconds=float(np.percentile(seconds, 50)),
+            p95_seconds=float(np.percentile(seconds, 95)),
+            max_seconds=float(seconds.max()),
+            min_rate_limit_remaining=min(remaining) if remaining else None,
+        )
+
+
+def load_trace(path: str | pathlib.Path) -> HttpTrace:
+    """Read back a JSONL trace, e.g. to summarise it again."""
+    trace = HttpTrace()
+    with open(path) as fp:
+        for line in fp:
+            if line.strip():
+                trace.records.append(RequestRecord.model_validate(json.loads(line)))
+    return trace
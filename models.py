@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 import datetime
+import hashlib
 from enum import Enum
 
 import pydantic
@@ -13,6 +14,10 @@ class PythonLevel(Enum):
     Expert = 4
 
 
+# badge roles, each one is a boolean field of TicketModel
+roles = ("speaker", "exhibitor", "volunteer", "organiser", "sponsor")
+
+
 class PaginationModel(pydantic.BaseModel):
     next_page: int | None = None
 
@@ -29,6 +34,9 @@ class TicketModel(pydantic.BaseModel):
     updated_at: datetime.datetime
     speaker: bool = False
     exhibitor: bool = False
+    volunteer: bool = False
+    organiser: bool = False
+    sponsor: bool = False
 
     @classmethod
     def make_empty(
@@ -74,6 +82,28 @@ class TicketModel(pydantic.BaseModel):
         except KeyError:
             return 0
 
+    @property
+    def qr_payload(self) -> str:
+        return "{} <{}>".format(self.name, self.email)
+
+    @property
+    def render_hash(self) -> str:
+        """Digest of every field that ends up printed on the badge.
+
+        Two tickets with the same hash render to the same badge, whatever
+        else changed in their answers or timestamps.
+        """
+        printed = "\x1f".join(
+            [
+                self.reference,
+                self.display_name,
+                str(self.level),
+                *(str(getattr(self, role)) for role in roles),
+                self.qr_payload,
+            ]
+        )
+        return hashlib.sha1(printed.encode("utf-8")).hexdigest()
+
     def __repr__(self):
         return f"Attendee {self.name}"
 
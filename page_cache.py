@@ -0,0 +1,92 @@
+"""
+On-disk cache of the Tito API ticket pages.
+
+Each page body is stored with its ``ETag`` and ``Last-Modified`` headers, so
+the next download revalidates it with a conditional request and an unchanged
+page costs a 304. A progress marker records the last completed page of an
+unfinished download, which lets an interrupted download resume without
+requesting the pages it already has.
+"""
+
+import json
+import os
+import pathlib
+
+
+def write_atomically(path: pathlib.Path, data: bytes) -> None:
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+
+
+class PageCache:
+    """Ticket pages of every event, stored under ``root/<account>/<event>``.
+
+    Args:
+        root: Cache directory.
+        account: Tito account the events belong to.
+    """
+
+    def __init__(self, root: pathlib.Path, account: str) -> None:
+        self.root = pathlib.Path(root) / account
+
+    def event_dir(self, event: str) -> pathlib.Path:
+        return self.root / event
+
+    def body_path(self, event: str, page: int) -> pathlib.Path:
+        return self.event_dir(event) / f"page-{page:05d}.json"
+
+    def meta_path(self, event: str, page: int) -> pathlib.Path:
+        return self.event_dir(event) / f"page-{page:05d}.meta.json"
+
+    def progress_path(self, event: str) -> pathlib.Path:
+        return self.event_dir(event) / "progress.json"
+
+    def load(self, event: str, page: int) -> tuple[bytes, dict] | None:
+        """Return the cached body and validators of a page, if any."""
+        try:
+            body = self.body_path(event, page).read_bytes()
+            meta = json.loads(self.meta_path(event, page).read_text())
+        except FileNotFoundError:
+            return None
+        return body, meta
+
+    def store(self, event: str, page: int, body: bytes, headers) -> None:
+        """Store a page body with its ``ETag``/``Last-Modified`` headers."""
+        self.event_dir(event).mkdir(parents=True, exist_ok=True)
+        meta = {
+            "etag": headers.get("ETag"),
+            "last_modified": headers.get("Last-Modified"),
+        }
+        write_atomically(self.body_path(event, page), body)
+        write_atomically(self.meta_path(event, page), json.dumps(meta).encode())
+
+    def validators(self, event: str, page: int) -> dict[str, str]:
+        """Headers making a conditional request for a cached page."""
+        cached = self.load(event, page)
+        if cached is None:
+            return {}
+        _, meta = cached
+        headers = {}
+        if meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+        return headers
+
+    def completed_pages(self, event: str) -> int:
+        """Number of pages of an interrupted download known to be complete."""
+        try:
+            return json.loads(self.progress_path(event).read_text())["completed"]
+        except FileNotFoundError:
+            return 0
+
+    def mark_completed(self, event: str, page: int) -> None:
+        self.event_dir(event).mkdir(parents=True, exist_ok=True)
+        write_atomically(
+            self.progress_path(event), json.dumps({"completed": page}).encode()
+        )
+
+    def finish(self, event: str) -> None:
+        """Forget the progress marker once every page has been downloaded."""
+        self.progress_path(event).unlink(missing_ok=True)
@@ -0,0 +1,174 @@
+"""
+Download and render the badges of an event in one overlapped run.
+
+Three stages run at the same time, connected by bounded queues:
+
+1. fetch: a thread downloads and parses the API pages (``get_ticket_pages``);
+2. render: the main thread marks the roles of each page and draws every
+   badge once into a PDF form, while later pages are still downloading;
+3. assembly: when the last page is in, the forms are placed on the sheets in
+   ``reference`` order, with the ordering numbers that depend on it.
+
+The wall time is then close to the slowest stage instead of the sum of the
+download and the build.
+"""
+
+import itertools
+import queue
+import threading
+import time
+
+import pydantic
+
+from build_badge import (
+    LayoutParameters,
+    draw_sheet,
+    register_fonts,
+    write_ordering_num,
+    write_recto,
+    write_verso,
+)
+from get_tickets import get_ticket_pages
+from glyphs import assign_fonts, report_uncovered
+from models import SpeakerModel, TicketModel
+from page_cache import PageCache
+from roles import RoleResolver
+from utils import make_batches
+
+done = object()
+
+
+class PipelineResult(pydantic.BaseModel):
+    tickets: list[TicketModel]
+    badges: int
+    fetch_seconds: float
+    render_seconds: float
+    assembly_seconds: float
+    total_seconds: float
+
+
+def fetch_pages(pages: queue.Queue, timings: dict, event: str, **kwargs) -> None:
+    """Fetch stage: put each page on ``pages``, then ``done`` or the error."""
+    start = time.perf_counter()
+    try:
+        for tickets in get_ticket_pages(event, **kwargs):
+            pages.put(tickets)
+    except BaseException as e:
+        pages.put(e)
+    else:
+        timings["fetch"] = time.perf_counter() - start
+        pages.put(done)
+
+
+def form_names(form_id: int) -> tuple[str, str]:
+    return f"verso-{form_id}", f"recto-{form_id}"
+
+
+def render_forms(ticket: TicketModel, form_id: int, layout: LayoutParameters) -> None:
+    """Draw both sides of a badge into forms, without the ordering number."""
+    verso, recto = form_names(form_id)
+    layout.canvas.beginForm(verso)
+    write_verso(ticket, None, layout)
+    layout.canvas.endForm()
+    layout.canvas.beginForm(recto)
+    write_recto(ticket, layout)
+    layout.canvas.endForm()
+
+
+def assemble_badges(
+    badges: list[tuple[TicketModel, int]], layout: LayoutParameters
+) -> None:
+    """Place the rendered forms on the sheets, like ``create_badges``.
+
+    Args:
+        badges: Tickets in printing order, with the id of their forms.
+        layout: Layout holding the canvas the forms were drawn on.
+    """
+    form_ids = {ticket.reference: form_id for ticket, form_id in badges}
+
+    def draw_verso(ticket: TicketModel, ticket_index: int, layout) -> None:
+        layout.canvas.doForm(form_names(form_ids[ticket.reference])[0])
+        write_ordering_num(ticket, ticket_index, layout)
+
+    def draw_recto(ticket: TicketModel, layout) -> None:
+        layout.canvas.doForm(form_names(form_ids[ticket.reference])[1])
+
+    tickets = [ticket for ticket, _ in badges]
+    for batch in make_batches(
+        layout.ordering_function(tickets), layout.badge_per_sheet
+    ):
+        draw_sheet(batch, layout, draw_verso=draw_verso, draw_recto=draw_recto)
+    layout.canvas.save()
+
+
+def fetch_and_build(
+    event: str,
+    speakers: list[SpeakerModel],
+    layout: LayoutParameters,
+    cache: PageCache | None = None,
+    offline: bool = False,
+    queue_size: int = 4,
+    session=None,
+) -> PipelineResult:
+    """Download the tickets of ``event`` and render them as they arrive.
+
+    Args:
+        event: Event slug.
+        speakers: Speakers, to mark the speaker badges.
+        layout: Layout holding the output canvas.
+        cache: Optional page cache, see ``get_tickets``.
+        offline: Replay the download from the cache.
+        queue_size: Pages buffered between the download and the rendering.
+        session: Optional session, e.g. a traced ``TitoSession``.
+
+    Returns:
+        The downloaded tickets, as ``get_tickets`` returns them, the number
+        of badges and the stage timings.
+    """
+    start = time.perf_counter()
+    register_fonts()
+
+    resolver = RoleResolver.from_settings(speakers)
+    pages: queue.Queue = queue.Queue(maxsize=queue_size)
+    timings: dict[str, float] = {}
+    fetcher = threading.Thread(
+        target=fetch_pages,
+        args=(pages, timings, event),
+        kwargs=dict(session=session, cache=cache, offline=offline),
+        daemon=True,
+    )
+    fetcher.start()
+
+    # a ticket seen twice (it moved while paginating) keeps its last version
+    badges: dict[str, tuple[TicketModel, int]] = {}
+    downloaded: list[TicketModel] = []
+    form_ids = itertools.count()
+    render_seconds = 0.0
+    while (item := pages.get()) is not done:
+        if isinstance(item, BaseException):
+            raise item
+        downloaded.extend(item)
+        render_start = time.perf_counter()
+        tickets = resolver.apply(item)
+        report_uncovered(assign_fonts(tickets, layout.plan))
+        for ticket in tickets:
+            form_id = next(form_ids)
+            render_forms(ticket, form_id, layout)
+            badges[ticket.reference] = (ticket, form_id)
+        render_seconds += time.perf_counter() - render_start
+    fetcher.join()
+
+    assembly_start = time.perf_counter()
+    ordered = sorted(badges.values(), key=lambda badge: badge[0].reference)
+    if ordered:
+        assemble_badges(ordered, layout)
+    end = time.perf_counter()
+
+    return PipelineResult(
+        tickets=downloaded,
+        badges=len(ordered),
+        fetch_seconds=timings["fetch"],
+        render_seconds=render_seconds,
+        assembly_seconds=end - assembly_start,
+        total_seconds=end - start,
+    )
@@ -0,0 +1,222 @@
+"""
+Low-resolution raster proofs of the badges.
+
+Every badge is drawn on its own page (verso and recto side by side) with the
+same ``write_verso``/``write_recto`` used for the real build, then rasterised
+to a PNG thumbnail. Thumbnails are cached under the ticket ``render_hash`` so a
+re-proof only rasterises the badges whose printed content changed.
+
+Each worker process compiles the layout and its draw plan once, with the
+images resampled for the screen (twice the thumbnail resolution) instead of
+the print resolution. Workers draw chunks of badges as the pages of one PDF,
+so the images are embedded once per chunk rather than once per badge.
+"""
+
+import hashlib
+import html
+import io
+import itertools
+import json
+import os
+import pathlib
+from concurrent.futures import ProcessPoolExecutor
+
+import pymupdf
+from reportlab.pdfgen.canvas import Canvas
+
+from assets import content_hash, img_dir
+from badge_template import DrawPlan, ImageOperation
+from build_badge import (
+    LayoutParameters,
+    register_fonts,
+    template_path,
+    write_recto,
+    write_verso,
+)
+from config import settings
+from glyphs import assign_fonts, report_uncovered
+from models import TicketModel
+
+
+def referenced_assets(plan: DrawPlan) -> list[pathlib.Path]:
+    """Images the badges of ``plan`` are drawn with.
+
+    An asset named after a badge field may be any image, so every file of
+    ``img`` is referenced then.
+    """
+    names = set()
+    for side in (plan.recto, plan.verso, plan.ordering):
+        for operation in side.operations:
+            if not isinstance(operation, ImageOperation):
+                continue
+            if callable(operation.asset):
+                return sorted(path for path in img_dir.iterdir() if path.is_file())
+            names.add(operation.asset)
+    return sorted(img_dir / name for name in names)
+
+
+def design_key(dpi: int, plan: DrawPlan) -> str:
+    """Fingerprint of the print settings shared by every badge.
+
+    Thumbnails rendered under another background, title, paper size, badge
+    template or image content live in a different cache directory and are
+    never picked up by mistake.
+    """
+    printout = json.dumps(
+        [settings.printout.to_dict(), settings.fonts.to_dict()],
+        sort_keys=True,
+        default=str,
+    )
+    digest = hashlib.sha1(f"{printout}:{dpi}:{asset_dpi(dpi)}".encode("utf-8"))
+    digest.update(template_path().read_bytes())
+    for asset in referenced_assets(plan):
+        digest.update(f"{asset.name}:{content_hash(asset)}".encode("utf-8"))
+    return digest.hexdigest()[:12]
+
+
+def thumbnail_name(ticket: TicketModel, ticket_index: int) -> str:
+    """The ordering number is printed on the verso, so it is part of the key."""
+    return f"{ticket.render_hash}-{ticket_index}.png"
+
+
+def asset_dpi(dpi: int) -> int:
+    """Resolution of the images in thumbnails rasterised at ``dpi``."""
+    return 2 * dpi
+
+
+# layout of the worker process, see init_worker
+worker_layout: LayoutParameters | None = None
+
+
+def init_worker(dpi: int, font_fallbacks: dict[tuple[str, str], str]) -> None:
+    """Pool initializer: register the fonts and compile the layout once.
+
+    ``font_fallbacks`` are the fonts assigned by the parent process, see
+    ``glyphs``.
+    """
+    global worker_layout
+    register_fonts()
+    worker_layout = LayoutParameters(output_filename=io.BytesIO(), dpi=asset_dpi(dpi))
+    worker_layout.plan.font_fallbacks.update(font_fallbacks)
+
+
+def render_badges(
+    tickets: list[tuple[int, TicketModel]], layout: LayoutParameters
+) -> bytes:
+    """Render badges as the pages of a PDF, one badge per page.
+
+    The badges are drawn with the compiled plan of ``layout`` on a new canvas.
+    """
+    buffer = io.BytesIO()
+    layout.canvas = Canvas(
+        buffer, pagesize=(layout.section_width * 2, layout.section_height)
+    )
+    for ticket_index, ticket in tickets:
+        write_verso(ticket, ticket_index, layout)
+        layout.canvas.translate(layout.section_width, 0)
+        write_recto(ticket, layout)
+        layout.canvas.showPage()
+    layout.canvas.save()
+    return buffer.getvalue()
+
+
+def rasterise(pdf: bytes, targets: list[pathlib.Path], dpi: int) -> None:
+    """Rasterise each page of ``pdf`` to its PNG file, atomically."""
+    with pymupdf.open(stream=pdf, filetype="pdf") as document:
+        for page, target in zip(document, targets):
+            tmp = target.with_suffix(".tmp")
+            tmp.write_bytes(page.get_pixmap(dpi=dpi).tobytes("png"))
+            os.replace(tmp, target)
+
+
+def make_thumbnails(
+    entries: list[tuple[int, TicketModel, pathlib.Path]], dpi: int
+) -> list[pathlib.Path]:
+    """Worker entry point: render and rasterise a chunk of badges."""
+    pdf = render_badges(
+        [(ticket_index, ticket) for ticket_index, ticket, _ in entries], worker_layout
+    )
+    targets = [target for _, _, target in entries]
+    rasterise(pdf, targets, dpi)
+    return targets
+
+
+def write_contact_sheet(
+    entries: list[tuple[int, TicketModel, pathlib.Path]],
+    index_file: pathlib.Path,
+) -> None:
+    """Write an HTML page showing every thumbnail in build order."""
+    figures = []
+    for ticket_index, ticket, thumbnail in entries:
+        src = os.path.relpath(thumbnail, index_file.parent)
+        caption = html.escape(
+            f"{ticket_index} · {ticket.reference} · {ticket.display_name}"
+        )
+        figures.append(
+            f'<figure><img src="{html.escape(src)}" loading="lazy">'
+            f"<figcaption>{caption}</figcaption></figure>"
+        )
+
+    index_file.write_text(
+        "<!doctype html>\n"
+        '<html><head><meta charset="utf-8"><title>Badge proofs</title>\n'
+        "<style>"
+        "body{font-family:sans-serif;display:flex;flex-wrap:wrap;gap:8px}"
+        "figure{margin:0;border:1px solid #ccc;padding:4px}"
+        "figcaption{font-size:12px}"
+        "</style></head><body>\n" + "\n".join(figures) + "\n</body></html>\n",
+        encoding="utf-8",
+    )
+
+
+def build_previews(
+    tickets: list[TicketModel],
+    output_dir: pathlib.Path,
+    dpi: int = 36,
+    workers: int | None = None,
+) -> tuple[pathlib.Path, int]:
+    """Rasterise the missing thumbnails and refresh the contact sheet.
+
+    Args:
+        tickets: Tickets in build order.
+        output_dir: Directory holding the cache and the ``index.html`` sheet.
+        dpi: Resolution of the thumbnails.
+        workers: Size of the process pool, defaults to the CPU count.
+
+    Returns:
+        The contact sheet path and the number of badges rasterised.
+    """
+    layout = LayoutParameters(output_filename=io.BytesIO())
+    cache_dir = output_dir / design_key(dpi, layout.plan)
+    cache_dir.mkdir(parents=True, exist_ok=True)
+
+    entries = [
+        (ticket_index, ticket, cache_dir / thumbnail_name(ticket, ticket_index))
+        for ticket_index, ticket in enumerate(tickets)
+    ]
+    missing = [entry for entry in entries if not entry[2].exists()]
+
+    if missing:
+        register_fonts()
+        report_uncovered(
+            assign_fonts([ticket for _, ticket, _ in missing], layout.plan)
+        )
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=init_worker,
+            initargs=(dpi, layout.plan.font_fallbacks),
+        ) as pool:
+            # a few chunks per worker keep them all busy until the end
+            chunk_size = max(
+                1, min(64, -(-len(missing) // (4 * (workers or os.cpu_count() or 1))))
+            )
+            futures = [
+                pool.submit(make_thumbnails, list(chunk), dpi)
+                for chunk in itertools.batched(missing, chunk_size)
+            ]
+            for future in futures:
+                future.result()
+
+    index_file = output_dir / "index.html"
+    write_contact_sheet(entries, index_file)
+    return index_file, len(missing)
@@ -0,0 +1,328 @@
+"""
+Registration desk simulation, to choose the lanes before the doors open.
+
+Attendees queue in the lane of the first character of their reference
+(``A-F``, ``G-M``…). References are random, so a lane receives its share of
+the tickets at any time of the morning; the load of the desk then depends on
+the arrival curve, which is fitted on the check-ins of past events: the
+check-in times of each day, offset from the first check-in of the day, are
+binned into an arrival profile.
+
+A simulation draws the arrival times of the attendees from the profile, gives
+each one a reference of the event, and runs every lane as a first come first
+served queue with its staff, service times following a gamma distribution.
+Replications are simulated together with numpy, one step per attendee of a
+lane, and every configuration reuses the same draws, so sweeping lane counts
+takes milliseconds each and differences between them are not noise.
+
+Check-in times are when the badge was handed over, not when the attendee
+joined the queue: a past queue flattens the fitted peak, the simulation is
+optimistic when the desk was overwhelmed.
+"""
+
+import collections
+import datetime
+import json
+import pathlib
+import re
+import zoneinfo
+
+import numpy as np
+import pydantic
+
+
+class ArrivalProfile(pydantic.BaseModel):
+    bin_seconds: float
+    shares: list[float]
+    days: int
+    checkins: int
+
+    @property
+    def peak_share_per_minute(self) -> float:
+        return max(self.shares) * 60 / self.bin_seconds
+
+    def sample(self, size: tuple[int, int], rng: np.random.Generator) -> np.ndarray:
+        """Sorted arrival times in seconds from the opening, one row per replication."""
+        bins = rng.choice(len(self.shares), size=size, p=self.shares)
+        times = (bins + rng.random(size)) * self.bin_seconds
+        times.sort(axis=1)
+        return times
+
+
+def load_checkins(checkin_files: list[pathlib.Path]) -> list[datetime.datetime]:
+    """Check-in times of exports of the Check-in API, deleted check-ins left out."""
+    times = []
+    for checkin_file in checkin_files:
+        for checkin in json.loads(checkin_file.read_text()):
+            if checkin.get("deleted_at"):
+                continue
+            times.append(datetime.datetime.fromisoformat(checkin["created_at"]))
+    return times
+
+
+def fit_arrivals(
+    times: list[datetime.datetime],
+    timezone: str = "Europe/Dublin",
+    bin_minutes: float = 5,
+) -> ArrivalProfile:
+    """Share of the arrivals per bin from the first check-in of the day.
+
+    Args:
+        times: Check-in times of one or several events and days.
+        timezone: Timezone of the desk, which decides the days.
+        bin_minutes: Width of the bins.
+
+    Raises:
+        ValueError: Without any check-in.
+    """
+    if not times:
+        raise ValueError("no check-ins to fit the arrivals on")
+    tz = zoneinfo.ZoneInfo(timezone)
+    days = collections.defaultdict(list)
+    for time in times:
+        if time.tzinfo is None:
+            time = time.replace(tzinfo=datetime.timezone.utc)
+        days[time.astimezone(tz).date()].append(time.timestamp())
+
+    offsets = np.concatenate(
+        [np.array(stamps) - min(stamps) for stamps in days.values()]
+    )
+    bin_seconds = bin_minutes * 60
+    counts = np.bincount((offsets // bin_seconds).astype(int))
+    return ArrivalProfile(
+        bin_seconds=bin_seconds,
+        shares=(counts / counts.sum()).tolist(),
+        days=len(days),
+        checkins=len(offsets),
+    )
+
+
+class Lane(pydantic.BaseModel):
+    starts_at: str
+    ends_at: str
+    tickets: int = 0
+    staff: int = 1
+
+    def __str__(self) -> str:
+        return f"{self.starts_at}-{self.ends_at}"
+
+
+def lane_key(reference: str) -> str:
+    return reference[:1].upper()
+
+
+def parse_lanes(text: str, staff: int = 1) -> list[Lane]:
+    """Lanes from ``A-F,G-M,N-Z``; ``A-F:2`` staffs a lane with two people."""
+    lanes = []
+    for part in text.split(","):
+        match = re.fullmatch(r"\s*(\w)\s*-\s*(\w)\s*(?::\s*(\d+))?\s*", part)
+        if not match:
+            raise ValueError(f"invalid lane {part!r}, expected e.g. A-F or A-F:2")
+        starts_at, ends_at, lane_staff = match.groups()
+        lanes.append(
+            Lane(
+                starts_at=starts_at.upper(),
+                ends_at=ends_at.upper(),
+                staff=int(lane_staff) if lane_staff else staff,
+            )
+        )
+    return lanes
+
+
+def count_tickets(lanes: list[Lane], references: list[str]) -> list[Lane]:
+    """Set the tickets of every lane, references no lane takes are an error."""
+    counts = collections.Counter(lane_key(reference) for reference in references)
+    for lane in lanes:
+        lane.tickets = 0
+    for key, count in counts.items():
+        for lane in lanes:
+            if lane.starts_at <= key <= lane.ends_at:
+                lane.tickets += count
+                break
+        else:
+            raise ValueError(f"no lane for references starting with {key!r}")
+    return lanes
+
+
+def balanced_lanes(references: list[str], lanes: int, staff: int = 1) -> list[Lane]:
+    """Split the sorted reference keys in contiguous lanes, the busiest as small as possible.
+
+    Unlike the greedy split of ``experiments/lanes.py``, the split is optimal
+    (a linear partition over the few distinct keys).
+    """
+    counts = collections.Counter(lane_key(reference) for reference in references)
+    keys = sorted(counts)
+    lanes = max(1, min(lanes, len(keys)))
+    sizes = [counts[key] for key in keys]
+    prefix = np.concatenate([[0], np.cumsum(sizes)])
+
+    # best[j][k]: smallest busiest lane splitting the first k keys in j lanes
+    best = np.full((lanes + 1, len(keys) + 1), np.inf)
+    cut = np.zeros((lanes + 1, len(keys) + 1), dtype=int)
+    best[0][0] = 0
+    for j in range(1, lanes + 1):
+        for k in range(j, len(keys) + 1):
+            for i in range(j - 1, k):
+                value = max(best[j - 1][i], prefix[k] - prefix[i])
+                if value < best[j][k]:
+                    best[j][k], cut[j][k] = value, i
+
+    bounds, k = [], len(keys)
+    for j in range(lanes, 0, -1):
+        bounds.append((cut[j][k], k))
+        k = cut[j][k]
+    return [
+        Lane(
+            starts_at=keys[i],
+            ends_at=keys[k - 1],
+            tickets=int(prefix[k] - prefix[i]),
+            staff=staff,
+        )
+        for i, k in reversed(bounds)
+    ]
+
+
+class LaneResult(pydantic.BaseModel):
+    lane: Lane
+    p95_wait: float
+    max_wait: float
+
+
+class SimulationResult(pydantic.BaseModel):
+    lanes: list[LaneResult]
+    p50_wait: float
+    p95_wait: float
+    max_wait: float
+
+    @property
+    def staff(self) -> int:
+        return sum(result.lane.staff for result in self.lanes)
+
+
+class Draws:
+    """Random draws shared by every configuration simulated.
+
+    Args:
+        profile: Arrival profile.
+        references: References of the event, attendees get one of them.
+        attendees: Attendees arriving.
+        service_seconds: Mean time to serve an attendee.
+        service_cv: Coefficient of variation of the service times.
+        replications: Mornings simulated.
+        seed: Seed of the draws.
+    """
+
+    def __init__(
+        self,
+        profile: ArrivalProfile,
+        references: list[str],
+        attendees: int,
+        service_seconds: float = 45,
+        service_cv: float = 0.5,
+        replications: int = 200,
+        seed: int = 0,
+    ) -> None:
+        rng = np.random.default_rng(seed)
+        attendees = min(attendees, len(references))
+        self.arrivals = profile.sample((replications, attendees), rng)
+        keys = np.array([lane_key(reference) for reference in references])
+        # keys as indices into the distinct keys, so lanes map them with numpy
+        self.key_values, codes = np.unique(keys, return_inverse=True)
+        self.keys = np.array(
+            [rng.permutation(codes)[:attendees] for _ in range(replications)]
+        ).reshape(replications, attendees)
+        shape = 1 / service_cv**2
+        self.services = rng.gamma(
+            shape, service_seconds / shape, size=(replications, attendees)
+        )
+
+
+def queue_waits(arrivals: np.ndarray, services: np.ndarray, staff: int) -> np.ndarray:
+    """Waits of first come first served queues with ``staff`` servers.
+
+    Args:
+        arrivals: Sorted arrival times, one queue per row, padded with inf.
+        services: Service times, same shape.
+        staff: Servers of every queue.
+
+    Returns:
+        The waits, nan for the padding.
+    """
+    replications, length = arrivals.shape
+    rows = np.arange(replications)
+    free = np.zeros((replications, staff))
+    waits = np.empty_like(arrivals)
+    for k in range(length):
+        arrival = arrivals[:, k]
+        server = free.argmin(axis=1)
+        start = np.maximum(arrival, free[rows, server])
+        waits[:, k] = start - arrival
+        free[rows, server] = start + services[:, k]
+    return waits
+
+
+def simulate(draws: Draws, lanes: list[Lane]) -> SimulationResult:
+    """Simulate every replication of the morning with ``lanes``."""
+    lane_of_key = np.array(
+        [
+            next(
+                (
+                    index
+                    for index, lane in enumerate(lanes)
+                    if lane.starts_at <= key <= lane.ends_at
+                ),
+                -1,
+            )
+            for key in draws.key_values
+        ]
+    )
+    keys = lane_of_key[draws.keys]
+
+    results, all_waits = [], []
+    for index, lane in enumerate(lanes):
+        # the arrivals of the other lanes pushed to the end, then cut off
+        arrivals = np.where(keys == index, draws.arrivals, np.inf)
+        order = np.argsort(arrivals, axis=1, kind="stable")
+        length = int((keys == index).sum(axis=1).max())
+        arrivals = np.take_along_axis(arrivals, order, axis=1)[:, :length]
+        services = draws.services[:, :length]
+        waits = queue_waits(arrivals, services, lane.staff)
+        waits = waits[np.isfinite(arrivals)]
+        all_waits.append(waits)
+        results.append(
+            LaneResult(
+                lane=lane,
+                p95_wait=float(np.percentile(waits, 95)) if waits.size else 0.0,
+                max_wait=float(waits.max()) if waits.size else 0.0,
+            )
+        )
+    waits = np.concatenate(all_waits)
+    return SimulationResult(
+        lanes=results,
+        p50_wait=float(np.percentile(waits, 50)),
+        p95_wait=float(np.percentile(waits, 95)),
+        max_wait=float(waits.max()),
+    )
+
+
+def recommend(
+    draws: Draws,
+    references: list[str],
+    target_p95: float,
+    staff: int = 1,
+    max_lanes: int = 8,
+) -> tuple[list[SimulationResult], SimulationResult | None]:
+    """Simulate 1 to ``max_lanes`` balanced lanes.
+
+    Returns:
+        Every result, and the one with the fewest lanes keeping the p95
+        wait under ``target_p95`` seconds, if any.
+    """
+    results = []
+    for count in range(1, max_lanes + 1):
+        lanes = balanced_lanes(references, count, staff)
+        if len(lanes) < count:
+            break
+        results.append(simulate(draws, lanes))
+    chosen = next((result for result in results if result.p95_wait <= target_p95), None)
+    return results, chosen
@@ -0,0 +1,253 @@
+"""
+Persistent queue of badges to reprint at the registration desk.
+
+Walk-ins and corrections are queued one at a time, but a sheet holds
+``layout.badge_per_sheet`` badges: printing each job alone wastes paper and
+a printer warm-up. Jobs are stored in a small SQLite database, so the desk
+and the process printing them can be separate and survive a restart.
+
+A flush prints the oldest jobs filling whole sheets as soon as there are
+enough of them. When the oldest job has waited longer than the deadline, the
+remaining jobs are printed anyway, the last sheet padded with blank badges.
+
+A flush claims its jobs in the database before rendering them, so two
+flushers (a ``--watch`` loop and a manual ``--force``) never print the same
+badge. A claim older than ``claim_timeout`` (a flusher that died) is void.
+When the print command fails the claim is released and the jobs wait for the
+next flush.
+"""
+
+import datetime
+import os
+import pathlib
+import shlex
+import sqlite3
+import subprocess
+import time
+import uuid
+
+import pydantic
+
+from build_badge import LayoutParameters, draw_sheet, register_fonts
+from glyphs import assign_fonts, report_uncovered
+from models import TicketModel
+from utils import make_batches
+
+schema = """
+create table if not exists jobs (
+    id integer primary key autoincrement,
+    reference text not null,
+    kind text not null,
+    ticket text not null,
+    queued_at real not null,
+    printed_at real,
+    output text,
+    claimed_by text,
+    claimed_at real
+)
+"""
+
+# columns added since the first version of the queue
+migrations = {
+    "claimed_by": "alter table jobs add column claimed_by text",
+    "claimed_at": "alter table jobs add column claimed_at real",
+}
+
+
+class PrintError(RuntimeError):
+    pass
+
+
+class Job(pydantic.BaseModel):
+    id: int
+    kind: str
+    ticket: TicketModel
+    queued_at: datetime.datetime
+
+
+class ReprintQueue:
+    """Jobs stored in the SQLite database at ``path``.
+
+    Args:
+        path: Database file, created on first use.
+        claim_timeout: Seconds after which a claim of unprinted jobs is void.
+    """
+
+    def __init__(self, path: str | pathlib.Path, claim_timeout: float = 600) -> None:
+        self.path = pathlib.Path(path)
+        self.claim_timeout = claim_timeout
+        self.connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        self.connection.execute("pragma journal_mode=wal")
+        self.connection.execute(schema)
+        columns = {row[1] for row in self.connection.execute("pragma table_info(jobs)")}
+        for column, migration in migrations.items():
+            if column not in columns:
+                self.connection.execute(migration)
+
+    def close(self) -> None:
+        self.connection.close()
+
+    def __enter__(self) -> "ReprintQueue":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def add(self, ticket: TicketModel, kind: str = "reprint") -> int:
+        """Queue a badge for ``ticket`` and return the job id."""
+        cursor = self.connection.execute(
+            "insert into jobs (reference, kind, ticket, queued_at) values (?, ?, ?, ?)",
+            (ticket.reference, kind, ticket.model_dump_json(), time.time()),
+        )
+        return cursor.lastrowid
+
+    def pending(self) -> list[Job]:
+        """Jobs not printed yet nor claimed by a flush, oldest first."""
+        rows = self.connection.execute(
+            "select id, kind, ticket, queued_at from jobs"
+            " where printed_at is null and (claimed_by is null or claimed_at < ?)"
+            " order by id",
+            (time.time() - self.claim_timeout,),
+        )
+        return [
+            Job(
+                id=id,
+                kind=kind,
+                ticket=TicketModel.model_validate_json(ticket),
+                queued_at=datetime.datetime.fromtimestamp(
+                    queued_at, datetime.timezone.utc
+                ),
+            )
+            for id, kind, ticket, queued_at in rows
+        ]
+
+    def due(
+        self, badge_per_sheet: int, deadline: float, now: float | None = None
+    ) -> list[Job]:
+        """Jobs to print now.
+
+        Args:
+            badge_per_sheet: Badges on a sheet.
+            deadline: Seconds a job may wait for its sheet to fill up.
+            now: Current timestamp, defaults to ``time.time()``.
+
+        Returns:
+            The oldest jobs filling whole sheets; every pending job once the
+            oldest one is past the deadline; otherwise nothing.
+        """
+        jobs = self.pending()
+        if not jobs:
+            return []
+        now = time.time() if now is None else now
+        if now - jobs[0].queued_at.timestamp() >= deadline:
+            return jobs
+        full = len(jobs) - len(jobs) % badge_per_sheet
+        return jobs[:full]
+
+    def claim_due(
+        self, badge_per_sheet: int, deadline: float, now: float | None = None
+    ) -> list[Job]:
+        """Claim the jobs to print now (see ``due``) for this flush.
+
+        The jobs are chosen and claimed in one transaction, another flusher
+        sees them as claimed and skips them.
+        """
+        claimer = f"{os.getpid()}-{uuid.uuid4().hex}"
+        self.connection.execute("begin immediate")
+        try:
+            jobs = self.due(badge_per_sheet, deadline, now)
+            self.connection.executemany(
+                "update jobs set claimed_by = ?, claimed_at = ?"
+                " where id = ? and printed_at is null"
+                " and (claimed_by is null or claimed_at < ?)",
+                [
+                    (claimer, time.time(), job.id, time.time() - self.claim_timeout)
+                    for job in jobs
+                ],
+            )
+        except BaseException:
+            self.connection.execute("rollback")
+            raise
+        self.connection.execute("commit")
+        return jobs
+
+    def release(self, jobs: list[Job]) -> None:
+        """Give claimed jobs back to the queue, e.g. when printing failed."""
+        self.connection.executemany(
+            "update jobs set claimed_by = null, claimed_at = null"
+            " where id = ? and printed_at is null",
+            [(job.id,) for job in jobs],
+        )
+
+    def mark_printed(self, jobs: list[Job], output: str | pathlib.Path) -> None:
+        self.connection.executemany(
+            "update jobs set printed_at = ?, output = ? where id = ?",
+            [(time.time(), str(output), job.id) for job in jobs],
+        )
+
+
+def pad_sheets(tickets: list[TicketModel], badge_per_sheet: int) -> list[TicketModel]:
+    """Complete the last sheet with blank badges."""
+    missing = -len(tickets) % badge_per_sheet
+    return tickets + [TicketModel.make_empty() for _ in range(missing)]
+
+
+def flush(
+    queue: ReprintQueue,
+    output_dir: pathlib.Path,
+    deadline: float,
+    force: bool = False,
+    print_command: str | None = None,
+) -> tuple[pathlib.Path, list[Job]] | None:
+    """Print the due jobs into a new PDF in ``output_dir``.
+
+    Args:
+        queue: Reprint queue.
+        output_dir: Directory receiving the PDF files.
+        deadline: Seconds a job may wait for its sheet to fill up.
+        force: Print every pending job now, padding the last sheet.
+        print_command: Optional command sending the PDF to the printer,
+            ``{path}`` is replaced by the file, e.g. ``lp {path}``.
+
+    Returns:
+        The PDF and the jobs it holds, or None when nothing is due.
+
+    Raises:
+        PrintError: When the print command fails; the jobs stay pending and
+            the PDF is removed.
+    """
+    output_dir.mkdir(parents=True, exist_ok=True)
+    tmp_path = output_dir / f".reprints-{os.getpid()}.pdf.tmp"
+    layout = LayoutParameters(output_filename=str(tmp_path))
+    jobs = queue.claim_due(layout.badge_per_sheet, 0 if force else deadline)
+    if not jobs:
+        return None
+
+    try:
+        register_fonts()
+        tickets = pad_sheets([job.ticket for job in jobs], layout.badge_per_sheet)
+        report_uncovered(assign_fonts(tickets, layout.plan))
+        # reprints are handed over one by one, they carry no ordering number
+        for batch in make_batches(
+            ((None, ticket) for ticket in tickets), layout.badge_per_sheet
+        ):
+            draw_sheet(batch, layout)
+        layout.canvas.save()
+        timestamp = datetime.datetime.now().strftime("%Y-%m-%d-%H-%M-%S")
+        path = output_dir / f"reprints-{timestamp}-{jobs[0].id}.pdf"
+        os.replace(tmp_path, path)
+
+        if print_command:
+            try:
+                # split first, a path with spaces stays a single argument
+                command = [arg.format(path=path) for arg in shlex.split(print_command)]
+                subprocess.run(command, check=True)
+            except (subprocess.CalledProcessError, OSError) as e:
+                path.unlink(missing_ok=True)
+                raise PrintError(f"{print_command!r} failed ({e})") from e
+    except BaseException:
+        queue.release(jobs)
+        tmp_path.unlink(missing_ok=True)
+        raise
+    queue.mark_printed(jobs, path)
+    return path, jobs
@@ -0,0 +1,154 @@
+"""
+Rule-based badge roles.
+
+Every role of ``models.roles`` is resolved from rules configured under
+``[roles.<role>]`` in ``settings.toml``:
+
+    emails: addresses holding the role (``emails_file``: one per line);
+    release_titles: regular expressions searched in the release title;
+    responses: answers to a question granting the role, e.g.
+        ``responses = { "attendee-type" = ["volunteer"] }``.
+
+Speakers loaded from Sessionize always hold the speaker role.
+``[role_overrides]`` then forces roles on or off for a reference or an email:
+``"ABCD-1" = { organiser = true }``.
+
+The rules are compiled into hash indexes (emails, answers, overrides) and one
+regular expression per role, whose results are cached per release title, so
+all roles are resolved in a single pass over the tickets. A ticket is only
+copied when one of its roles changes.
+"""
+
+import pathlib
+import re
+
+import pydantic
+
+from config import settings
+from models import SpeakerModel, TicketModel, roles
+
+
+class RoleRule(pydantic.BaseModel):
+    model_config = pydantic.ConfigDict(extra="forbid")
+
+    emails: list[str] = []
+    emails_file: pathlib.Path | None = None
+    release_titles: list[str] = []
+    responses: dict[str, str | list[str]] = {}
+
+
+class RoleResolver:
+    """Compiled role rules.
+
+    Args:
+        rules: Rules of each role, roles without rules are never granted.
+        overrides: Forced roles, keyed by ticket reference or email.
+        speakers: Speakers, granted the speaker role by email.
+
+    Raises:
+        ValueError: On an unknown role or an invalid pattern.
+    """
+
+    def __init__(
+        self,
+        rules: dict[str, RoleRule],
+        overrides: dict[str, dict[str, bool]] | None = None,
+        speakers: list[SpeakerModel] = (),
+    ) -> None:
+        unknown = (
+            set(rules)
+            .union(*(forced.keys() for forced in (overrides or {}).values()))
+            .difference(roles)
+        )
+        if unknown:
+            raise ValueError(f"unknown roles {sorted(unknown)}, expected {roles}")
+
+        emails: dict[str, set[str]] = {}
+        answers: dict[str, dict[str, set[str]]] = {}
+        self.title_patterns: list[tuple[str, re.Pattern]] = []
+        for role, rule in rules.items():
+            role_emails = list(rule.emails)
+            if rule.emails_file is not None:
+                role_emails.extend(rule.emails_file.read_text().split())
+            for email in role_emails:
+                emails.setdefault(email.casefold(), set()).add(role)
+            if rule.release_titles:
+                pattern = "|".join(f"(?:{title})" for title in rule.release_titles)
+                try:
+                    compiled = re.compile(pattern, re.IGNORECASE)
+                except re.error as e:
+                    raise ValueError(f"invalid release_titles of {role}: {e}") from e
+                self.title_patterns.append((role, compiled))
+            for question, accepted in rule.responses.items():
+                if isinstance(accepted, str):
+                    accepted = [accepted]
+                for answer in accepted:
+                    answers.setdefault(question, {}).setdefault(
+                        answer.casefold(), set()
+                    ).add(role)
+        for speaker in speakers:
+            if speaker.email:
+                emails.setdefault(speaker.email.casefold(), set()).add("speaker")
+
+        self.emails = {email: frozenset(found) for email, found in emails.items()}
+        self.answers = {
+            question: {answer: frozenset(found) for answer, found in index.items()}
+            for question, index in answers.items()
+        }
+        self.overrides = {
+            key.casefold(): forced for key, forced in (overrides or {}).items()
+        }
+        self.titles: dict[str, frozenset[str]] = {}
+
+    @classmethod
+    def from_settings(cls, speakers: list[SpeakerModel] = ()) -> "RoleResolver":
+        """Resolver of the rules configured in ``settings.toml``."""
+        rules = pydantic.TypeAdapter(dict[str, RoleRule]).validate_python(
+            {
+                role.lower(): dict(rule)
+                for role, rule in dict(settings.get("roles", {})).items()
+            }
+        )
+        overrides = {
+            key: {role.lower(): value for role, value in dict(forced).items()}
+            for key, forced in dict(settings.get("role_overrides", {})).items()
+        }
+        return cls(rules, overrides, speakers)
+
+    def title_roles(self, release_title: str) -> frozenset[str]:
+        try:
+            return self.titles[release_title]
+        except KeyError:
+            found = self.titles[release_title] = frozenset(
+                role
+                for role, pattern in self.title_patterns
+                if pattern.search(release_title)
+            )
+            return found
+
+    def resolve(self, ticket: TicketModel) -> dict[str, bool]:
+        """The value of every role for ``ticket``."""
+        granted = set(self.title_roles(ticket.release_title))
+        email = (ticket.email or "").casefold()
+        granted.update(self.emails.get(email, ()))
+        for question, index in self.answers.items():
+            answer = ticket.responses.get(question)
+            if answer is not None:
+                granted.update(index.get(str(answer).casefold(), ()))
+
+        flags = {role: role in granted for role in roles}
+        for key in (email, ticket.reference.casefold()):
+            flags.update(self.overrides.get(key, {}))
+        return flags
+
+    def apply(self, tickets: list[TicketModel]) -> list[TicketModel]:
+        """Return the tickets with their roles set, copying only the changed ones."""
+        result = []
+        for ticket in tickets:
+            changes = {
+                role: value
+                for role, value in self.resolve(ticket).items()
+                if getattr(ticket, role) != value
+            }
+            result.append(ticket.model_copy(update=changes) if changes else ticket)
+        return result
@@ -1,36 +1,58 @@
-from marshmallow import Schema, fields, EXCLUDE, post_load
-from attendees import Attendee
+"""
+Marshmallow schemas of the tickets, the legacy deserialisation backend.
+
+They load the same ``TicketModel``/``TicketAPIModel`` objects as pydantic;
+marshmallow does the validation, so the models are built without validating
+them again. See ``decoders``.
+"""
+
+from marshmallow import EXCLUDE, Schema, fields, post_load
+
+from models import PaginationModel, TicketAPIModel, TicketModel
 
 
 class TicketSchema(Schema):
     class Meta:
         unknown = EXCLUDE
 
-    first_name = fields.String(missing=None)
-    last_name = fields.String(missing=None)
-    name = fields.String(missing=None)
-    email = fields.String(missing=None)
-    responses = fields.Dict(missing={})
+    first_name = fields.String(load_default="", allow_none=True)
+    last_name = fields.String(load_default="", allow_none=True)
+    name = fields.String(load_default=None, allow_none=True)
+    email = fields.String(load_default=None, allow_none=True)
+    responses = fields.Dict(required=True)
     reference = fields.String(required=True)
-    ticket_title = fields.String(attribute="release_title")
-
-    updated_at = fields.DateTime(missing=None)
+    release_title = fields.String(required=True)
+    created_at = fields.DateTime(required=True)
+    updated_at = fields.DateTime(required=True)
+    speaker = fields.Boolean(load_default=False)
+    exhibitor = fields.Boolean(load_default=False)
+    volunteer = fields.Boolean(load_default=False)
+    organiser = fields.Boolean(load_default=False)
+    sponsor = fields.Boolean(load_default=False)
 
     @post_load
     def make_object(self, data, **kwargs):
-        return Attendee(data)
+        return TicketModel.model_construct(**data)
 
 
 class PaginationSchema(Schema):
     class Meta:
         unknown = EXCLUDE
 
-    next_page = fields.Integer(missing=None)
+    next_page = fields.Integer(load_default=None, allow_none=True)
+
+    @post_load
+    def make_object(self, data, **kwargs):
+        return PaginationModel.model_construct(**data)
 
 
 class TicketAPISchema(Schema):
     class Meta:
         unknown = EXCLUDE
 
-    tickets = fields.List(fields.Nested(TicketSchema))
-    meta = fields.Nested(PaginationSchema())
+    tickets = fields.List(fields.Nested(TicketSchema), required=True)
+    meta = fields.Nested(PaginationSchema(), required=True)
+
+    @post_load
+    def make_object(self, data, **kwargs):
+        return TicketAPIModel.model_construct(**data)
@@ -0,0 +1,63 @@
+"""
+Compare two ticket snapshots on what is actually printed on the badges.
+
+Tickets are joined by ``reference`` through dict indexes and compared on
+``TicketModel.render_hash``, so an answer we never print (t-shirt size, ...)
+does not trigger a reprint.
+"""
+
+import pydantic
+
+from models import TicketModel
+
+
+class SnapshotDiff(pydantic.BaseModel):
+    added: list[TicketModel] = []
+    changed: list[TicketModel] = []
+    voided: list[TicketModel] = []
+    unchanged: int = 0
+
+    @property
+    def to_print(self) -> list[TicketModel]:
+        """Badges to print, sorted like a regular build."""
+        return sorted(self.added + self.changed, key=lambda ticket: ticket.reference)
+
+
+def index_by_reference(tickets: list[TicketModel]) -> dict[str, TicketModel]:
+    """Index tickets by reference, the last occurrence wins."""
+    return {ticket.reference: ticket for ticket in tickets}
+
+
+def diff_snapshots(
+    previous: list[TicketModel],
+    current: list[TicketModel],
+) -> SnapshotDiff:
+    """Return the added, changed and voided badges between two snapshots.
+
+    Args:
+        previous: Tickets of the snapshot the badges were printed from.
+        current: Tickets of the latest snapshot.
+
+    Returns:
+        A ``SnapshotDiff``; ``changed`` only holds tickets whose printed
+        content differs.
+    """
+    previous_index = index_by_reference(previous)
+    current_index = index_by_reference(current)
+
+    diff = SnapshotDiff()
+    for reference, ticket in current_index.items():
+        before = previous_index.get(reference)
+        if before is None:
+            diff.added.append(ticket)
+        elif before.render_hash != ticket.render_hash:
+            diff.changed.append(ticket)
+        else:
+            diff.unchanged += 1
+
+    diff.voided = [
+        ticket
+        for reference, ticket in previous_index.items()
+        if reference not in current_index
+    ]
+    return diff
@@ -0,0 +1,8 @@
+import os
+import pathlib
+import sys
+
+# the scripts are flat top-level modules
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
+# get_tickets builds its headers at import time, the tests never reach Tito
+os.environ.setdefault("DYNACONF_TITO_TOKEN", "test")
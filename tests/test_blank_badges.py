@@ -0,0 +1,98 @@
+import numpy as np
+import pymupdf
+import pytest
+from typer.testing import CliRunner
+
+from build_badge import (
+    LayoutParameters,
+    app,
+    create_empty_badges,
+    draw_sheet,
+    register_fonts,
+)
+from models import TicketModel
+from utils import make_batches
+
+
+@pytest.fixture(scope="module", autouse=True)
+def fonts():
+    register_fonts()
+
+
+def draw_directly(tickets, layout):
+    """Blank badges drawn sheet by sheet, without forms."""
+    for batch in make_batches(
+        layout.ordering_function(tickets), layout.badge_per_sheet
+    ):
+        draw_sheet(batch, layout, verso=False)
+    layout.canvas.save()
+
+
+def rasterise(path):
+    with pymupdf.open(path) as document:
+        return [
+            np.frombuffer(page.get_pixmap(dpi=36).samples, dtype=np.uint8)
+            for page in document
+        ]
+
+
+@pytest.mark.parametrize("paper_size", ["A4", "A5"])
+@pytest.mark.parametrize("count", [1, 3, 4])
+def test_stamped_blanks_match_direct_drawing(tmp_path, paper_size, count):
+    tickets = [TicketModel.make_empty(speaker=i % 2 == 1) for i in range(count)]
+    stamped, direct = tmp_path / "stamped.pdf", tmp_path / "direct.pdf"
+
+    create_empty_badges(
+        tickets, LayoutParameters(output_filename=str(stamped), paper_size=paper_size)
+    )
+    draw_directly(
+        tickets, LayoutParameters(output_filename=str(direct), paper_size=paper_size)
+    )
+
+    stamped_pages, direct_pages = rasterise(stamped), rasterise(direct)
+    assert len(stamped_pages) == len(direct_pages)
+    for stamped_page, direct_page in zip(stamped_pages, direct_pages):
+        # forms are anti-aliased slightly differently on their edges
+        difference = np.abs(stamped_page.astype(int) - direct_page.astype(int))
+        assert difference.mean() < 1
+
+
+def test_one_form_per_distinct_recto(tmp_path):
+    tickets = [
+        TicketModel.make_empty(),
+        TicketModel.make_empty(speaker=True),
+        TicketModel.make_empty(exhibitor=True),
+        TicketModel.make_empty(speaker=True),
+    ]
+    path = tmp_path / "blanks.pdf"
+
+    create_empty_badges(
+        tickets, LayoutParameters(output_filename=str(path), paper_size="A4")
+    )
+
+    with pymupdf.open(path) as document:
+        assert document.page_count == 2
+        names = {name for page in document for _, name, *_ in page.get_xobjects()}
+    # three rectos and the sheet decorations
+    assert {f"FormXob.{name}" for name in ("r0", "r1", "r2", "s")} == names
+
+
+def test_blank_run_size_barely_grows(tmp_path):
+    sizes = {}
+    for count in (1, 200):
+        path = tmp_path / f"blanks-{count}.pdf"
+        create_empty_badges(
+            [TicketModel.make_empty() for _ in range(count)],
+            LayoutParameters(output_filename=str(path), paper_size="A5"),
+        )
+        sizes[count] = path.stat().st_size
+
+    # each extra page only references the forms
+    assert sizes[200] - sizes[1] < 200 * 1024
+
+
+def test_blank_tickets_roles_are_exclusive():
+    result = CliRunner().invoke(app, ["blank-tickets", "--exhibitor", "--speaker"])
+
+    assert result.exit_code == 1
+    assert "mutually exclusive" in result.output
@@ -0,0 +1,52 @@
+import datetime
+
+import pytest
+
+from columnar import iter_tickets, read_tickets, write_snapshot
+from models import TicketModel
+
+
+def make_tickets(count):
+    date = datetime.datetime(2025, 10, 1, tzinfo=datetime.timezone.utc)
+    return [
+        TicketModel(
+            first_name=f"First{index}",
+            last_name=f"Last{index}",
+            name=f"First{index} Last{index}",
+            email=f"user{index}@example.com",
+            responses={"t-shirt-size": "xl"} if index % 3 else {},
+            reference=f"ABCD-{index}",
+            release_title="Conference ticket",
+            created_at=date + datetime.timedelta(hours=index),
+            updated_at=date + datetime.timedelta(hours=index),
+            speaker=index % 4 == 0,
+        )
+        for index in range(count)
+    ]
+
+
+@pytest.mark.parametrize("suffix", [".parquet", ".arrow"])
+@pytest.mark.parametrize("batch_size", [1, 3, 7, 1024])
+def test_iter_tickets_matches_read_tickets(tmp_path, suffix, batch_size):
+    tickets = make_tickets(20)
+    path = tmp_path / f"tickets{suffix}"
+    write_snapshot(tickets, path)
+
+    streamed = list(iter_tickets(path, batch_size=batch_size))
+
+    assert streamed == read_tickets(path) == tickets
+
+
+def test_iter_tickets_is_lazy(tmp_path):
+    path = tmp_path / "tickets.parquet"
+    write_snapshot(make_tickets(5), path)
+
+    stream = iter_tickets(path, batch_size=2)
+
+    assert next(stream).reference == "ABCD-0"
+    assert [ticket.reference for ticket in stream] == [
+        "ABCD-1",
+        "ABCD-2",
+        "ABCD-3",
+        "ABCD-4",
+    ]
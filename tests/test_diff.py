@@ -0,0 +1,101 @@
+import datetime
+import json
+
+import pytest
+from typer.testing import CliRunner
+
+from build_badge import app
+from models import TicketModel
+
+runner = CliRunner()
+
+
+@pytest.fixture(autouse=True)
+def workdir(tmp_path, monkeypatch):
+    # the command reads emails.mapping.csv from the working directory
+    (tmp_path / "emails.mapping.csv").write_text("tito_email,sessionize_email\n")
+    monkeypatch.chdir(tmp_path)
+
+
+def write_tickets(path, tickets):
+    path.write_text(json.dumps([t.model_dump(mode="json") for t in tickets]))
+
+
+def make_ticket(reference, email, **kwargs):
+    date = datetime.datetime(2024, 1, 1, tzinfo=datetime.timezone.utc)
+    return TicketModel(
+        first_name="Ada",
+        last_name="Lovelace",
+        name="Ada Lovelace",
+        email=email,
+        responses={},
+        reference=reference,
+        release_title="Conference ticket",
+        created_at=date,
+        updated_at=date,
+        **kwargs,
+    )
+
+
+def test_diff_ticket_gaining_speaker_role(tmp_path):
+    tickets = [
+        make_ticket("ABCD-1", "ada@example.com"),
+        make_ticket("ABCD-2", "bob@example.com"),
+    ]
+    write_tickets(tmp_path / "previous.json", tickets)
+    write_tickets(tmp_path / "current.json", tickets)
+    (tmp_path / "previous-speakers.json").write_text("[]")
+    (tmp_path / "speakers.json").write_text(
+        json.dumps(
+            [
+                {
+                    "speaker_id": "1",
+                    "first_name": "Ada",
+                    "last_name": "Lovelace",
+                    "email": "ada@example.com",
+                }
+            ]
+        )
+    )
+    output = tmp_path / "diff.json"
+
+    result = runner.invoke(
+        app,
+        [
+            "diff",
+            str(tmp_path / "previous.json"),
+            str(tmp_path / "current.json"),
+            "--speakers",
+            str(tmp_path / "speakers.json"),
+            "--previous-speakers",
+            str(tmp_path / "previous-speakers.json"),
+            "--output",
+            str(output),
+        ],
+    )
+
+    assert result.exit_code == 0, result.output
+    reprinted = json.loads(output.read_text())
+    assert [t["reference"] for t in reprinted] == ["ABCD-1"]
+    assert reprinted[0]["speaker"] is True
+
+
+def test_diff_without_previous_speakers_uses_current_ones(tmp_path):
+    tickets = [make_ticket("ABCD-1", "ada@example.com")]
+    write_tickets(tmp_path / "previous.json", tickets)
+    write_tickets(tmp_path / "current.json", tickets)
+    output = tmp_path / "diff.json"
+
+    result = runner.invoke(
+        app,
+        [
+            "diff",
+            str(tmp_path / "previous.json"),
+            str(tmp_path / "current.json"),
+            "--output",
+            str(output),
+        ],
+    )
+
+    assert result.exit_code == 0, result.output
+    assert json.loads(output.read_text()) == []
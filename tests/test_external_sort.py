@@ -0,0 +1,50 @@
+import datetime
+
+import pytest
+
+from external_sort import two_per_page_stream
+from models import TicketModel
+from utils import two_per_page
+
+
+def make_tickets(count):
+    date = datetime.datetime(2025, 10, 1, tzinfo=datetime.timezone.utc)
+    return [
+        TicketModel(
+            name=f"Attendee {index}",
+            responses={},
+            reference=f"ABCD-{index}",
+            release_title="Conference ticket",
+            created_at=date,
+            updated_at=date,
+        )
+        for index in range(count)
+    ]
+
+
+@pytest.mark.parametrize("count", range(8))
+def test_two_per_page_stream_matches_two_per_page(tmp_path, count):
+    tickets = make_tickets(count)
+
+    streamed = list(two_per_page_stream(iter(tickets), count, tmp_path))
+
+    assert streamed == list(two_per_page(tickets))
+
+
+def test_two_per_page_stream_reads_the_second_half_lazily(tmp_path):
+    tickets = make_tickets(6)
+    consumed = []
+
+    def source():
+        for ticket in tickets:
+            consumed.append(ticket.reference)
+            yield ticket
+
+    stream = two_per_page_stream(source(), len(tickets), tmp_path)
+
+    assert next(stream) == (0, tickets[0])
+    # the first half went to the spill file, the second half is still pending
+    assert consumed == ["ABCD-0", "ABCD-1", "ABCD-2"]
+    assert next(stream) == (3, tickets[3])
+    assert consumed == ["ABCD-0", "ABCD-1", "ABCD-2", "ABCD-3"]
+    assert [index for index, _ in stream] == [1, 4, 2, 5]
@@ -0,0 +1,57 @@
+import datetime
+import shlex
+
+import pytest
+
+from models import TicketModel
+from reprint_queue import PrintError, ReprintQueue, flush
+
+
+def make_ticket(reference):
+    date = datetime.datetime(2025, 10, 1, tzinfo=datetime.timezone.utc)
+    return TicketModel(
+        first_name="Ada",
+        last_name="Lovelace",
+        name="Ada Lovelace",
+        email="ada@example.com",
+        responses={},
+        reference=reference,
+        release_title="Conference ticket",
+        created_at=date,
+        updated_at=date,
+    )
+
+
+@pytest.fixture
+def queue(tmp_path):
+    with ReprintQueue(tmp_path / "reprint-queue.db") as queue:
+        queue.add(make_ticket("ABCD-1"))
+        yield queue
+
+
+def test_flush_print_command_with_spaces_in_path(tmp_path, queue):
+    output_dir = tmp_path / "print jobs"
+    printed = tmp_path / "sent to printer.pdf"
+
+    path, jobs = flush(
+        queue,
+        output_dir,
+        deadline=0,
+        force=True,
+        print_command=f"cp {{path}} {shlex.quote(str(printed))}",
+    )
+
+    assert path.parent == output_dir
+    assert printed.read_bytes() == path.read_bytes()
+    assert [job.ticket.reference for job in jobs] == ["ABCD-1"]
+    assert queue.pending() == []
+
+
+def test_flush_keeps_jobs_when_printing_fails(tmp_path, queue):
+    output_dir = tmp_path / "print jobs"
+
+    with pytest.raises(PrintError):
+        flush(queue, output_dir, deadline=0, force=True, print_command="false {path}")
+
+    assert [job.ticket.reference for job in queue.pending()] == ["ABCD-1"]
+    assert list(output_dir.iterdir()) == []
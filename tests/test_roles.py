@@ -0,0 +1,202 @@
+import datetime
+
+import pytest
+
+from models import SpeakerModel, TicketModel, roles
+from roles import RoleResolver, RoleRule
+
+
+def make_ticket(
+    reference, email="ada@example.com", release_title="Conference", **kwargs
+):
+    date = datetime.datetime(2025, 10, 1, tzinfo=datetime.timezone.utc)
+    return TicketModel(
+        first_name="Ada",
+        last_name="Lovelace",
+        name="Ada Lovelace",
+        email=email,
+        responses=kwargs.pop("responses", {}),
+        reference=reference,
+        release_title=release_title,
+        created_at=date,
+        updated_at=date,
+        **kwargs,
+    )
+
+
+def granted(resolver, ticket):
+    return {role for role, value in resolver.resolve(ticket).items() if value}
+
+
+def test_release_title_patterns():
+    resolver = RoleResolver(
+        {
+            "exhibitor": RoleRule(release_titles=["exhibitor"]),
+            "volunteer": RoleRule(release_titles=[r"^crew\b", "volunteer"]),
+        }
+    )
+
+    assert granted(resolver, make_ticket("A-1", release_title="Exhibitor Pass")) == {
+        "exhibitor"
+    }
+    assert granted(resolver, make_ticket("A-2", release_title="Crew (Friday)")) == {
+        "volunteer"
+    }
+    assert granted(resolver, make_ticket("A-3", release_title="Screw ticket")) == set()
+
+
+def test_emails_and_emails_file(tmp_path):
+    emails_file = tmp_path / "volunteers.txt"
+    emails_file.write_text("bob@example.com\nCAROL@example.com\n")
+    resolver = RoleResolver(
+        {
+            "organiser": RoleRule(emails=["Ada@Example.com"]),
+            "volunteer": RoleRule(emails_file=emails_file),
+        }
+    )
+
+    assert granted(resolver, make_ticket("A-1", email="ada@example.com")) == {
+        "organiser"
+    }
+    assert granted(resolver, make_ticket("A-2", email="carol@example.com")) == {
+        "volunteer"
+    }
+
+
+def test_responses():
+    resolver = RoleResolver(
+        {
+            "sponsor": RoleRule(responses={"company-type": ["Sponsor", "partner"]}),
+            "volunteer": RoleRule(responses={"attendee-type": "volunteer"}),
+        }
+    )
+
+    ticket = make_ticket(
+        "A-1", responses={"company-type": "sponsor", "attendee-type": "Volunteer"}
+    )
+    assert granted(resolver, ticket) == {"sponsor", "volunteer"}
+    assert (
+        granted(resolver, make_ticket("A-2", responses={"company-type": "startup"}))
+        == set()
+    )
+
+
+def test_sessionize_speakers_by_email():
+    speakers = [
+        SpeakerModel(
+            speaker_id="1",
+            first_name="Ada",
+            last_name="Lovelace",
+            email="ADA@example.com",
+        ),
+        SpeakerModel(speaker_id="2", first_name="No", last_name="Email"),
+    ]
+    resolver = RoleResolver({}, speakers=speakers)
+
+    assert granted(resolver, make_ticket("A-1", email="ada@example.com")) == {"speaker"}
+    assert granted(resolver, make_ticket("A-2", email=None)) == set()
+
+
+def test_sources_add_up():
+    resolver = RoleResolver(
+        {
+            "exhibitor": RoleRule(release_titles=["exhibitor"]),
+            "sponsor": RoleRule(emails=["ada@example.com"]),
+        },
+        speakers=[
+            SpeakerModel(
+                speaker_id="1",
+                first_name="Ada",
+                last_name="Lovelace",
+                email="ada@example.com",
+            )
+        ],
+    )
+
+    ticket = make_ticket("A-1", release_title="Exhibitor")
+    assert granted(resolver, ticket) == {"exhibitor", "sponsor", "speaker"}
+
+
+def test_overrides_take_precedence_over_rules():
+    resolver = RoleResolver(
+        {"exhibitor": RoleRule(release_titles=["exhibitor"])},
+        overrides={
+            "ada@example.com": {"exhibitor": False, "organiser": True},
+            "A-2": {"exhibitor": True, "speaker": True},
+        },
+        speakers=[
+            SpeakerModel(
+                speaker_id="1",
+                first_name="Ada",
+                last_name="Lovelace",
+                email="ada@example.com",
+            )
+        ],
+    )
+
+    assert granted(resolver, make_ticket("A-1", release_title="Exhibitor")) == {
+        "speaker",
+        "organiser",
+    }
+    assert granted(resolver, make_ticket("a-2", email="bob@example.com")) == {
+        "exhibitor",
+        "speaker",
+    }
+
+
+def test_reference_override_wins_over_email_override():
+    resolver = RoleResolver(
+        {},
+        overrides={
+            "ada@example.com": {"volunteer": True},
+            "A-1": {"volunteer": False},
+        },
+    )
+
+    assert granted(resolver, make_ticket("A-1")) == set()
+    assert granted(resolver, make_ticket("A-2")) == {"volunteer"}
+
+
+def test_unmatched_tickets_lose_stale_roles():
+    resolver = RoleResolver({"exhibitor": RoleRule(release_titles=["exhibitor"])})
+    ticket = make_ticket("A-1", speaker=True, volunteer=True)
+
+    assert resolver.resolve(ticket) == {role: False for role in roles}
+    assert resolver.apply([ticket]) == [
+        ticket.model_copy(update={"speaker": False, "volunteer": False})
+    ]
+
+
+def test_apply_only_copies_changed_tickets():
+    resolver = RoleResolver({"exhibitor": RoleRule(release_titles=["exhibitor"])})
+    unchanged = make_ticket("A-1")
+    changed = make_ticket("A-2", release_title="Exhibitor")
+
+    result = resolver.apply([unchanged, changed])
+
+    assert result[0] is unchanged
+    assert result[1] is not changed
+    assert result[1].exhibitor and not changed.exhibitor
+
+
+@pytest.mark.parametrize(
+    "rules, overrides",
+    [
+        ({"keynote": RoleRule()}, None),
+        ({}, {"A-1": {"keynote": True}}),
+    ],
+)
+def test_unknown_roles(rules, overrides):
+    with pytest.raises(ValueError, match="unknown roles \\['keynote'\\]"):
+        RoleResolver(rules, overrides)
+
+
+def test_invalid_release_title_pattern():
+    with pytest.raises(ValueError, match="invalid release_titles of volunteer"):
+        RoleResolver({"volunteer": RoleRule(release_titles=["crew("])})
+
+
+def test_from_settings_grants_exhibitor_by_release_title():
+    resolver = RoleResolver.from_settings()
+
+    assert resolver.resolve(make_ticket("A-1", release_title="Exhibitor"))["exhibitor"]
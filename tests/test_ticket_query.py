@@ -0,0 +1,281 @@
+import datetime
+
+import numpy as np
+import pytest
+
+from models import TicketModel
+from ticket_query import QueryError, compile_query, tokenize
+from ticket_table import TicketTable
+
+utc = datetime.timezone.utc
+
+
+def make_ticket(reference, name, created_at, level="", **kwargs):
+    first_name, last_name = name.split()
+    responses = {"python-experience": level} if level else {}
+    responses.update(kwargs.pop("responses", {}))
+    return TicketModel(
+        first_name=first_name,
+        last_name=last_name,
+        name=name,
+        email=f"{first_name.lower()}@example.com",
+        responses=responses,
+        reference=reference,
+        release_title=kwargs.pop("release_title", "Conference ticket"),
+        created_at=created_at,
+        updated_at=created_at,
+        **kwargs,
+    )
+
+
+tickets = [
+    make_ticket(
+        "ABCD-1",
+        "Ada Lovelace",
+        datetime.datetime(2025, 10, 1, 9, tzinfo=utc),
+        level="Expert",
+        speaker=True,
+        responses={"t-shirt-size": "XL"},
+    ),
+    make_ticket(
+        "ABCD-2",
+        "Bob Smith",
+        datetime.datetime(2025, 10, 1, 23, 30, tzinfo=utc),
+        level="Beginner",
+        release_title="Student ticket",
+    ),
+    make_ticket(
+        "ABXY-3",
+        "Carol Jones",
+        datetime.datetime(2025, 11, 12, 0, 0, tzinfo=utc),
+        level="Advanced",
+        volunteer=True,
+        responses={"t-shirt-size": "m"},
+    ),
+    make_ticket(
+        "BCDE-4",
+        "Dan Brown",
+        datetime.datetime(2025, 11, 12, 23, 59, 59, tzinfo=utc),
+        exhibitor=True,
+        sponsor=True,
+    ),
+    make_ticket(
+        "BCDE-5",
+        "Eve Adams",
+        datetime.datetime(2025, 11, 13, tzinfo=utc),
+        level="Intermediate",
+        release_title="Student Ticket",
+        responses={"t-shirt-size": "xl"},
+    ),
+    make_ticket(
+        "CDEF-6",
+        "Frank Wright",
+        datetime.datetime(2025, 12, 24, 18, tzinfo=utc),
+        level="Advanced",
+        speaker=True,
+        organiser=True,
+    ),
+]
+
+
+def references(query, **kwargs):
+    table = TicketTable(tickets)
+    mask = compile_query(query, **kwargs)(table)
+    assert mask.dtype == bool and mask.shape == (len(tickets),)
+    return [ticket.reference for ticket in table.select(mask)]
+
+
+def test_tokenize():
+    assert tokenize("role = speaker AND (level>=3 or not name ~ 'o\\'b')") == [
+        ("word", "role"),
+        ("op", "="),
+        ("word", "speaker"),
+        ("keyword", "and"),
+        ("paren", "("),
+        ("word", "level"),
+        ("op", ">="),
+        ("word", "3"),
+        ("keyword", "or"),
+        ("keyword", "not"),
+        ("word", "name"),
+        ("op", "~"),
+        ("word", "o'b"),
+        ("paren", ")"),
+    ]
+
+
+def test_tokenize_quoted_keyword_is_a_value():
+    assert tokenize('name = "and"') == [
+        ("word", "name"),
+        ("op", "="),
+        ("word", "and"),
+    ]
+
+
+def at(*args):
+    return datetime.datetime(*args, tzinfo=utc)
+
+
+# each query with the plain Python predicate it must agree with
+cases = [
+    ("role = speaker", lambda t: t.speaker),
+    ("role != speaker", lambda t: not t.speaker),
+    (
+        "role = attendee",
+        lambda t: (
+            not any((t.speaker, t.exhibitor, t.volunteer, t.organiser, t.sponsor))
+        ),
+    ),
+    ("level >= Advanced", lambda t: t.level >= 3),
+    ("level = 0", lambda t: t.level == 0),
+    ("level < 2", lambda t: t.level < 2),
+    ("level > intermediate", lambda t: t.level > 2),
+    ("level != 3", lambda t: t.level != 3),
+    ("level <= 2", lambda t: t.level <= 2),
+    ("release_title ~ student", lambda t: "student" in t.release_title.lower()),
+    (
+        "release_title = 'student ticket'",
+        lambda t: t.release_title.lower() == "student ticket",
+    ),
+    ("reference ^= AB", lambda t: t.reference.startswith("AB")),
+    ("reference ^= abc", lambda t: t.reference.startswith("ABC")),
+    ("reference != abcd-1", lambda t: t.reference != "ABCD-1"),
+    ("reference >= bcde-4", lambda t: t.reference.lower() >= "bcde-4"),
+    ("reference < bcde", lambda t: t.reference.lower() < "bcde"),
+    ("email ~ '@example.com'", lambda t: True),
+    (
+        "responses.t-shirt-size = xl",
+        lambda t: t.responses.get("t-shirt-size", "").lower() == "xl",
+    ),
+    ("responses.missing = ''", lambda t: True),
+    (
+        "created_at = 2025-11-12",
+        lambda t: at(2025, 11, 12) <= t.created_at < at(2025, 11, 13),
+    ),
+    (
+        "created_at != 2025-11-12",
+        lambda t: not at(2025, 11, 12) <= t.created_at < at(2025, 11, 13),
+    ),
+    ("created_at < 2025-11-12", lambda t: t.created_at < at(2025, 11, 12)),
+    ("created_at <= 2025-11-12", lambda t: t.created_at < at(2025, 11, 13)),
+    ("created_at > 2025-11-12", lambda t: t.created_at >= at(2025, 11, 13)),
+    ("created_at >= 2025-11-12", lambda t: t.created_at >= at(2025, 11, 12)),
+    ("created_at = 2025-10-01T09:00:00", lambda t: t.created_at == at(2025, 10, 1, 9)),
+    ("created_at > 2025-10-01T09:00:00", lambda t: t.created_at > at(2025, 10, 1, 9)),
+    (
+        "updated_at <= 2025-11-12T23:59:59+00:00",
+        lambda t: t.updated_at <= at(2025, 11, 12, 23, 59, 59),
+    ),
+    (
+        "role = speaker or level >= Advanced and not role = volunteer",
+        lambda t: t.speaker or (t.level >= 3 and not t.volunteer),
+    ),
+    (
+        "(role = speaker or level >= Advanced) and not role = volunteer",
+        lambda t: (t.speaker or t.level >= 3) and not t.volunteer,
+    ),
+    (
+        "not role = speaker and not role = exhibitor",
+        lambda t: not t.speaker and not t.exhibitor,
+    ),
+    ("not not role = sponsor", lambda t: t.sponsor),
+    (
+        "role = sponsor or role = organiser or role = volunteer",
+        lambda t: t.sponsor or t.organiser or t.volunteer,
+    ),
+    (
+        "created_at >= 2025-10-01 and release_title ~ student",
+        lambda t: (
+            t.created_at >= at(2025, 10, 1) and "student" in t.release_title.lower()
+        ),
+    ),
+]
+
+
+@pytest.mark.parametrize("query, predicate", cases, ids=[query for query, _ in cases])
+def test_filter_matches_predicate(query, predicate):
+    expected = [ticket.reference for ticket in tickets if predicate(ticket)]
+    assert references(query) == expected
+
+
+def test_filters_share_one_table():
+    # columns and their sorted copies are cached on the table between queries
+    table = TicketTable(tickets)
+    for query, predicate in cases * 2:
+        mask = compile_query(query)(table)
+        assert list(mask) == [predicate(ticket) for ticket in tickets], query
+
+
+def test_and_binds_tighter_than_or():
+    assert references("role = volunteer or role = speaker and level = 4") == [
+        "ABCD-1",
+        "ABXY-3",
+    ]
+    assert references("(role = volunteer or role = speaker) and level = 4") == [
+        "ABCD-1"
+    ]
+
+
+def test_not_binds_tighter_than_and():
+    assert references("not role = speaker and level >= 3") == ["ABXY-3"]
+    assert references("not (role = speaker and level >= 3)") == [
+        "ABCD-2",
+        "ABXY-3",
+        "BCDE-4",
+        "BCDE-5",
+    ]
+
+
+def test_keywords_are_case_insensitive():
+    assert references("ROLE = speaker AND NOT level = 4") == ["CDEF-6"]
+
+
+def test_bare_date_uses_the_timezone():
+    # 2025-10-01 in Dublin (UTC+1) runs from 23:00 UTC the day before
+    assert references("created_at = 2025-10-01", timezone="Europe/Dublin") == ["ABCD-1"]
+    assert references("created_at = 2025-10-02", timezone="Europe/Dublin") == ["ABCD-2"]
+
+
+@pytest.mark.parametrize(
+    "query, message",
+    [
+        ("colour = blue", "unknown field 'colour'"),
+        ("responsez.size = xl", "unknown field 'responsez.size'"),
+        ("role = keynote", "unknown role 'keynote'"),
+        ("level = guru", "unknown level 'guru'"),
+        ("created_at = yesterday", "invalid date 'yesterday'"),
+        ("created_at ~ 2025", "operator '~' is not supported on created_at"),
+        ("updated_at ^= 2025-01-01", "operator '^=' is not supported on updated_at"),
+        ("role >= speaker", "operator '>=' is not supported on role"),
+        ("level ~ 3", "operator '~' is not supported on level"),
+        ("level ^= 3", "operator '^=' is not supported on level"),
+    ],
+)
+def test_invalid_conditions(query, message):
+    with pytest.raises(QueryError) as error:
+        compile_query(query)
+    assert str(error.value) == message
+
+
+@pytest.mark.parametrize(
+    "query, message",
+    [
+        ("", "expected word, found 'end of expression'"),
+        ("role =", "expected word, found 'end of expression'"),
+        ("role speaker", "expected op, found 'speaker'"),
+        ("(role = speaker", "expected paren, found 'end of expression'"),
+        ("role = speaker)", "unexpected ')'"),
+        ("role = speaker level = 3", "unexpected 'level'"),
+        ("role = speaker and", "expected word, found 'end of expression'"),
+        ("name = 'unterminated", 'unexpected character at 6: " \'unterminated"'),
+        ("level ! 3", "unexpected character at 5: ' ! 3'"),
+    ],
+)
+def test_syntax_errors(query, message):
+    with pytest.raises(QueryError) as error:
+        compile_query(query)
+    assert str(error.value) == message
+
+
+def test_query_error_is_a_value_error():
+    assert issubclass(QueryError, ValueError)
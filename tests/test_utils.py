@@ -0,0 +1,41 @@
+import io
+import json
+
+import pytest
+
+from utils import iter_json_array
+
+mixed = [
+    1.5,
+    -3.5e10,
+    0,
+    12345678901234567890,
+    -0.25e-3,
+    True,
+    False,
+    None,
+    "a, string ] with separators",
+    {"reference": "ABCD-1", "amount": 10.75, "tags": [1, 2.5]},
+    [],
+    {},
+    -7,
+]
+
+
+@pytest.mark.parametrize("chunk_size", range(1, len(json.dumps(mixed)) + 2))
+def test_iter_json_array_chunk_boundaries(chunk_size):
+    for text in (json.dumps(mixed), json.dumps(mixed, indent=2)):
+        assert list(iter_json_array(io.StringIO(text), chunk_size)) == mixed
+
+
+@pytest.mark.parametrize("text", ["[1.5]", "[-3.5e10]", "[ 2 ]", "[]"])
+def test_iter_json_array_small_chunks(text):
+    for chunk_size in range(1, 5):
+        assert list(iter_json_array(io.StringIO(text), chunk_size)) == json.loads(text)
+
+
+def test_iter_json_array_invalid():
+    with pytest.raises(ValueError):
+        list(iter_json_array(io.StringIO("[1.x]"), 2))
+    with pytest.raises(ValueError):
+        list(iter_json_array(io.StringIO('{"a": 1}'), 4))
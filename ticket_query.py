@@ -0,0 +1,264 @@
+"""
+A small query language to select tickets, compiled to vectorized filters.
+
+Conditions compare a field to a value and combine with ``and``, ``or``,
+``not`` and parentheses::
+
+    role = speaker or level >= Advanced
+    created_at >= 2025-10-01 and release_title ~ student
+    reference ^= A and responses.t-shirt-size = xl
+
+Fields:
+    reference, email, release_title, first_name, last_name, name,
+    ``responses.<question>``: text, compared case-insensitively. ``~`` tests
+    for a substring and ``^=`` for a prefix.
+    created_at, updated_at: dates or datetimes. A date alone stands for the
+    whole day, so ``created_at = 2025-11-12`` selects that day.
+    level: a number or a ``PythonLevel`` name.
+    role: speaker, exhibitor, volunteer, organiser, sponsor or attendee (none
+    of the others).
+
+An expression is compiled once into a function taking a ``TicketTable`` and
+returning a boolean mask; date and text ranges are answered by binary search
+over sorted columns.
+"""
+
+import datetime
+import re
+from collections.abc import Callable
+
+import numpy as np
+import pytz
+
+from models import PythonLevel, roles
+from ticket_table import (
+    TicketTable,
+    date_fields,
+    response_prefix,
+    text_fields,
+    to_timestamp,
+)
+
+Filter = Callable[[TicketTable], np.ndarray]
+
+
+class QueryError(ValueError):
+    pass
+
+
+token_pattern = re.compile(
+    r"""\s*(?:
+        (?P<paren>[()])
+        |(?P<op><=|>=|!=|\^=|=|<|>|~)
+        |(?P<string>"(?:[^"\\]|\\.)*"|'(?:[^'\\]|\\.)*')
+        |(?P<word>[^\s()=<>!~^"']+)
+    )""",
+    re.VERBOSE,
+)
+keywords = ("and", "or", "not")
+
+
+def tokenize(expression: str) -> list[tuple[str, str]]:
+    tokens = []
+    position = 0
+    expression = expression.rstrip()
+    while position < len(expression):
+        match = token_pattern.match(expression, position)
+        if match is None or match.end() == position:
+            raise QueryError(
+                f"unexpected character at {position}: {expression[position:]!r}"
+            )
+        kind = match.lastgroup
+        value = match.group(kind)
+        if kind == "string":
+            kind, value = "word", re.sub(r"\\(.)", r"\1", value[1:-1])
+        elif kind == "word" and value.lower() in keywords:
+            kind, value = "keyword", value.lower()
+        tokens.append((kind, value))
+        position = match.end()
+    return tokens
+
+
+class Parser:
+    """Recursive descent parser producing ``Filter`` functions."""
+
+    def __init__(self, expression: str, timezone: datetime.tzinfo) -> None:
+        self.tokens = tokenize(expression)
+        self.position = 0
+        self.timezone = timezone
+
+    def peek(self) -> tuple[str, str] | None:
+        if self.position < len(self.tokens):
+            return self.tokens[self.position]
+        return None
+
+    def take(self, kind: str) -> str:
+        token = self.peek()
+        if token is None or token[0] != kind:
+            found = token[1] if token else "end of expression"
+            raise QueryError(f"expected {kind}, found {found!r}")
+        self.position += 1
+        return token[1]
+
+    def accept(self, kind: str, value: str) -> bool:
+        if self.peek() == (kind, value):
+            self.position += 1
+            return True
+        return False
+
+    def parse(self) -> Filter:
+        query = self.parse_or()
+        if self.peek() is not None:
+            raise QueryError(f"unexpected {self.peek()[1]!r}")
+        return query
+
+    def parse_or(self) -> Filter:
+        terms = [self.parse_and()]
+        while self.accept("keyword", "or"):
+            terms.append(self.parse_and())
+        if len(terms) == 1:
+            return terms[0]
+        return lambda table: np.logical_or.reduce([term(table) for term in terms])
+
+    def parse_and(self) -> Filter:
+        terms = [self.parse_not()]
+        while self.accept("keyword", "and"):
+            terms.append(self.parse_not())
+        if len(terms) == 1:
+            return terms[0]
+        return lambda table: np.logical_and.reduce([term(table) for term in terms])
+
+    def parse_not(self) -> Filter:
+        if self.accept("keyword", "not"):
+            return negate(self.parse_not())
+        if self.accept("paren", "("):
+            term = self.parse_or()
+            self.take("paren")
+            return term
+        field = self.take("word")
+        op = self.take("op")
+        value = self.take("word")
+        return compile_condition(field, op, value, self.timezone)
+
+
+def negate(term: Filter) -> Filter:
+    return lambda table: ~term(table)
+
+
+def localize(when: datetime.datetime, timezone: datetime.tzinfo) -> datetime.datetime:
+    if hasattr(timezone, "localize"):
+        # pytz zones need localize() to pick the right offset
+        return timezone.localize(when)
+    return when.replace(tzinfo=timezone)
+
+
+def parse_date(value: str, timezone: datetime.tzinfo) -> tuple[int, int | None]:
+    """Return the timestamp of ``value`` and, for a bare date, of the next day."""
+    try:
+        when = datetime.datetime.fromisoformat(value)
+    except ValueError:
+        raise QueryError(f"invalid date {value!r}")
+    if len(value) > 10:
+        if when.tzinfo is None:
+            when = localize(when, timezone)
+        return to_timestamp(when), None
+    next_day = when + datetime.timedelta(days=1)
+    return to_timestamp(localize(when, timezone)), to_timestamp(
+        localize(next_day, timezone)
+    )
+
+
+def compile_range(field: str, op: str, low, high=None) -> Filter:
+    """Compile an ordering comparison; ``high`` ends a whole-day value."""
+    if high is None:
+        high = low
+        include_high = True
+    else:
+        include_high = False
+
+    if op == "=":
+        return lambda table: table.range_mask(field, low, high, True, include_high)
+    if op == "!=":
+        return negate(compile_range(field, "=", low, None if include_high else high))
+    if op == "<":
+        return lambda table: table.range_mask(field, high=low)
+    if op == ">=":
+        return lambda table: table.range_mask(field, low=low)
+    if op == "<=":
+        return lambda table: table.range_mask(
+            field, high=high, include_high=include_high
+        )
+    if op == ">":
+        return lambda table: table.range_mask(
+            field, low=high, include_low=not include_high
+        )
+    raise QueryError(f"operator {op!r} is not supported on {field}")
+
+
+def compile_condition(
+    field: str,
+    op: str,
+    value: str,
+    timezone: datetime.tzinfo,
+) -> Filter:
+    field = field.lower()
+
+    if field == "role":
+        role = value.lower()
+        if role in roles:
+            condition = lambda table: table.column(role).copy()
+        elif role == "attendee":
+            condition = lambda table: (
+                ~np.logical_or.reduce([table.column(name) for name in roles])
+            )
+        else:
+            raise QueryError(f"unknown role {value!r}")
+        if op == "=":
+            return condition
+        if op == "!=":
+            return negate(condition)
+        raise QueryError(f"operator {op!r} is not supported on role")
+
+    if field in date_fields:
+        if op in ("~", "^="):
+            raise QueryError(f"operator {op!r} is not supported on {field}")
+        return compile_range(field, op, *parse_date(value, timezone))
+
+    if field == "level":
+        try:
+            level = int(value)
+        except ValueError:
+            try:
+                level = PythonLevel[value.capitalize()].value
+            except KeyError:
+                raise QueryError(f"unknown level {value!r}")
+        return compile_range(field, op, level)
+
+    if field in text_fields or field.startswith(response_prefix):
+        text = value.casefold()
+        if op == "~":
+            return lambda table: np.char.find(table.column(field), text) >= 0
+        if op == "^=":
+            return lambda table: table.prefix_mask(field, text)
+        if op == "=":
+            return lambda table: table.column(field) == text
+        if op == "!=":
+            return lambda table: table.column(field) != text
+        return compile_range(field, op, text)
+
+    raise QueryError(f"unknown field {field!r}")
+
+
+def compile_query(expression: str, timezone: str | datetime.tzinfo = "UTC") -> Filter:
+    """Compile ``expression`` into a function returning a boolean mask.
+
+    Args:
+        expression: Query, see the module documentation.
+        timezone: Timezone used for dates given without an offset.
+
+    Raises:
+        QueryError: If the expression is invalid.
+    """
+    if isinstance(timezone, str):
+        timezone = pytz.timezone(timezone)
+    return Parser(expression, timezone).parse()
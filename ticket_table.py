@@ -0,0 +1,156 @@
+"""
+Column-oriented view over a list of tickets.
+
+Columns are numpy arrays built lazily on first use, so a filter or an
+aggregate only pays for the fields it touches. Sorted copies of a column are
+kept to answer range and prefix queries with binary searches.
+"""
+
+import datetime
+
+import numpy as np
+
+from models import TicketModel, roles
+
+text_fields = ("reference", "email", "release_title", "first_name", "last_name", "name")
+date_fields = ("created_at", "updated_at")
+flag_fields = roles
+response_prefix = "responses."
+
+
+def to_timestamp(when: datetime.datetime) -> int:
+    """Microseconds since the epoch, naive datetimes are taken as UTC."""
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=datetime.timezone.utc)
+    return round(when.timestamp() * 1_000_000)
+
+
+class TicketTable:
+    """Columnar ticket store.
+
+    Text columns are casefolded so that queries are case-insensitive, dates
+    are int64 microsecond timestamps and ``level`` is the ``PythonLevel``
+    value (0 when unknown).
+
+    Args:
+        tickets: Tickets backing the table, rows keep their order.
+    """
+
+    def __init__(self, tickets: list[TicketModel]) -> None:
+        self._tickets = tickets
+        self._columns: dict[str, np.ndarray] = {}
+        self._sorted: dict[str, tuple[np.ndarray, np.ndarray]] = {}
+        self._labels: dict[str, np.ndarray] = {}
+
+    @property
+    def tickets(self) -> list[TicketModel]:
+        return self._tickets
+
+    def __len__(self) -> int:
+        return len(self.tickets)
+
+    def _build(self, name: str) -> np.ndarray:
+        tickets = self.tickets
+        if name in text_fields:
+            return np.array(
+                [(getattr(ticket, name) or "").casefold() for ticket in tickets],
+                dtype=str,
+            )
+        if name.startswith(response_prefix):
+            key = name[len(response_prefix) :]
+            return np.array(
+                [str(ticket.responses.get(key) or "").casefold() for ticket in tickets],
+                dtype=str,
+            )
+        if name in date_fields:
+            return np.fromiter(
+                (to_timestamp(getattr(ticket, name)) for ticket in tickets),
+                dtype=np.int64,
+                count=len(tickets),
+            )
+        if name in flag_fields:
+            return np.fromiter(
+                (getattr(ticket, name) for ticket in tickets),
+                dtype=bool,
+                count=len(tickets),
+            )
+        if name == "level":
+            return np.fromiter(
+                (ticket.level for ticket in tickets), dtype=np.int8, count=len(tickets)
+            )
+        raise KeyError(name)
+
+    def column(self, name: str) -> np.ndarray:
+        """Return the column ``name``, building it on first access."""
+        try:
+            return self._columns[name]
+        except KeyError:
+            column = self._columns[name] = self._build(name)
+            return column
+
+    def add_column(self, name: str, values: np.ndarray) -> None:
+        """Attach a column that is not derived from the tickets, e.g. the event."""
+        if len(values) != len(self):
+            raise ValueError(
+                f"column {name} has {len(values)} rows, expected {len(self)}"
+            )
+        self._columns[name] = values
+        self._sorted.pop(name, None)
+
+    def labels(self, name: str) -> np.ndarray:
+        """Return the text field ``name`` as written, for display."""
+        try:
+            return self._labels[name]
+        except KeyError:
+            if name not in text_fields:
+                raise KeyError(name)
+            labels = self._labels[name] = np.array(
+                [getattr(ticket, name) or "" for ticket in self.tickets], dtype=str
+            )
+            return labels
+
+    def sorted_column(self, name: str) -> tuple[np.ndarray, np.ndarray]:
+        """Return ``(order, values)`` where ``values`` is the sorted column."""
+        try:
+            return self._sorted[name]
+        except KeyError:
+            column = self.column(name)
+            order = np.argsort(column, kind="stable")
+            result = self._sorted[name] = (order, column[order])
+            return result
+
+    def range_mask(
+        self,
+        name: str,
+        low=None,
+        high=None,
+        include_low: bool = True,
+        include_high: bool = False,
+    ) -> np.ndarray:
+        """Rows whose ``name`` value lies between ``low`` and ``high``.
+
+        The bounds are found with binary searches over the sorted column.
+        """
+        order, values = self.sorted_column(name)
+        start = 0
+        stop = len(values)
+        if low is not None:
+            start = np.searchsorted(
+                values, low, side="left" if include_low else "right"
+            )
+        if high is not None:
+            stop = np.searchsorted(
+                values, high, side="right" if include_high else "left"
+            )
+        mask = np.zeros(len(self), dtype=bool)
+        if start < stop:
+            mask[order[start:stop]] = True
+        return mask
+
+    def prefix_mask(self, name: str, prefix: str) -> np.ndarray:
+        """Rows whose text column ``name`` starts with ``prefix``."""
+        return self.range_mask(name, prefix, prefix + "\U0010ffff")
+
+    def select(self, mask: np.ndarray) -> list[TicketModel]:
+        """Return the tickets selected by a boolean mask, in table order."""
+        return [self.tickets[index] for index in np.flatnonzero(mask)]
@@ -0,0 +1,371 @@
+"""
+Local simulator of the Tito tickets API.
+
+Serves ``/v3/{account}/{event}/tickets?page=N`` with synthetic tickets,
+paginated through ``meta.next_page`` like the real API, so the downloader can
+be exercised and benchmarked without a network or a token. Every event gets
+its own deterministic ticket list, generated on first request.
+
+Faults are injected from ``SimulatorConfig``: a fixed latency (plus jitter)
+per response, a request rate above which the server answers 429 with a
+``Retry-After`` header, a share of 5xx errors, and tickets updated or
+inserted while a download is going through the pages. Responses carry an
+``ETag`` and honour ``If-None-Match``, so the page cache gets its 304s.
+
+Point the commands at it with ``DYNACONF_API__base_url=http://127.0.0.1:8000``
+after ``python build_badge.py simulate-tito``; ``benchmark-download`` starts
+its own instance.
+"""
+
+import contextlib
+import datetime
+import hashlib
+import json
+import math
+import random
+import re
+import string
+import threading
+import time
+from collections import Counter
+from collections.abc import Iterator
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import pydantic
+
+from models import PythonLevel
+
+first_names = [
+    "Aoife", "Ciarán", "Dmitri", "Eoin", "Fatima", "Grace", "Hiroshi", "Íde",
+    "Jamal", "Kateřina", "Liam", "María", "Niamh", "Oisín", "Priya", "Seán",
+]  # fmt: skip
+last_names = [
+    "Byrne", "Chen", "Doyle", "García", "Kelly", "Müller", "Murphy",
+    "Nguyen", "O'Brien", "Ó Súilleabháin", "Ryan", "Smith", "Walsh",
+]  # fmt: skip
+release_titles = [
+    "Regular", "Regular", "Regular", "Student", "Speaker", "Exhibitor pass",
+    "Volunteer", "Sponsor",
+]  # fmt: skip
+tshirt_sizes = ["XS", "S", "M", "L", "XL", "XXL"]
+
+tickets_path = re.compile(r"^/v3/(?P<account>[^/]+)/(?P<event>[^/]+)/tickets/?$")
+
+
+class SimulatorConfig(pydantic.BaseModel):
+    """Behaviour of the simulated API.
+
+    Attributes:
+        tickets: Tickets of each event when first requested.
+        page_size: Tickets per page.
+        latency: Seconds added to every response.
+        jitter: Random extra seconds, up to this value, added to the latency.
+        rate_limit: Requests per second allowed before answering 429.
+        error_rate: Share of requests answered with a 5xx error.
+        updates_per_page: Tickets modified after each page served.
+        inserts_per_page: Tickets created, at random positions, after each
+            page served; they shift the following pages like on the real API.
+        seed: Seed of the ticket data and of the injected faults.
+    """
+
+    tickets: int = 1000
+    page_size: int = pydantic.Field(100, gt=0)
+    latency: float = 0.0
+    jitter: float = 0.0
+    rate_limit: float | None = None
+    error_rate: float = pydantic.Field(0.0, ge=0.0, le=1.0)
+    updates_per_page: int = 0
+    inserts_per_page: int = 0
+    seed: int = 0
+
+
+def random_reference(rng: random.Random) -> str:
+    return "".join(rng.choices(string.ascii_uppercase + string.digits, k=4)) + "-1"
+
+
+class SimulatedEvent:
+    """Tickets of one event, mutated as pages are served."""
+
+    def __init__(self, name: str, config: SimulatorConfig) -> None:
+        self.rng = random.Random(f"{config.seed}:{name}")
+        self.start = datetime.datetime(2025, 6, 1, 9, tzinfo=datetime.timezone.utc)
+        self.references: set[str] = set()
+        self.serial = 0
+        self.tickets = [self.new_ticket() for _ in range(config.tickets)]
+
+    def timestamp(self) -> str:
+        offset = datetime.timedelta(minutes=self.serial * 7)
+        return (self.start + offset).isoformat()
+
+    def new_ticket(self) -> dict:
+        rng = self.rng
+        reference = random_reference(rng)
+        while reference in self.references:
+            reference = random_reference(rng)
+        self.references.add(reference)
+        self.serial += 1
+
+        first_name, last_name = rng.choice(first_names), rng.choice(last_names)
+        created_at = self.timestamp()
+        return {
+            "id": self.serial,
+            "slug": f"ti_{reference.lower()}",
+            "state": "complete",
+            "first_name": first_name,
+            "last_name": last_name,
+            "name": f"{first_name} {last_name}",
+            "email": f"{first_name.lower()}.{self.serial}@example.com",
+            "reference": reference,
+            "release_title": rng.choice(release_titles),
+            "responses": {
+                "python-experience": rng.choice([level.name for level in PythonLevel]),
+                "t-shirt-size": rng.choice(tshirt_sizes),
+            },
+            "created_at": created_at,
+            "updated_at": created_at,
+        }
+
+    def mutate(self, config: SimulatorConfig, stats: Counter) -> None:
+        for _ in range(min(config.updates_per_page, len(self.tickets))):
+            ticket = self.rng.choice(self.tickets)
+            self.serial += 1
+            ticket["responses"]["t-shirt-size"] = self.rng.choice(tshirt_sizes)
+            ticket["updated_at"] = self.timestamp()
+            stats["updates"] += 1
+        for _ in range(config.inserts_per_page):
+            position = self.rng.randint(0, len(self.tickets))
+            self.tickets.insert(position, self.new_ticket())
+            stats["inserts"] += 1
+
+    def page(self, number: int, page_size: int) -> dict:
+        total_pages = max(1, math.ceil(len(self.tickets) / page_size))
+        return {
+            "tickets": self.tickets[(number - 1) * page_size : number * page_size],
+            "meta": {
+                "current_page": number,
+                "next_page": number + 1 if number < total_pages else None,
+                "previous_page": number - 1 if number > 1 else None,
+                "per_page": page_size,
+                "total_count": len(self.tickets),
+                "total_pages": total_pages,
+            },
+        }
+
+
+class TitoSimulator(ThreadingHTTPServer):
+    """HTTP server of the simulated API, one thread per connection.
+
+    Args:
+        address: ``(host, port)`` to listen on, port 0 picks a free one.
+        config: Data and faults of the simulation.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, address: tuple[str, int], config: SimulatorConfig) -> None:
+        super().__init__(address, SimulatorHandler)
+        self.config = config
+        self.events: dict[str, SimulatedEvent] = {}
+        self.stats: Counter = Counter()
+        self.lock = threading.Lock()
+        self.faults = random.Random(config.seed)
+        self.tokens = float(config.rate_limit or 0)
+        self.updated_at = time.monotonic()
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def event(self, name: str) -> SimulatedEvent:
+        if name not in self.events:
+            self.events[name] = SimulatedEvent(name, self.config)
+        return self.events[name]
+
+    def throttled(self) -> float:
+        """Seconds to wait before the next request, 0 when it is allowed."""
+        rate = self.config.rate_limit
+        if not rate:
+            return 0.0
+        now = time.monotonic()
+        self.tokens = min(rate, self.tokens + (now - self.updated_at) * rate)
+        self.updated_at = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / rate
+
+    def respond(self, event: str, page: int) -> tuple[int, dict[str, str], bytes]:
+        """Status, headers and body of a ticket page request."""
+        config = self.config
+        headers = {}
+        with self.lock:
+            self.stats["requests"] += 1
+            wait = self.throttled()
+            if config.rate_limit:
+                headers["X-RateLimit-Limit"] = str(math.ceil(config.rate_limit))
+                headers["X-RateLimit-Remaining"] = str(max(0, int(self.tokens)))
+            if wait:
+                self.stats["429"] += 1
+                return 429, {**headers, "Retry-After": str(math.ceil(wait))}, b""
+            if self.faults.random() < config.error_rate:
+                status = self.faults.choice((500, 502, 503))
+                self.stats[str(status)] += 1
+                return status, headers, b""
+
+            simulated = self.event(event)
+            body = json.dumps(simulated.page(page, config.page_size)).encode()
+            simulated.mutate(config, self.stats)
+            self.stats["pages"] += 1
+        headers["ETag"] = f'"{hashlib.sha1(body).hexdigest()}"'
+        return 200, headers, body
+
+
+class SimulatorHandler(BaseHTTPRequestHandler):
+    server: TitoSimulator
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args) -> None:
+        pass
+
+    def send(self, status: int, headers: dict[str, str], body: bytes = b"") -> None:
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self) -> None:
+        url = urlsplit(self.path)
+        match = tickets_path.match(url.path)
+        if match is None:
+            self.send(404, {})
+            return
+        if not self.headers.get("Authorization", "").startswith("Token token="):
+            self.send(401, {})
+            return
+        try:
+            page = int(parse_qs(url.query).get("page", ["1"])[0])
+        except ValueError:
+            self.send(400, {})
+            return
+
+        config = self.server.config
+        if config.latency or config.jitter:
+            time.sleep(config.latency + random.uniform(0, config.jitter))
+
+        status, headers, body = self.server.respond(match["event"], page)
+        if status == 200 and self.headers.get("If-None-Match") == headers["ETag"]:
+            with self.server.lock:
+                self.server.stats["304"] += 1
+            self.send(304, headers)
+            return
+        if status == 200:
+            headers["Content-Type"] = "application/json"
+        self.send(status, headers, body)
+
+
+@contextlib.contextmanager
+def running(
+    config: SimulatorConfig, host: str = "127.0.0.1", port: int = 0
+) -> Iterator[TitoSimulator]:
+    """Run a simulator in a background thread for the duration of the block."""
+    server = TitoSimulator((host, port), config)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield server
+    finally:
+        server.shutdown()
+        server.server_close()
+        thread.join()
+
+
+class BenchmarkRun(pydantic.BaseModel):
+    """Outcome of one download of every simulated event."""
+
+    seconds: float
+    tickets: int
+    pages: int
+    duplicates: int
+    missing: int
+    server: dict[str, int]
+
+    @property
+    def tickets_per_second(self) -> float:
+        return self.tickets / self.seconds if self.seconds else 0.0
+
+    @property
+    def pages_per_second(self) -> float:
+        return self.pages / self.seconds if self.seconds else 0.0
+
+
+def benchmark_download(
+    config: SimulatorConfig,
+    events: list[str],
+    concurrency: int = 4,
+    repeat: int = 1,
+    cache=None,
+    trace=None,
+) -> list[BenchmarkRun]:
+    """Download ``events`` from a local simulator, ``repeat`` times.
+
+    The events are fetched like ``download-all`` does: one thread per event
+    over one pooled ``TitoSession``, with its retries.
+
+    Args:
+        config: Data and faults of the simulation.
+        events: Event slugs, each gets its own tickets.
+        concurrency: Events downloaded at the same time.
+        repeat: Downloads of every event; with a ``cache`` the next ones
+            revalidate the cached pages.
+        cache: Optional ``PageCache``.
+        trace: Optional ``HttpTrace`` recording every request.
+
+    Returns:
+        One run per repetition. ``duplicates`` and ``missing`` compare the
+        references received with the event tickets once the run is over;
+        they stay at 0 unless tickets were inserted during the download.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    from get_tickets import TitoSession, get_ticket_pages
+
+    runs = []
+    with running(config) as server:
+        session = TitoSession(
+            pool_size=concurrency, base_url=server.base_url, trace=trace
+        )
+
+        def download(event: str) -> list[list]:
+            return list(get_ticket_pages(event, session=session, cache=cache))
+
+        for _ in range(repeat):
+            before = Counter(server.stats)
+            start = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=concurrency) as pool:
+                downloads = list(pool.map(download, events))
+            seconds = time.perf_counter() - start
+
+            tickets = pages = duplicates = missing = 0
+            for event, event_pages in zip(events, downloads):
+                received = [t.reference for page in event_pages for t in page]
+                tickets += len(received)
+                pages += len(event_pages)
+                duplicates += len(received) - len(set(received))
+                with server.lock:
+                    expected = {t["reference"] for t in server.event(event).tickets}
+                missing += len(expected.difference(received))
+            runs.append(
+                BenchmarkRun(
+                    seconds=seconds,
+                    tickets=tickets,
+                    pages=pages,
+                    duplicates=duplicates,
+                    missing=missing,
+                    server=dict(server.stats - before),
+                )
+            )
+    return runs
@@ -5,6 +5,11 @@ Update ticket references based on a JSON mapping configuration file.
 This script reads a tickets JSON file, applies reference transformations
 based on a mapping file, and outputs a new tickets JSON file.
 
+Tickets are streamed, so memory does not grow with the tickets file. The
+mapping is loaded whole into a dict (the same index ``load_tickets`` overlays
+at load time) and the references it changed are tracked in a set: memory grows
+with the number of mapped references, not with the number of tickets.
+
 Example mapping file (reference-mapping.json):
 {
     "BBGQ-1": "KARA-TE",
@@ -13,41 +18,18 @@ Example mapping file (reference-mapping.json):
 """
 
 import json
-import sys
+import os
 from pathlib import Path
 
 import typer
-from pydantic import TypeAdapter, ValidationError
+from pydantic import ValidationError
 
 from models import TicketModel
+from utils import iter_json_array
 
 app = typer.Typer(help="Update ticket references based on a JSON mapping configuration")
 
 
-def load_tickets(input_file: Path) -> list[TicketModel]:
-    """Load and validate tickets from JSON file."""
-    try:
-        with open(input_file, "r", encoding="utf-8") as f:
-            data = json.load(f)
-
-        # Validate using TypeAdapter for list of TicketModel
-        adapter = TypeAdapter(list[TicketModel])
-        tickets = adapter.validate_python(data)
-
-        typer.echo(f"✓ Loaded {len(tickets)} tickets from {input_file}")
-        return tickets
-
-    except FileNotFoundError:
-        typer.echo(f"✗ Error: Input file '{input_file}' not found", err=True)
-        raise typer.Exit(code=1)
-    except json.JSONDecodeError as e:
-        typer.echo(f"✗ Error: Invalid JSON in '{input_file}': {e}", err=True)
-        raise typer.Exit(code=1)
-    except ValidationError as e:
-        typer.echo(f"✗ Error: Validation failed for tickets: {e}", err=True)
-        raise typer.Exit(code=1)
-
-
 def load_mapping(mapping_file: Path) -> dict[str, str]:
     """Load reference mapping from JSON file."""
     try:
@@ -81,52 +63,68 @@ def load_mapping(mapping_file: Path) -> dict[str, str]:
         raise typer.Exit(code=1)
 
 
-def apply_reference_mapping(
-    tickets: list[TicketModel], mapping: dict[str, str]
-) -> tuple[list[TicketModel], int]:
+def rewrite_references(
+    input_file: Path, mapping: dict[str, str], output_file: Path | None
+) -> tuple[int, int, set[str]]:
     """
-    Apply reference mapping to tickets.
+    Stream tickets from input_file to output_file, applying the mapping.
+
+    Tickets are read, validated and written one at a time, so memory does not
+    grow with the size of the input; only the mapping and the references it
+    changed are held. When output_file is None nothing is written (dry run).
 
     Returns:
-        Tuple of (updated_tickets, count_of_changes)
+        Tuple of (tickets_count, count_of_changes, used_references)
     """
-    updated_tickets = []
+    total = 0
     changes_count = 0
+    used: set[str] = set()
 
-    for ticket in tickets:
-        if ticket.reference in mapping:
-            old_ref = ticket.reference
-            new_ref = mapping[old_ref]
-
-            # Create a new ticket with updated reference
-            # Use model_copy to create a modified copy
-            updated_ticket = ticket.model_copy(update={"reference": new_ref})
-            updated_tickets.append(updated_ticket)
-
-            typer.echo(f"  {old_ref} → {new_ref}")
-            changes_count += 1
-        else:
-            # Keep ticket as-is
-            updated_tickets.append(ticket)
-
-    return updated_tickets, changes_count
-
+    tmp_file = None
+    out = None
+    if output_file is not None:
+        tmp_file = output_file.with_name(f".{output_file.name}.tmp")
+        out = open(tmp_file, "w", encoding="utf-8")
 
-def save_tickets(tickets: list[TicketModel], output_file: Path) -> None:
-    """Save tickets to JSON file."""
     try:
-        # Convert pydantic models to dict for JSON serialization
-        adapter = TypeAdapter(list[TicketModel])
-        data = adapter.dump_python(tickets, mode="json")
-
-        with open(output_file, "w", encoding="utf-8") as f:
-            json.dump(data, f, indent=4, ensure_ascii=False)
-
-        typer.echo(f"✓ Saved {len(tickets)} tickets to {output_file}")
+        with open(input_file, "r", encoding="utf-8") as f:
+            for index, item in enumerate(iter_json_array(f)):
+                ticket = TicketModel.model_validate(item)
+                new_ref = mapping.get(ticket.reference)
+                if new_ref is not None:
+                    used.add(ticket.reference)
+                    ticket.reference = new_ref
+                    changes_count += 1
+                total += 1
+
+                if out is not None:
+                    text = json.dumps(
+                        ticket.model_dump(mode="json"), indent=4, ensure_ascii=False
+                    )
+                    out.write("[\n    " if index == 0 else ",\n    ")
+                    out.write(text.replace("\n", "\n    "))
+
+        if out is not None:
+            out.write("\n]" if total else "[]")
+            out.close()
+            os.replace(tmp_file, output_file)
 
-    except Exception as e:
-        typer.echo(f"✗ Error: Failed to save tickets: {e}", err=True)
+    except FileNotFoundError:
+        typer.echo(f"✗ Error: Input file '{input_file}' not found", err=True)
+        raise typer.Exit(code=1)
+    except ValidationError as e:
+        typer.echo(f"✗ Error: Validation failed for tickets: {e}", err=True)
         raise typer.Exit(code=1)
+    except ValueError as e:
+        # json.JSONDecodeError is a ValueError too
+        typer.echo(f"✗ Error: Invalid JSON in '{input_file}': {e}", err=True)
+        raise typer.Exit(code=1)
+    finally:
+        if out is not None and not out.closed:
+            out.close()
+            tmp_file.unlink(missing_ok=True)
+
+    return total, changes_count, used
 
 
 @app.command()
@@ -176,29 +174,28 @@ def update(
     typer.echo("🎫 Ticket Reference Updater")
     typer.echo("=" * 50)
 
-    # Load tickets
-    tickets = load_tickets(input_file)
-
     # Load mapping
     mapping = load_mapping(mapping_file)
 
-    # Apply mapping
-    typer.echo("\n📝 Applying reference mappings:")
-    updated_tickets, changes_count = apply_reference_mapping(tickets, mapping)
+    # Stream tickets through the mapping
+    typer.echo("\n📝 Applying reference mappings...")
+    total, changes_count, used = rewrite_references(
+        input_file, mapping, None if dry_run else output_file
+    )
 
     # Summary
     typer.echo("\n" + "=" * 50)
     typer.echo(f"Summary:")
-    typer.echo(f"  Total tickets: {len(tickets)}")
+    typer.echo(f"  Total tickets: {total}")
     typer.echo(f"  References updated: {changes_count}")
-    typer.echo(f"  Unchanged: {len(tickets) - changes_count}")
+    typer.echo(f"  Unchanged: {total - changes_count}")
+    typer.echo(f"  Unused mappings: {len(mapping.keys() - used)}")
 
     # Save or dry-run
     if dry_run:
         typer.echo("\n⚠️  DRY RUN - No files were modified")
     else:
-        typer.echo("")
-        save_tickets(updated_tickets, output_file)
+        typer.echo(f"\n✓ Saved {total} tickets to {output_file}")
         typer.echo("\n✅ Update complete!")
 
 
@@ -1,5 +1,7 @@
 import itertools
+import json
 import math
+import re
 
 
 def make_batches(iterable, n):
@@ -12,10 +14,77 @@ def make_batches(iterable, n):
 
 
 def two_per_page(data):
-    """ used to keep tickets ordering after page cut"""
+    """used to keep tickets ordering after page cut"""
     size = len(data)
     nb_pages = math.ceil(size / 2.0)
     for i in range(int(nb_pages)):
         yield i, data[i]
         if i + nb_pages < size:
             yield i + nb_pages, data[i + nb_pages]
+
+
+number_end = re.compile(r"[\s,\]]")
+
+
+def number_may_continue(item, buffer, end):
+    """Whether a number decoded up to ``end`` may go on in the next chunk.
+
+    ``raw_decode`` stops a number at the first character it cannot take, so
+    ``1.5`` cut after ``1.`` decodes as ``1``: a number is only complete once
+    a separator follows it in the buffer.
+    """
+    if isinstance(item, bool) or not isinstance(item, (int, float)):
+        return False
+    return number_end.search(buffer, end) is None
+
+
+def iter_json_array(fp, chunk_size=1 << 16):
+    """Yield the items of a top-level JSON array without loading it whole.
+
+    Only the item being decoded is kept in memory, which makes it suitable
+    for very large ticket dumps.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ""
+    position = 0
+    started = False
+    eof = False
+
+    while True:
+        # skip whitespace and separators up to the next item
+        while True:
+            while position < len(buffer) and buffer[position] in " \t\r\n,":
+                position += 1
+            if position < len(buffer) or eof:
+                break
+            buffer, position = fp.read(chunk_size), 0
+            eof = not buffer
+
+        if not started:
+            if buffer[position : position + 1] != "[":
+                raise ValueError("expected a JSON array")
+            started = True
+            position += 1
+            continue
+
+        if position >= len(buffer):
+            raise ValueError("unterminated JSON array")
+        if buffer[position] == "]":
+            return
+
+        try:
+            item, end = decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            chunk = fp.read(chunk_size)
+            eof = not chunk
+            buffer, position = buffer[position:] + chunk, 0
+            continue
+        if not eof and number_may_continue(item, buffer, end):
+            chunk = fp.read(chunk_size)
+            eof = not chunk
+            buffer, position = buffer[position:] + chunk, 0
+            continue
+        yield item
+        position = end
@@ -0,0 +1,248 @@
+"""
+Incremental badge builds, kept up to date while the inputs are edited.
+
+Each badge is drawn once (verso without its ordering number, and recto) as a
+page of a "library" PDF, indexed by ``TicketModel.render_hash``. A build only
+draws the badges missing from the library, then assembles the output with
+PyMuPDF: the sheets themselves (cut lines, borders, ordering numbers, which
+move whenever a ticket is inserted) are drawn by ReportLab in a single cheap
+pass, and the library pages are placed on them as form XObjects.
+
+``watch`` polls the modification times of the inputs. A change to the ticket,
+speaker or mapping files reloads the data and only draws the badges whose
+printed content changed; a change to the settings, the template, the images
+or the fonts clears the library and every cache, so all badges are drawn
+again. Changes are debounced: the build starts once the files stopped moving.
+"""
+
+import io
+import os
+import pathlib
+import time
+from collections.abc import Callable, Iterable
+
+import pydantic
+import pymupdf
+
+from alignment_guidelines import draw_guidelines, draw_margins
+from assets import print_image
+from badge_template import load_template
+from build_badge import (
+    LayoutParameters,
+    draw_cutlines,
+    draw_page_borders,
+    register_fonts,
+    write_ordering_num,
+    write_recto,
+    write_verso,
+)
+from config import settings
+from glyphs import UncoveredText, assign_fonts, coverage, report_uncovered
+from models import TicketModel
+from utils import make_batches
+
+
+class BuildReport(pydantic.BaseModel):
+    badges: int
+    drawn: int
+    seconds: float
+    uncovered: list[UncoveredText] = []
+
+
+def fingerprint(paths: Iterable[pathlib.Path]) -> dict[pathlib.Path, tuple[int, int]]:
+    """Modification time and size of every file, directories are walked."""
+    state = {}
+    for path in paths:
+        files = sorted(path.rglob("*")) if path.is_dir() else [path]
+        for file in files:
+            try:
+                stat = file.stat()
+            except FileNotFoundError:
+                continue
+            if not file.is_dir():
+                state[file] = (stat.st_mtime_ns, stat.st_size)
+    return state
+
+
+class BadgeLibrary:
+    """Badges already drawn, each one a page of a library PDF."""
+
+    def __init__(self) -> None:
+        self.pages: dict[str, tuple[pymupdf.Document, int]] = {}
+
+    def clear(self) -> None:
+        self.pages.clear()
+
+    def draw_missing(
+        self,
+        tickets: list[TicketModel],
+        font_fallbacks: dict[tuple[str, str], str],
+    ) -> int:
+        """Draw the badges not in the library yet, in one new library PDF.
+
+        ``font_fallbacks`` are the fonts assigned to the texts of the build,
+        see ``glyphs``.
+        """
+        missing = {}
+        for ticket in tickets:
+            if ticket.render_hash not in self.pages:
+                missing.setdefault(ticket.render_hash, ticket)
+        if not missing:
+            return 0
+
+        buffer = io.BytesIO()
+        layout = LayoutParameters(output_filename=buffer)
+        layout.plan.font_fallbacks.update(font_fallbacks)
+        layout.canvas.setPageSize((layout.section_width * 2, layout.section_height))
+        for ticket in missing.values():
+            write_verso(ticket, None, layout)
+            layout.canvas.translate(layout.section_width, 0)
+            write_recto(ticket, layout)
+            layout.canvas.showPage()
+        layout.canvas.save()
+
+        document = pymupdf.open(stream=buffer.getvalue(), filetype="pdf")
+        for page_number, render_hash in enumerate(missing):
+            self.pages[render_hash] = (document, page_number)
+        return len(missing)
+
+    def keep(self, tickets: list[TicketModel]) -> None:
+        """Forget the badges no longer printed, and their library PDFs."""
+        used = {ticket.render_hash for ticket in tickets}
+        self.pages = {key: page for key, page in self.pages.items() if key in used}
+
+
+def draw_sheets(ordered: list[tuple[int, TicketModel]], layout) -> None:
+    """Draw everything on the sheets but the badges themselves."""
+    for batch in make_batches(ordered, layout.badge_per_sheet):
+        if settings.printout.show_guidelines:
+            draw_margins(layout)
+            draw_guidelines(layout)
+        draw_cutlines(layout)
+        draw_page_borders(layout)
+
+        layout.canvas.translate(0, layout.height_offset)
+        for ticket_index, attendee in batch:
+            write_ordering_num(attendee, ticket_index, layout)
+            layout.canvas.translate(0, -layout.height_offset)
+        layout.canvas.showPage()
+    layout.canvas.save()
+
+
+class IncrementalBuild:
+    """Builds of ``output`` reusing the badges drawn by the previous ones.
+
+    Args:
+        load: Returns the tickets to print, roles marked and filters applied.
+        output: PDF file, replaced atomically by each build.
+    """
+
+    def __init__(
+        self, load: Callable[[], list[TicketModel]], output: pathlib.Path
+    ) -> None:
+        self.load = load
+        self.output = pathlib.Path(output)
+        self.library = BadgeLibrary()
+
+    def reset_design(self) -> None:
+        """Forget everything drawn, after a settings, template or image change."""
+        settings.reload()
+        load_template.cache_clear()
+        print_image.cache_clear()
+        register_fonts.cache_clear()
+        coverage.cache_clear()
+        self.library.clear()
+
+    def build(self) -> BuildReport:
+        """Load the tickets and write the output, drawing only the new badges."""
+        start = time.perf_counter()
+        tickets = sorted(self.load(), key=lambda ticket: ticket.reference)
+        register_fonts()
+        buffer = io.BytesIO()
+        layout = LayoutParameters(output_filename=buffer)
+        uncovered = assign_fonts(tickets, layout.plan)
+        drawn = self.library.draw_missing(tickets, layout.plan.font_fallbacks)
+        self.library.keep(tickets)
+
+        ordered = list(layout.ordering_function(tickets))
+        draw_sheets(ordered, layout)
+
+        output = pymupdf.open(stream=buffer.getvalue(), filetype="pdf")
+        for page, batch in zip(output, make_batches(ordered, layout.badge_per_sheet)):
+            for slot, (_, ticket) in enumerate(batch):
+                # PyMuPDF measures from the top of the page
+                bottom = layout.height_offset * (1 - slot)
+                top = layout.height - bottom - layout.section_height
+                rect = pymupdf.Rect(
+                    0, top, 2 * layout.section_width, layout.height - bottom
+                )
+                document, page_number = self.library.pages[ticket.render_hash]
+                page.show_pdf_page(rect, document, page_number)
+
+        tmp = self.output.with_name(f".{self.output.name}.tmp")
+        output.save(tmp, garbage=1)
+        output.close()
+        os.replace(tmp, self.output)
+        return BuildReport(
+            badges=len(tickets),
+            drawn=drawn,
+            seconds=time.perf_counter() - start,
+            uncovered=uncovered,
+        )
+
+
+def watch(
+    builder: IncrementalBuild,
+    data_paths: list[pathlib.Path],
+    design_paths: list[pathlib.Path],
+    interval: float = 1.0,
+    debounce: float = 0.5,
+    report: Callable[[str], None] = print,
+) -> None:
+    """Build, then rebuild on every change of the inputs, until interrupted.
+
+    Args:
+        builder: Incremental build of the output.
+        data_paths: Ticket, speaker and mapping files.
+        design_paths: Settings, template, image and font files or directories.
+        interval: Seconds between two checks of the inputs.
+        debounce: Seconds the inputs must stay unchanged before a build.
+        report: Receives a line per build.
+    """
+    paths = [*data_paths, *design_paths]
+    data_files = {path.resolve() for path in data_paths}
+    state = fingerprint(paths)
+
+    while True:
+        try:
+            result = builder.build()
+        except Exception as e:
+            # a file saved halfway or an invalid template: wait for the fix
+            report(f"build failed: {type(e).__name__}: {e}")
+        else:
+            report(
+                f"{builder.output}: {result.badges} badges, {result.drawn} drawn "
+                f"in {result.seconds:.2f}s"
+            )
+            report_uncovered(result.uncovered, report)
+
+        current = state
+        while current == state:
+            time.sleep(interval)
+            current = fingerprint(paths)
+        while True:
+            time.sleep(debounce)
+            settled = fingerprint(paths)
+            if settled == current:
+                break
+            current = settled
+
+        changed = {
+            path.resolve()
+            for path in current.keys() | state.keys()
+            if current.get(path) != state.get(path)
+        }
+        state = current
+        if changed - data_files:
+            builder.reset_design()
+        report("changed: " + ", ".join(sorted(path.name for path in changed)))